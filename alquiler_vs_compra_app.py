@@ -1,231 +1,100 @@
-import streamlit as st
-import numpy_financial as npf
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
-import matplotlib.ticker as mticker
-from fpdf import FPDF
-import io
-
-
-
-def amortizacion_hipoteca(capital: float, tasa_mensual: float, meses: int,
-                          horizonte: int):
-    """Devuelve la amortización y la deuda pendiente por año considerando
-    capital e intereses."""
-
-    cuota = npf.pmt(tasa_mensual, meses, -capital)
-
-    saldo_capital = capital
-    pagos_realizados = 0.0
-    deuda_total = cuota * meses
-
-    amort_anual = [0.0]
-    deuda_anual = [deuda_total]
-
-    for mes in range(1, min(meses, horizonte * 12) + 1):
-        interes = saldo_capital * tasa_mensual
-        principal = cuota - interes
-        saldo_capital -= principal
-        pagos_realizados += cuota
-        deuda_total -= cuota
-        if mes % 12 == 0:
-            amort_anual.append(pagos_realizados)
-            deuda_anual.append(max(deuda_total, 0.0))
-
-    while len(amort_anual) < horizonte + 1:
-        amort_anual.append(pagos_realizados)
-        deuda_anual.append(max(deuda_total, 0.0))
-
-    return amort_anual, deuda_anual
-
-
-def calcular_resultados(c, a):
-    """Realiza todos los cálculos y devuelve un DataFrame y métricas."""
-    precio_vivienda = c['precio_vivienda']
-    entrada_pct = c['entrada_pct']
-    gastos_compra_pct = c['gastos_compra_pct']
-    tipo_interes_hipoteca = c['tipo_interes_hipoteca']
-    plazo_hipoteca = c['plazo_hipoteca']
-    revalorizacion_vivienda_pct = c['revalorizacion_vivienda_pct']
-    gasto_propietario_pct = c.get('gasto_propietario_pct', 0.0)
-    seguro_hogar_eur = c.get('seguro_hogar_eur', 0.0)
-    seguro_vida_eur = c.get('seguro_vida_eur', 0.0)
-
-    alquiler_inicial = a['alquiler_inicial']
-    subida_alquiler_anual_pct = a['subida_alquiler_anual_pct']
-    rentabilidad_inversion_pct = a['rentabilidad_inversion_pct']
-    horizonte_anios = a.get('horizonte_anios', plazo_hipoteca)
-
-    entrada = precio_vivienda * entrada_pct / 100
-    gastos_compra = precio_vivienda * gastos_compra_pct / 100
-    capital_financiado = precio_vivienda - entrada
-
-    tasa_mensual = tipo_interes_hipoteca / 100 / 12
-    meses_totales = plazo_hipoteca * 12
-    cuota_mensual = npf.pmt(tasa_mensual, meses_totales, -capital_financiado)
-    cuota_anual = cuota_mensual * 12
-
-    amort_acum, deuda_anual = amortizacion_hipoteca(
-        capital_financiado, tasa_mensual, meses_totales, horizonte_anios
-    )
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import metricas
+from cache_resultados import (CAMPOS, CacheCompartida, CacheTramos, clave_escenario,
+                              codificar_escenario, decodificar_escenario, tamano_resultado)
+from registro_emails import normalizar_email, obtener_almacen
+
+# El motor de cálculo, matplotlib y fpdf solo se importan al llegar a los
+# resultados (paso 5), para que los primeros pasos carguen rápido.
+
+
+@st.cache_resource
+def almacen_emails():
+    # Uno por proceso: comparte el hilo que agrupa las altas en lotes
+    return obtener_almacen()
+
+
+@st.cache_resource
+def cache_compartida():
+    """Resultados, gráficos y descargas por escenario, compartidos entre
+    sesiones y limitados en memoria (CACHE_COMPARTIDA_MB, 128 por defecto)."""
+    return CacheCompartida(max_bytes=int(os.environ.get("CACHE_COMPARTIDA_MB", 128)) * 2**20)
+
+
+@st.cache_resource
+def cache_malla():
+    """Cache de mallas de sensibilidad compartida entre sesiones."""
+    from sensibilidad import CacheMalla
+    return CacheMalla()
+
+
+@st.cache_resource
+def cola_trabajos():
+    """Cola de simulaciones largas compartida entre sesiones, con
+    TRABAJOS_PROCESOS trabajos a la vez (2 por defecto)."""
+    from trabajos import ColaTrabajos
+    return ColaTrabajos(max_procesos=int(os.environ.get("TRABAJOS_PROCESOS", 2)))
+
+
+def seguir_trabajo(clave):
+    """Sigue el trabajo de la cola cuyo id está en ``st.session_state[clave]``.
+
+    Mientras no acaba muestra su progreso y un botón para cancelarlo en un
+    fragmento que se actualiza cada segundo sin volver a ejecutar la página;
+    al acabar la vuelve a ejecutar. Devuelve el resultado la primera vez
+    que se consulta terminado (el id se olvida) y si no, ``None``.
+    """
+    id = st.session_state.get(clave)
+    if id is None:
+        return None
+    cola = cola_trabajos()
+    estado = cola.estado(id)
+    if estado is None or estado["estado"] not in ("pendiente", "ejecutando"):
+        del st.session_state[clave]
+        if estado is None:
+            st.warning("El resultado ya no está disponible. Vuelve a calcularlo.")
+        elif estado["estado"] == "error":
+            st.error(f"Error en el cálculo: {estado['error']}")
+        elif estado["estado"] == "cancelado":
+            st.info("Cálculo cancelado.")
+        return cola.resultado(id)
+
+    @st.fragment(run_every=1.0)
+    def progreso():
+        estado = cola.estado(id)
+        if estado is None or estado["estado"] not in ("pendiente", "ejecutando"):
+            st.rerun()
+        if estado["estado"] == "pendiente":
+            st.progress(0.0, text="En cola...")
+        else:
+            st.progress(estado["progreso"], text=f"Calculando... {estado['progreso']:.0%}")
+        if st.button("Cancelar", key=f"{clave}_cancelar"):
+            cola.cancelar(id)
 
-    gastos_iniciales = 0
-    years = [0]
-    precio_vivienda_lst = [precio_vivienda]
-    gastos_iniciales_lst = [entrada + gastos_compra]
-    hipoteca_amortizada_lst = [0.0]
-    deuda_pendiente_lst = [capital_financiado]
-    gastos_anuales_lst = [0.0]
-    gastos_acumulados_lst = [entrada + gastos_compra]
-    patrimonio_neto_lst = [-(entrada + gastos_compra)]
-    gasto_alquiler_anual_lst = [0.0]
-    gasto_alq_acum_lst = [0.0]
-    disponible_inv_lst = [entrada + gastos_compra]
-    total_invertido_lst = [entrada + gastos_compra]
-    inversion_acumulada_lst = [entrada + gastos_compra]
-    patrimonio_alq_lst = [entrada + gastos_compra]
-
-    inversion_inquilino = entrada + gastos_compra
-    capital_invertido = entrada + gastos_compra
-    gasto_acumulado = entrada + gastos_compra
-    gasto_alquiler_acum = 0.0
-
-    for year in range(1, horizonte_anios + 1):
-        valor_actual_vivienda = precio_vivienda * (1 + revalorizacion_vivienda_pct / 100) ** year
-        hipoteca_amortizada = amort_acum[year]
-        deuda_actual = deuda_anual[year]
-        patrimonio_actual = valor_actual_vivienda - deuda_actual
-
-        gastos_propietario = precio_vivienda * gasto_propietario_pct / 100 + seguro_hogar_eur + seguro_vida_eur
-        cuota_ano = cuota_anual if year <= plazo_hipoteca else 0.0
-        gasto_acumulado += gastos_propietario + cuota_ano
-
-        alquiler_anual = alquiler_inicial * (1 + subida_alquiler_anual_pct / 100) ** (year - 1) * 12
-        gasto_alquiler_acum += alquiler_anual
-
-        aportacion = max(cuota_ano + gastos_propietario - alquiler_anual, 0.0)
-
-        inversion_inquilino *= (1 + rentabilidad_inversion_pct / 100)
-        inversion_inquilino += aportacion
-        capital_invertido += aportacion
-
-        years.append(year)
-        precio_vivienda_lst.append(valor_actual_vivienda)
-        gastos_iniciales_lst.append(gastos_iniciales)
-        hipoteca_amortizada_lst.append(hipoteca_amortizada)
-        deuda_pendiente_lst.append(deuda_actual)
-        gastos_anuales_lst.append(gastos_propietario)
-        gastos_acumulados_lst.append(gasto_acumulado)
-        patrimonio_neto_lst.append(patrimonio_actual)
-        gasto_alquiler_anual_lst.append(alquiler_anual)
-        gasto_alq_acum_lst.append(gasto_alquiler_acum)
-        disponible_inv_lst.append(aportacion)
-        total_invertido_lst.append(capital_invertido)
-        inversion_acumulada_lst.append(inversion_inquilino)
-        patrimonio_alq_lst.append(inversion_inquilino)
-
-    df = pd.DataFrame({
-        "Año": years,
-        "Precio Vivienda (EUR)": precio_vivienda_lst,
-        "Gastos iniciales (EUR)": gastos_iniciales_lst,
-        "Hipoteca amortizada (EUR)": hipoteca_amortizada_lst,
-        "Deuda Pendiente (EUR)": deuda_pendiente_lst,
-        "Gastos anuales (EUR)": gastos_anuales_lst,
-        "Gastos acumulados (EUR)": gastos_acumulados_lst,
-        "Patrimonio neto compra (EUR)": patrimonio_neto_lst,
-        "Gasto alquiler anual (EUR)": gasto_alquiler_anual_lst,
-        "Gasto alquiler acumulado (EUR)": gasto_alq_acum_lst,
-        "Disponible inversión (EUR)": disponible_inv_lst,
-        "Total invertido (EUR)": total_invertido_lst,
-        "Inversión acumulada (EUR)": inversion_acumulada_lst,
-        "Patrimonio neto alquiler (EUR)": patrimonio_alq_lst,
-    })
-
-    resumen = {
-        "desembolso_inicial_compra": entrada + gastos_compra,
-        "costes_compra": gasto_acumulado,
-        "valor_prop_final": valor_actual_vivienda,
-        "hipoteca_pendiente": deuda_actual,
-        "patrimonio_neto_final": patrimonio_actual,
-        "inversion_inicial_alq": entrada + gastos_compra,
-        "costes_alquiler_total": gasto_alquiler_acum,
-        "capital_total_invertido": capital_invertido,
-        "valor_final_inversion": inversion_inquilino,
-        "patrimonio_neto_final_alq": inversion_inquilino,
-        "diferencia_patrimonio": inversion_inquilino - patrimonio_actual,
-        "diferencia_costes": gasto_alquiler_acum - gasto_acumulado,
-        "anios": list(range(1, horizonte_anios + 1)),
-        "patrimonio_compra": patrimonio_neto_lst[1:],
-        "inversion_alquiler": inversion_acumulada_lst[1:],
-        "coste_compra_acumulado": gastos_acumulados_lst[1:],
-        "coste_alquiler_acumulado": gasto_alq_acum_lst[1:],
-    }
+    progreso()
+    return None
+
+
+def pdf_bajo_demanda(cache, clave, resumen, df):
+    """Devuelve una función que genera el PDF al descargarlo, reutilizando el
+    ya generado para el mismo escenario."""
+    def generar():
+        from informe import generar_pdf
+        with metricas.etapa("pdf", paso=5):
+            return generar_pdf(resumen, df)
+    return lambda: cache.calcular(f"{clave}:pdf", generar)
+
+
+def exportacion_bajo_demanda(cache, clave, resultado, formato):
+    """Como ``pdf_bajo_demanda``, para la tabla anual en CSV, Parquet o Excel."""
+    def generar():
+        from exportacion import exportar_tabla
+        with metricas.etapa(formato, paso=5):
+            return exportar_tabla(resultado.tabla(), formato)
+    return lambda: cache.calcular(f"{clave}:{formato}", generar)
 
-    return resumen, df
-
-
-def generar_pdf(resumen, df):
-    """Genera un PDF con el resumen y la tabla de resultados."""
-    pdf = FPDF(orientation="L", unit="mm", format="A4")
-    pdf.add_page()
-
-    pdf.set_font("Helvetica", "B", 16)
-    pdf.cell(0, 10, "Resultados Alquiler vs Compra", ln=True, align="C")
-    pdf.ln(5)
-
-    pdf.set_font("Helvetica", "B", 12)
-    pdf.cell(0, 10, "Resumen", ln=True)
-
-    pdf.set_font("Helvetica", size=11)
-    etiquetas = {
-        "desembolso_inicial_compra": "Desembolso inicial compra",
-        "costes_compra": "Costes acumulados compra",
-        "valor_prop_final": "Valor estimado propiedad",
-        "hipoteca_pendiente": "Hipoteca pendiente",
-        "patrimonio_neto_final": "Patrimonio neto final compra",
-        "inversion_inicial_alq": "Inversión inicial alquiler",
-        "costes_alquiler_total": "Costes alquiler acumulados",
-        "capital_total_invertido": "Capital total invertido",
-        "valor_final_inversion": "Valor final inversión",
-        "patrimonio_neto_final_alq": "Patrimonio neto final alquiler",
-        "diferencia_patrimonio": "Diferencia patrimonio final",
-        "diferencia_costes": "Diferencia costes acumulados",
-    }
-    pdf.set_font("Helvetica", size=11)
-    for k, label in etiquetas.items():
-        val = resumen.get(k, "")
-        if isinstance(val, float):
-            val = f"{val:,.0f} EUR"   # <-- This removes decimals and adds thousands separator
-        pdf.cell(0, 8, f"{label}: {val}", ln=True)
-  
-    pdf.ln(5)
-    pdf.set_font("Helvetica", "B", 12)
-    pdf.cell(0, 10, "Resultados por año", ln=True)
-    pdf.set_font("Helvetica", size=7)
-
-    page_width = pdf.w - 2 * pdf.l_margin
-    col_width = page_width / len(df.columns)
-    th = pdf.font_size + 1
-
-    for col in df.columns:
-        pdf.cell(col_width, th, str(col), border=1)
-    pdf.ln(th)
-
-    for row in df.itertuples(index=False):
-      for item in row:
-          if isinstance(item, float):
-              cell_val = f"{item:,.0f}"   # <-- No decimals, thousands separator
-          else:
-              cell_val = str(item)
-          pdf.cell(col_width, th, cell_val, border=1)
-      pdf.ln(th)
-
-    pdf_content = pdf.output(dest="S")
-    if isinstance(pdf_content, bytes):  # FPDF2 returns bytes
-        pdf_content = pdf_content.decode("latin-1", errors="ignore")
-    pdf_content = pdf_content.replace("€", "EUR")
-    return pdf_content.encode("latin-1")
 
 st.markdown("""
     <style>
@@ -300,7 +169,6 @@ hide_menu_style = """
     footer {visibility: hidden;}
     </style>
 """
-import streamlit as st
 st.markdown(hide_menu_style, unsafe_allow_html=True)
 
 # Set Streamlit page configuration
@@ -321,6 +189,20 @@ st.markdown("""<h1 style='text-align: center;'>¿Comprar o alquilar casa?</h1>""
 # Estado inicial de pasos
 if "step" not in st.session_state:
     st.session_state.step = 1
+    # Un enlace con los datos de un escenario abre directamente sus resultados
+    if any(k in st.query_params for k in CAMPOS):
+        try:
+            compra_url, alquiler_url = decodificar_escenario(st.query_params.to_dict())
+        except ValueError as e:
+            st.warning(f"El enlace no es válido: {e}")
+        else:
+            st.session_state.compra = compra_url
+            st.session_state.alquiler = alquiler_url
+            st.session_state.step = 5
+
+# Tiempos por etapa (solo si METRICAS está definida)
+ctx = get_script_run_ctx()
+metricas.iniciar(st.session_state.step, ctx.session_id if ctx else None)
 
 # Barra de progreso visual mejorada
 total_steps = 4
@@ -573,7 +455,23 @@ elif st.session_state.step == 4:
 
 # Paso 5: Mostrar herramienta interactiva
 elif st.session_state.step == 5:
+    import numpy as np
+    from amortizacion_anticipada import optimizar_amortizacion
+    from equilibrio import punto_equilibrio
+    from exportacion import exportar_tabla
+    from graficos import (figura_backtest, figura_frente, figura_hipoteca_variable,
+                          figura_montecarlo, figura_sensibilidad, grafico_costes,
+                          grafico_patrimonio)
+    from hipoteca_variable import EURIBOR, simular_hipoteca
+    from historico import COLUMNAS_CSV, DIRECTORIO, backtest_historico, cargar_series
+    from impuestos import MUNICIPALES, REGIONES, comparar_regiones
+    from montecarlo import DISTRIBUCIONES, simular_montecarlo
+    from motor import calcular_resultados
+    from optimizador import OBJETIVOS, REJILLA, optimizar_compra
+    from sensibilidad import VARIABLES as VARIABLES_SENSIBILIDAD, valores_eje
+
     st.success("✅ Datos completados. Ahora puedes ajustar variables y ver resultados interactivos.")
+    st.caption("🔗 La dirección de esta página guarda el escenario: compártela para abrir estos mismos resultados.")
 
     # Cargar variables desde la sesión
     c = st.session_state.compra
@@ -687,7 +585,24 @@ elif st.session_state.step == 5:
     st.session_state.compra = c
     st.session_state.alquiler = a
 
-    resumen, df_resultados = calcular_resultados(c, a)
+    # La URL lleva el escenario, así que se puede compartir para abrir estos resultados
+    parametros = codificar_escenario(c, a)
+    if st.query_params.to_dict() != parametros:
+        st.query_params.from_dict(parametros)
+    clave = clave_escenario(c, a)
+
+    # Reutiliza el resultado si alguna sesión ya ha calculado este escenario
+    # y, si no, recalcula solo los tramos (hipoteca, compra, alquiler,
+    # inversión) que dependen de lo que ha cambiado en esta sesión
+    if "cache_tramos" not in st.session_state:
+        st.session_state.cache_tramos = CacheTramos()
+    with metricas.etapa("calculo"):
+        resultado = cache_compartida().calcular(
+            f"{clave}:resultado",
+            lambda: calcular_resultados(c, a, st.session_state.cache_tramos),
+            tamano_resultado,
+        )
+    resumen = resultado.resumen
 
     horizonte_anios = len(resumen["anios"])
 
@@ -703,11 +618,6 @@ elif st.session_state.step == 5:
     patrimonio_neto_final_alq = resumen["patrimonio_neto_final_alq"]
     diferencia_patrimonio = resumen["diferencia_patrimonio"]
     diferencia_costes = resumen["diferencia_costes"]
-    anios = resumen["anios"]
-    patrimonio_compra = resumen["patrimonio_compra"]
-    inversion_alquiler = resumen["inversion_alquiler"]
-    coste_compra_acumulado = resumen["coste_compra_acumulado"]
-    coste_alquiler_acumulado = resumen["coste_alquiler_acumulado"]
 
     # --- Visualización tipo "caja resumen" ---
     st.markdown("""
@@ -775,26 +685,392 @@ elif st.session_state.step == 5:
         unsafe_allow_html=True,
     )
 
+    # Valores con los que comprar y alquilar empatarían al final del horizonte
+    filas_equilibrio = ""
+    with metricas.etapa("equilibrio"):
+        for var, unidad in (("rentabilidad_inversion_pct", "%"),
+                            ("revalorizacion_vivienda_pct", "%"),
+                            ("alquiler_inicial", " €")):
+            valor = punto_equilibrio(c, a, var)[0]
+            texto = f"{valor:,.2f}{unidad}" if not np.isnan(valor) else "sin empate en el rango"
+            filas_equilibrio += (
+                f"<span class='res-label2'>{VARIABLES_SENSIBILIDAD[var][1]}:</span>"
+                f"<span class='res-value'>{texto}</span><br>"
+            )
+    st.markdown(
+        f"<div class='res-box' style='text-align:center;'>"
+        f"<div class='res-title black'>⚖️ Punto de equilibrio</div>"
+        f"{filas_equilibrio}"
+        f"</div>",
+        unsafe_allow_html=True,
+    )
+
+    # Los PNG se comparten entre sesiones por escenario
+    with metricas.etapa("graficos"):
+        png_patrimonio = cache_compartida().calcular(
+            f"{clave}:patrimonio", lambda: grafico_patrimonio(resumen))
+        png_costes = cache_compartida().calcular(
+            f"{clave}:costes", lambda: grafico_costes(resumen))
+
     st.markdown("<h3 style='text-align: center;'>📈 Evolución del patrimonio</h3>",unsafe_allow_html=True)
-    fig, ax = plt.subplots()
-    ax.plot(anios, patrimonio_compra, label="Compra")
-    ax.plot(anios, inversion_alquiler, label="Alquilar e invertir")
-    ax.set_xlabel("Años")
-    ax.set_ylabel("Patrimonio (€)")
-    ax.legend()
-    ax.yaxis.set_major_formatter(mticker.StrMethodFormatter('{x:,.0f}'))
-    st.pyplot(fig)
+    st.image(png_patrimonio, width="stretch")
 
     st.markdown("<h3 style='text-align: center;'>💸 Coste acumulado</h3>",unsafe_allow_html=True)
-    fig2, ax2 = plt.subplots()
-    ax2.plot(anios, coste_compra_acumulado, label="Coste Compra")
-    ax2.plot(anios, coste_alquiler_acumulado, label="Coste Alquiler")
-    ax2.set_xlabel("Años")
-    ax2.set_ylabel("Coste acumulado (€)")
-    ax2.legend()
-    ax2.yaxis.set_major_formatter(mticker.StrMethodFormatter('{x:,.0f}'))
-    st.pyplot(fig2)
-    
+    st.image(png_costes, width="stretch")
+
+    with st.expander("🎲 Simulación Monte Carlo"):
+        st.markdown(
+            "Simula miles de escenarios en los que la revalorización, la rentabilidad "
+            "y la subida del alquiler varían cada año alrededor de los valores elegidos."
+        )
+        col1, col2, col3 = st.columns(3)
+        desv_vivienda = col1.number_input(
+            "Volatilidad vivienda (%)", 0.0, 20.0,
+            DISTRIBUCIONES["revalorizacion_vivienda_pct"]["desviacion"], key="mc_desv_vivienda")
+        desv_inversion = col2.number_input(
+            "Volatilidad inversión (%)", 0.0, 40.0,
+            DISTRIBUCIONES["rentabilidad_inversion_pct"]["desviacion"], key="mc_desv_inversion")
+        desv_alquiler = col3.number_input(
+            "Volatilidad alquiler (%)", 0.0, 10.0,
+            DISTRIBUCIONES["subida_alquiler_anual_pct"]["desviacion"], key="mc_desv_alquiler")
+        col1, col2 = st.columns(2)
+        n_trayectorias = col1.selectbox(
+            "Número de simulaciones", [10_000, 100_000, 1_000_000], index=1,
+            format_func=lambda n: f"{n:,}", key="mc_trayectorias")
+        semilla = col2.number_input("Semilla", 0, 2**31 - 1, 42, key="mc_semilla",
+                                    help="Con la misma semilla se obtiene el mismo resultado.")
+        if st.button("Simular", key="mc_simular"):
+            # La simulación va a la cola: la página sigue respondiendo mientras tanto
+            if "mc_trabajo" in st.session_state:
+                cola_trabajos().cancelar(st.session_state.mc_trabajo)
+            st.session_state.mc_trabajo = cola_trabajos().enviar(
+                simular_montecarlo, dict(c), dict(a), nombre="montecarlo",
+                n_trayectorias=n_trayectorias, semilla=int(semilla),
+                distribuciones={
+                    "revalorizacion_vivienda_pct": {"desviacion": desv_vivienda},
+                    "rentabilidad_inversion_pct": {"desviacion": desv_inversion},
+                    "subida_alquiler_anual_pct": {"desviacion": desv_alquiler},
+                },
+            )
+            st.session_state.mc_clave = clave
+        terminado = seguir_trabajo("mc_trabajo")
+        if terminado is not None:
+            st.session_state.montecarlo = (st.session_state.mc_clave, terminado)
+
+        # Solo se muestra la simulación del escenario actual
+        guardado = st.session_state.get("montecarlo")
+        if guardado is not None and guardado[0] == clave:
+            mc = guardado[1]
+            st.markdown(
+                f"Alquilar e invertir acaba con más patrimonio en el "
+                f"<b>{mc['prob_alquiler_mejor']:.0%}</b> de las simulaciones.",
+                unsafe_allow_html=True,
+            )
+            fig3 = figura_montecarlo(mc)
+            st.pyplot(fig3)
+
+    with st.expander("🏦 Hipoteca variable o mixta"):
+        st.markdown(
+            "Calcula la hipoteca con un tipo que se revisa cada año (Euríbor + diferencial) "
+            "sobre miles de trayectorias del Euríbor. En la mixta, los primeros años van "
+            "al interés de la hipoteca de arriba. El resto de resultados usa ese tipo fijo."
+        )
+        col1, col2, col3 = st.columns(3)
+        modalidad = col1.selectbox(
+            "Tipo de hipoteca", ["variable", "mixta"],
+            format_func=str.capitalize, key="hv_modalidad")
+        diferencial = col2.number_input("Diferencial (%)", 0.0, 5.0, 0.8, key="hv_diferencial")
+        anios_fijos = 0
+        if modalidad == "mixta":
+            anios_fijos = col3.slider("Años a tipo fijo", 1, max(int(c['plazo_hipoteca']) - 1, 1),
+                                      min(5, max(int(c['plazo_hipoteca']) - 1, 1)), key="hv_anios_fijos")
+        col1, col2, col3 = st.columns(3)
+        euribor_inicial = col1.number_input(
+            "Euríbor actual (%)", -1.0, 10.0, EURIBOR["inicial"], key="hv_euribor_inicial")
+        euribor_media = col2.number_input(
+            "Euríbor a largo plazo (%)", -1.0, 10.0, EURIBOR["media"], key="hv_euribor_media")
+        euribor_volatilidad = col3.number_input(
+            "Volatilidad anual (%)", 0.0, 5.0, EURIBOR["volatilidad"], key="hv_euribor_volatilidad")
+        fichero_euribor = st.file_uploader(
+            "Trayectorias propias del Euríbor (opcional)", type="csv", key="hv_fichero",
+            help="CSV sin cabecera: una fila por trayectoria y una columna por año, en %.")
+
+        if st.checkbox("Calcular", key="hv_mostrar"):
+            parametros_hv = (clave, modalidad, diferencial, anios_fijos, euribor_inicial,
+                             euribor_media, euribor_volatilidad,
+                             fichero_euribor.file_id if fichero_euribor else None)
+            guardado = st.session_state.get("hipoteca_variable")
+            if guardado is None or guardado[0] != parametros_hv:
+                import pandas as pd
+                try:
+                    euribor = None
+                    if fichero_euribor is not None:
+                        euribor = pd.read_csv(fichero_euribor, header=None).to_numpy(np.float64)
+                    with metricas.etapa("hipoteca_variable"):
+                        guardado = (parametros_hv, simular_hipoteca(
+                            c, 10_000, modalidad, diferencial, anios_fijos, euribor=euribor,
+                            parametros_euribor={"inicial": euribor_inicial,
+                                                "media": euribor_media,
+                                                "volatilidad": euribor_volatilidad},
+                            horizonte=int(c['plazo_hipoteca']), semilla=0,
+                        ))
+                except (pd.errors.ParserError, pd.errors.EmptyDataError, ValueError) as e:
+                    guardado = None
+                    st.error(f"No se puede calcular la hipoteca: {e}")
+                st.session_state.hipoteca_variable = guardado
+            if guardado is not None:
+                hv = guardado[1]
+                intereses = hv["intereses_totales"]
+                st.markdown(
+                    f"Intereses totales: <b>{intereses[50]:,.0f} €</b> en la mediana "
+                    f"(entre {intereses[5]:,.0f} € y {intereses[95]:,.0f} € en el 90% de las "
+                    f"{hv['n_trayectorias']:,} trayectorias), frente a "
+                    f"<b>{hv['intereses_fija']:,.0f} €</b> a tipo fijo.",
+                    unsafe_allow_html=True,
+                )
+                st.pyplot(figura_hipoteca_variable(hv))
+
+    with st.expander("💶 Amortización anticipada"):
+        st.markdown(
+            "Si cada año te sobra dinero además de la cuota, ¿es mejor adelantar hipoteca "
+            "(reduciendo plazo o cuota) o invertirlo? Busca el plan, año a año, que deja "
+            "más patrimonio al final del horizonte; lo que no se amortiza se invierte."
+        )
+        col1, col2 = st.columns(2)
+        excedente = col1.number_input(
+            "Excedente anual (€)", 0, 100000, 3000, step=500, key="aa_excedente")
+        comision = col2.number_input(
+            "Comisión por amortizar (%)", 0.0, 2.0, 0.0, step=0.25, key="aa_comision",
+            help="Por ley, como mucho un 2% (tipo fijo, primeros 10 años) o un 0,25% (variable).")
+        if st.checkbox("Calcular", key="aa_mostrar"):
+            parametros_aa = (clave, excedente, comision)
+            guardado = st.session_state.get("amortizacion_anticipada")
+            if guardado is None or guardado[0] != parametros_aa:
+                with metricas.etapa("amortizacion_anticipada"):
+                    guardado = (parametros_aa, optimizar_amortizacion(
+                        c, a, float(excedente), comision_pct=comision))
+                st.session_state.amortizacion_anticipada = guardado
+            plan = guardado[1]
+            ganancia = plan["patrimonio"] - plan["patrimonio_invertir"]
+            if plan["importes"].sum() <= 0 or ganancia <= 0:
+                st.markdown("Con estos datos conviene <b>invertir todo el excedente</b> "
+                            "en lugar de amortizar.", unsafe_allow_html=True)
+            else:
+                anios_plazo, meses_plazo = divmod(int(plan["meses"]), 12)
+                st.markdown(
+                    f"El mejor plan deja <b>{plan['patrimonio']:,.0f} €</b> de patrimonio, "
+                    f"<b>{ganancia:,.0f} €</b> más que invertirlo todo, y liquida la hipoteca "
+                    f"en {anios_plazo} años y {meses_plazo} meses "
+                    f"({plan['evaluados']:,} planes evaluados).",
+                    unsafe_allow_html=True,
+                )
+                import pandas as pd
+                amortiza = plan["importes"] > 0
+                st.dataframe(pd.DataFrame({
+                    "Año": np.flatnonzero(amortiza) + 1,
+                    "Amortización (€)": plan["importes"][amortiza].round(0),
+                    "Reduce": ["Plazo" if m == "plazo" else "Cuota"
+                               for m, si in zip(plan["modos"], amortiza) if si],
+                }), hide_index=True)
+
+    with st.expander("🧾 Impuestos por comunidad autónoma"):
+        st.markdown(
+            "Sustituye los impuestos incluidos en los gastos por los de cada comunidad: ITP "
+            "(o IVA y AJD en obra nueva) al comprar, IBI cada año, plusvalía municipal al "
+            "vender e IRPF al rescatar la inversión. Tipos generales orientativos, sin "
+            "reducciones."
+        )
+        col1, col2 = st.columns(2)
+        region = col1.selectbox("Comunidad autónoma", REGIONES,
+                                index=REGIONES.index("Comunidad de Madrid"), key="imp_region")
+        obra_nueva = col2.checkbox("Obra nueva", False, key="imp_obra_nueva")
+        col1, col2, col3 = st.columns(3)
+        gastos_sin_impuestos = col1.number_input(
+            "Gastos de compra sin impuestos (%)", 0.0, 10.0, 2.0, step=0.5,
+            key="imp_gastos_compra", help="Notaría, registro, gestoría, tasación...")
+        propietario_sin_ibi = col2.number_input(
+            "Gastos propietario sin IBI (%)", 0.0, 5.0, 0.7, step=0.1,
+            key="imp_gastos_propietario", help="Comunidad, mantenimiento, basuras...")
+        tipo_ibi = col3.number_input(
+            "Tipo de IBI (% del valor catastral)", 0.0, 1.5, MUNICIPALES["tipo_ibi_pct"],
+            step=0.05, key="imp_tipo_ibi")
+
+        if st.checkbox("Calcular", key="imp_mostrar"):
+            with metricas.etapa("impuestos"):
+                regiones = comparar_regiones(
+                    {**c, "gastos_compra_pct": gastos_sin_impuestos,
+                     "gasto_propietario_pct": propietario_sin_ibi},
+                    a, obra_nueva, {"tipo_ibi_pct": tipo_ibi})
+            fila = regiones.iloc[REGIONES.index(region)]
+            ganador = "alquilar e invertir" if fila["Diferencia (€)"] > 0 else "comprar"
+            st.markdown(
+                f"En {region}, con impuestos, conviene <b>{ganador}</b>: "
+                f"{abs(fila['Diferencia (€)']):,.0f} € de diferencia al horizonte, tras pagar "
+                f"{fila['Impuestos compra (€)']:,.0f} € al comprar.",
+                unsafe_allow_html=True,
+            )
+            st.dataframe(regiones.round(0), hide_index=True)
+
+    with st.expander("📜 Backtest histórico"):
+        st.markdown(
+            "Repite la comparación empezando en cada año del pasado con la revalorización, "
+            "la subida del alquiler y la rentabilidad que hubo de verdad a partir de entonces."
+        )
+        fichero_historico = st.file_uploader(
+            "Series históricas", type="csv", key="bt_fichero",
+            help=f"CSV con las columnas {', '.join(COLUMNAS_CSV)}: índices de precios de "
+                 "vivienda y alquiler, rentabilidad total de la inversión (%) y tipo de las "
+                 "hipotecas nuevas (%), un año por fila.")
+        tipo_historico = st.checkbox(
+            "Hipoteca al tipo de cada año de inicio", True, key="bt_tipo_historico",
+            help="Si no, todas las cohortes usan el interés de la hipoteca de arriba.")
+
+        if fichero_historico is not None:
+            parametros_bt = (clave, fichero_historico.file_id, tipo_historico)
+            guardado = st.session_state.get("backtest_historico")
+            if guardado is None or guardado[0] != parametros_bt:
+                import hashlib
+                contenido = fichero_historico.getvalue()
+                # El CSV se guarda por contenido para que su versión mapeada se reutilice
+                ruta = os.path.join(DIRECTORIO, hashlib.sha1(contenido).hexdigest() + ".csv")
+                if not os.path.exists(ruta):
+                    os.makedirs(DIRECTORIO, exist_ok=True)
+                    with open(ruta, "wb") as f:
+                        f.write(contenido)
+                try:
+                    with metricas.etapa("backtest_historico"):
+                        guardado = (parametros_bt, backtest_historico(
+                            c, a, cargar_series(ruta), tipo_historico=tipo_historico))
+                except ValueError as e:
+                    guardado = None
+                    st.error(f"No se puede hacer el backtest: {e}")
+                st.session_state.backtest_historico = guardado
+            if guardado is not None:
+                bt = guardado[1]
+                horizonte = min(int(a['horizonte_anios']), len(bt["horizontes"]))
+                st.markdown(
+                    f"Con un horizonte de {horizonte} años, alquilar e invertir habría acabado "
+                    f"con más patrimonio en el <b>{bt['prob_alquiler_mejor'][horizonte - 1]:.0%}"
+                    f"</b> de las {bt['cohortes'][horizonte - 1]} cohortes "
+                    f"({bt['inicios'][0]}-{bt['inicios'][bt['cohortes'][horizonte - 1] - 1]}).",
+                    unsafe_allow_html=True,
+                )
+                st.pyplot(figura_backtest(bt))
+
+    with st.expander("🎯 Optimizar la compra"):
+        st.markdown(
+            "Prueba todas las combinaciones de los datos elegidos y muestra las que no "
+            "se pueden mejorar en patrimonio sin perder liquidez (los ahorros que quedan "
+            "tras la entrada y los gastos de compra), al horizonte del escenario."
+        )
+        # Alargar el horizonte no cambia la liquidez: el frente se quedaría con el último
+        variables = [v for v in VARIABLES_SENSIBILIDAD if v != "horizonte_anios"]
+        variables_opt = st.multiselect(
+            "Datos a optimizar", variables, default=list(REJILLA),
+            format_func=lambda v: VARIABLES_SENSIBILIDAD[v][1], key="opt_variables")
+        rejilla = {}
+        col1, col2 = st.columns(2)
+        for i, var in enumerate(variables_opt):
+            _, etiqueta, minimo, maximo, entero = VARIABLES_SENSIBILIDAD[var]
+            rango = (col1, col2)[i % 2].slider(etiqueta, minimo, maximo, (minimo, maximo),
+                                                 key=f"opt_rango_{var}")
+            puntos = int(rango[1] - rango[0]) + 1 if entero else 21
+            rejilla[var] = np.unique(valores_eje(var, *rango, puntos=puntos))
+        col1, col2, col3 = st.columns(3)
+        objetivo = col1.selectbox(
+            "Patrimonio", list(OBJETIVOS), index=1,
+            format_func=lambda o: OBJETIVOS[o][0], key="opt_objetivo",
+            help="La ventaja frente a alquilar descuenta lo que rendiría invertir "
+                 "la entrada y la diferencia de cuotas.")
+        ahorros = col2.number_input(
+            "Ahorros disponibles (€)", 0, 5_000_000,
+            int(round(desembolso_inicial_compra * 1.5, -3)), step=5000, key="opt_ahorros",
+            help="Además, la entrada y los gastos de compra no pueden superarlos.")
+        cuota_maxima = col3.number_input(
+            "Cuota máxima (€/mes, 0 = sin límite)", 0, 20000, 0, step=100,
+            key="opt_cuota_maxima")
+
+        if variables_opt and st.checkbox("Calcular", key="opt_mostrar"):
+            parametros_opt = (clave, tuple((v, tuple(x)) for v, x in rejilla.items()),
+                              objetivo, ahorros, cuota_maxima)
+            guardado = st.session_state.get("optimizador")
+            if ((guardado is None or guardado[0] != parametros_opt)
+                    and st.session_state.get("opt_parametros") != parametros_opt):
+                if "opt_trabajo" in st.session_state:
+                    cola_trabajos().cancelar(st.session_state.opt_trabajo)
+                st.session_state.opt_trabajo = cola_trabajos().enviar(
+                    optimizar_compra, dict(c), dict(a), rejilla, objetivo, nombre="optimizador",
+                    ahorros=float(ahorros), cuota_maxima=cuota_maxima or None,
+                    desembolso_maximo=float(ahorros))
+                st.session_state.opt_parametros = parametros_opt
+            terminado = seguir_trabajo("opt_trabajo")
+            if terminado is not None:
+                guardado = (st.session_state.opt_parametros, terminado)
+                st.session_state.optimizador = guardado
+            elif ("opt_trabajo" not in st.session_state
+                    and st.session_state.get("opt_parametros") == parametros_opt
+                    and (guardado is None or guardado[0] != parametros_opt)):
+                # Cancelado, con error o ya descartado: no se relanza solo
+                if st.button("Volver a calcular", key="opt_reintentar"):
+                    del st.session_state.opt_parametros
+                    st.rerun()
+
+            if guardado is not None and guardado[0] == parametros_opt:
+                opt = guardado[1]
+                frente = opt["frente"]
+                st.markdown(
+                    f"{opt['factibles']:,} de {opt['combinaciones']:,} combinaciones cumplen "
+                    f"las restricciones y el frente tiene <b>{len(frente):,}</b>.",
+                    unsafe_allow_html=True,
+                )
+                if len(frente) == 1:
+                    st.caption("No hay que elegir entre patrimonio y liquidez: esta "
+                               "combinación gana en las dos a todas las demás.")
+                if len(frente):
+                    st.pyplot(figura_frente(frente, objetivo, OBJETIVOS[objetivo][0]))
+                    st.dataframe(frente.rename(columns={
+                        **{v: VARIABLES_SENSIBILIDAD[v][1] for v in rejilla},
+                        objetivo: OBJETIVOS[objetivo][0], "liquidez": "Liquidez (€)",
+                        "desembolso": "Desembolso inicial (€)", "cuota": "Cuota mensual (€)",
+                    }).round(2), hide_index=True)
+                    st.download_button(
+                        "📥 Descargar el frente como CSV",
+                        lambda: exportar_tabla(frente, "csv"),
+                        "alquiler_vs_compra_frente.csv",
+                        "text/csv",
+                        on_click="ignore",
+                        key="opt_descargar",
+                    )
+
+    with st.expander("🗺️ Mapa de sensibilidad"):
+        st.markdown(
+            "Muestra la diferencia de patrimonio final (alquiler - compra) al variar "
+            "dos datos a la vez. La línea negra marca dónde comprar y alquilar empatan."
+        )
+        variables = list(VARIABLES_SENSIBILIDAD)
+        col1, col2 = st.columns(2)
+        var_x = col1.selectbox(
+            "Eje horizontal", variables, index=variables.index("tipo_interes_hipoteca"),
+            format_func=lambda v: VARIABLES_SENSIBILIDAD[v][1], key="sens_var_x")
+        var_y = col2.selectbox(
+            "Eje vertical", [v for v in variables if v != var_x],
+            format_func=lambda v: VARIABLES_SENSIBILIDAD[v][1], key="sens_var_y")
+        _, etiqueta_x, min_x, max_x, _ = VARIABLES_SENSIBILIDAD[var_x]
+        _, etiqueta_y, min_y, max_y, _ = VARIABLES_SENSIBILIDAD[var_y]
+        rango_x = col1.slider(etiqueta_x, min_x, max_x, (min_x, max_x), key=f"sens_rango_{var_x}")
+        rango_y = col2.slider(etiqueta_y, min_y, max_y, (min_y, max_y), key=f"sens_rango_{var_y}")
+
+        if st.checkbox("Mostrar mapa", key="sens_mostrar"):
+            valores_x = valores_eje(var_x, *rango_x)
+            valores_y = valores_eje(var_y, *rango_y)
+            with metricas.etapa("sensibilidad"):
+                malla = cache_malla().diferencia(c, a, var_x, valores_x, var_y, valores_y)
+
+            actual = {**c, **a}
+            fig4 = figura_sensibilidad(valores_x, valores_y, malla, etiqueta_x, etiqueta_y,
+                                       punto=(actual.get(var_x), actual.get(var_y)))
+            st.pyplot(fig4)
+
 
     if "email_confirmed" not in st.session_state:
         st.session_state.email_confirmed = False
@@ -806,11 +1082,9 @@ elif st.session_state.step == 5:
             key="email_input",
         )
         if st.button("Enviar email", key="send_email"):
-            if email:
+            if normalizar_email(email):
                 try:
-                    email_path = "emails.txt"
-                    with open(email_path, "a") as f:
-                        f.write(email + "\n")
+                    almacen_emails().guardar(email)
                     st.session_state.email_confirmed = True
                     st.success("Descarga habilitada.")
                 except Exception as e:
@@ -820,16 +1094,30 @@ elif st.session_state.step == 5:
 
     
     if st.session_state.email_confirmed:
+        from exportacion import FORMATOS, formatos_disponibles
+        # Las descargas solo se generan al pulsar el botón y se comparten por escenario
+        nombres_formato = {"csv": "CSV", "parquet": "Parquet", "xlsx": "Excel"}
+        formato = st.selectbox(
+            "Formato de los resultados",
+            formatos_disponibles(),
+            format_func=nombres_formato.get,
+            key="formato_descarga",
+        )
+        tipo_mime, extension = FORMATOS[formato]
         st.download_button(
-            "📥 Descargar resultados como CSV",
-            df_resultados.to_csv(index=False),
-            "alquiler_vs_compra_resultados.csv",
-            "text/csv",
+            f"📥 Descargar resultados como {nombres_formato[formato]}",
+            exportacion_bajo_demanda(cache_compartida(), clave, resultado, formato),
+            "alquiler_vs_compra_resultados" + extension,
+            tipo_mime,
+            on_click="ignore",
         )
-        pdf_bytes = generar_pdf(resumen, df_resultados)
         st.download_button(
             "📄 Descargar reporte en PDF",
-            pdf_bytes,
+            pdf_bajo_demanda(cache_compartida(), clave,
+                             resumen, resultado.tabla()),
             "alquiler_vs_compra_resultados.pdf",
             "application/pdf",
+            on_click="ignore",
         )
+
+metricas.terminar()
@@ -0,0 +1,210 @@
+"""Amortización anticipada: ¿adelantar hipoteca o invertir el excedente?
+
+Cada año se dispone de un ``excedente`` (euros) además de la cuota. Un plan
+decide, año a año, qué parte del excedente se destina a amortizar y si la
+amortización reduce el plazo (se mantiene la cuota) o la cuota (se mantiene
+el plazo). Lo que no se amortiza se invierte a la rentabilidad del
+escenario, igual que lo que se deja de pagar de cuota respecto a la
+hipoteca original, así que todos los planes gastan lo mismo cada año y se
+comparan por el patrimonio final: valor de la vivienda menos la deuda más
+la inversión. La deuda son las cuotas pendientes (capital más intereses
+futuros), como en ``calcular_resultados``.
+
+``evaluar_planes`` calcula muchos planes a la vez: recorre los años y, dentro
+de cada año, el capital a tipo fijo tiene forma cerrada, así que el coste no
+depende de los meses. ``optimizar_amortizacion`` busca el mejor plan sin
+enumerar todas las combinaciones (que crecen como ``(2 * niveles) ** años``):
+evalúa en bloque todos los planes con un importe constante durante un tramo
+de años y mejora el mejor cambiando año a año importe y modo mientras mejore.
+"""
+import numpy as np
+import numpy_financial as npf
+
+from hipoteca import capital_tras
+
+
+MODOS = ("plazo", "cuota")
+
+
+def _entradas(c, a):
+    precio = c["precio_vivienda"]
+    capital = precio - precio * c["entrada_pct"] / 100
+    meses = int(c["plazo_hipoteca"]) * 12
+    tasa = c["tipo_interes_hipoteca"] / 100 / 12
+    horizonte = int(a.get("horizonte_anios", c["plazo_hipoteca"]))
+    valor_vivienda = precio * (1 + c["revalorizacion_vivienda_pct"] / 100) ** horizonte
+    return capital, meses, tasa, horizonte, valor_vivienda
+
+
+def _mes_liquidacion(saldo, tasa, cuota):
+    """Número de la cuota con la que se liquida la deuda (inf si nunca)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if tasa == 0:
+            meses = saldo / cuota
+        else:
+            meses = np.log(cuota / (cuota - saldo * tasa)) / np.log1p(tasa)
+        meses = np.where((cuota > saldo * tasa) & (cuota > 0), meses, np.inf)
+    # Evita que el redondeo añada una cuota de más cuando el saldo cuadra justo
+    return np.ceil(meses - 1e-9)
+
+
+def evaluar_planes(c, a, excedente: float, fracciones, reducir_plazo,
+                   comision_pct: float = 0.0):
+    """Evalúa N planes de amortización a la vez.
+
+    ``fracciones`` (N, años) es la parte del excedente que se amortiza al
+    empezar cada año (0 a 1) y ``reducir_plazo`` (N, años) si esa
+    amortización reduce el plazo (``True``) o la cuota. La comisión se paga
+    del mismo excedente. Devuelve un diccionario con arrays (N,):
+    ``patrimonio`` final, ``inversion``, ``deuda`` (cuotas pendientes),
+    ``capital`` pendiente, ``intereses`` pagados, ``amortizado`` y ``meses``
+    hasta liquidar la hipoteca; e
+    ``importes`` (N, años) con lo amortizado cada año.
+    """
+    capital, meses, tasa, horizonte, valor_vivienda = _entradas(c, a)
+    g = a["rentabilidad_inversion_pct"] / 100
+    fracciones = np.clip(np.atleast_2d(np.asarray(fracciones, dtype=np.float64)), 0.0, 1.0)
+    reducir_plazo = np.broadcast_to(np.asarray(reducir_plazo, dtype=bool), fracciones.shape)
+    n = fracciones.shape[0]
+    if fracciones.shape[1] < horizonte:
+        raise ValueError(f"los planes tienen {fracciones.shape[1]} años y el horizonte es {horizonte}")
+
+    cuota_original = float(npf.pmt(tasa, meses, -capital))
+    saldo = np.full(n, capital)
+    cuota = np.full(n, cuota_original)
+    inversion = np.zeros(n)
+    intereses = np.zeros(n)
+    liquidada = np.full(n, float(meses))
+    importes = np.zeros((n, horizonte))
+
+    for anio in range(horizonte):
+        transcurridos = 12 * anio
+        restantes = meses - transcurridos
+        aportacion = np.full(n, float(excedente))
+        liberado = 0.0
+        if restantes > 0:
+            # Amortización al empezar el año, con su comisión
+            importe = np.minimum(fracciones[:, anio] * excedente / (1 + comision_pct / 100), saldo)
+            importes[:, anio] = importe
+            # Si la amortización cubre toda la deuda, se liquida al empezar el año
+            liquidada = np.where((saldo > 0) & (importe >= saldo), transcurridos, liquidada)
+            saldo = saldo - importe
+            aportacion -= importe * (1 + comision_pct / 100)
+            recalculada = np.where(saldo > 0, npf.pmt(tasa, restantes, -saldo), 0.0)
+            cuota = np.where(reducir_plazo[:, anio] & (saldo > 0), cuota, recalculada)
+
+            # Cuotas del año; si la deuda se liquida antes, la última es parcial
+            k = min(12, restantes)
+            final = _mes_liquidacion(saldo, tasa, cuota)
+            termina = (final <= k) & (saldo > 0)
+            previo = np.where(termina, final - 1, k)
+            saldo_previo = capital_tras(saldo, tasa, cuota, previo)
+            pagado = np.where(termina, cuota * previo + saldo_previo * (1 + tasa),
+                              np.where(saldo > 0, cuota * k, 0.0))
+            nuevo = np.where(termina | (saldo <= 0), 0.0, np.maximum(saldo_previo, 0.0))
+            liquidada = np.where(termina, transcurridos + final, liquidada)
+            intereses += pagado - (saldo - nuevo)
+            saldo = nuevo
+            cuota = np.where(saldo > 0, cuota, 0.0)
+            # Lo que no se paga respecto a la cuota original se invierte a final de año
+            liberado = cuota_original * k - pagado
+        inversion = (inversion + aportacion) * (1 + g) + liberado
+
+    # Lo que sigue pendiente al acabar el horizonte se liquida con la cuota vigente
+    pendiente = saldo > 0
+    final = _mes_liquidacion(saldo[pendiente], tasa, cuota[pendiente])
+    liquidada[pendiente] = np.minimum(12 * horizonte + final, meses)
+    # Deuda como cuotas pendientes: las completas más la última, parcial
+    deuda = np.zeros(n)
+    deuda[pendiente] = cuota[pendiente] * (final - 1) + capital_tras(
+        saldo[pendiente], tasa, cuota[pendiente], final - 1) * (1 + tasa)
+
+    return {
+        "patrimonio": valor_vivienda - deuda + inversion,
+        "inversion": inversion,
+        "deuda": deuda,
+        "capital": saldo,
+        "intereses": intereses,
+        "amortizado": importes.sum(axis=1),
+        "importes": importes,
+        "meses": liquidada,
+    }
+
+
+def _planes_tramo(anios: int, niveles):
+    """Planes con un mismo importe y modo en cada tramo de años [inicio, fin)."""
+    inicio, fin = np.triu_indices(anios + 1, k=1)
+    columnas = np.arange(anios)
+    en_tramo = (columnas >= inicio[:, None]) & (columnas < fin[:, None])
+    fracciones = (en_tramo[None, :, :] * niveles[1:, None, None]).reshape(-1, anios)
+    fracciones = np.concatenate([np.zeros((1, anios)), fracciones, fracciones])
+    reducir_plazo = np.zeros(fracciones.shape, dtype=bool)
+    reducir_plazo[: 1 + (len(fracciones) - 1) // 2] = True
+    return fracciones, reducir_plazo
+
+
+def optimizar_amortizacion(c, a, excedente: float, niveles: int = 11,
+                           comision_pct: float = 0.0, max_pasadas: int = 100):
+    """Plan de amortización anticipada que maximiza el patrimonio final.
+
+    Los importes de cada año son ``niveles`` fracciones del excedente entre
+    0 y 1. Primero evalúa a la vez todos los planes que amortizan un mismo
+    importe con un mismo modo durante un tramo de años consecutivos; después,
+    en cada pasada, prueba para cada año todos los importes y modos dejando
+    el resto del mejor plan igual y aplica el cambio que más mejora, hasta
+    que ninguno mejora o se agotan las ``max_pasadas``.
+
+    Devuelve un diccionario con el plan (``fracciones``, ``importes`` y
+    ``modos`` por año), su ``patrimonio`` final, ``intereses``, ``meses``
+    hasta liquidar la hipoteca, ``patrimonio_invertir`` (no amortizar nada e
+    invertirlo todo) y ``evaluados``, el número de planes evaluados.
+    """
+    _, meses, _, horizonte, _ = _entradas(c, a)
+    # Solo se puede amortizar mientras dure la hipoteca
+    anios = min(horizonte, -(-meses // 12))
+    grados = np.linspace(0.0, 1.0, niveles)
+
+    def completar(fracciones, reducir_plazo):
+        relleno = ((0, 0), (0, horizonte - anios))
+        return np.pad(fracciones, relleno), np.pad(reducir_plazo, relleno, constant_values=True)
+
+    fracciones, reducir_plazo = _planes_tramo(anios, grados)
+    resultado = evaluar_planes(c, a, excedente, *completar(fracciones, reducir_plazo), comision_pct)
+    evaluados = len(fracciones)
+    patrimonio_invertir = float(resultado["patrimonio"][0])
+    mejor = int(np.argmax(resultado["patrimonio"]))
+    plan = fracciones[mejor].copy()
+    modos = reducir_plazo[mejor].copy()
+    valor = float(resultado["patrimonio"][mejor])
+
+    # Cambios de un año: (año, fracción, reducir_plazo) para todos los años
+    anio_cambio = np.repeat(np.arange(anios), 2 * niveles)
+    fraccion_cambio = np.tile(np.repeat(grados, 2), anios)
+    modo_cambio = np.tile([True, False], anios * niveles)
+    filas = np.arange(len(anio_cambio))
+    for _ in range(max_pasadas):
+        candidatos = np.repeat(plan[None, :], len(filas), axis=0)
+        candidatos_modo = np.repeat(modos[None, :], len(filas), axis=0)
+        candidatos[filas, anio_cambio] = fraccion_cambio
+        candidatos_modo[filas, anio_cambio] = modo_cambio
+        patrimonio = evaluar_planes(c, a, excedente, *completar(candidatos, candidatos_modo),
+                                    comision_pct)["patrimonio"]
+        evaluados += len(filas)
+        i = int(np.argmax(patrimonio))
+        if patrimonio[i] <= valor + 1e-12 * abs(valor):
+            break
+        plan, modos, valor = candidatos[i], candidatos_modo[i], float(patrimonio[i])
+
+    final = evaluar_planes(c, a, excedente, *completar(plan[None, :], modos[None, :]), comision_pct)
+    importes = final["importes"][0]
+    return {
+        "fracciones": np.pad(plan, (0, horizonte - anios)),
+        "importes": importes,
+        "modos": [MODOS[0] if m else MODOS[1] for m in np.pad(modos, (0, horizonte - anios),
+                                                               constant_values=True)],
+        "patrimonio": float(final["patrimonio"][0]),
+        "intereses": float(final["intereses"][0]),
+        "meses": float(final["meses"][0]),
+        "patrimonio_invertir": patrimonio_invertir,
+        "evaluados": evaluados,
+    }
@@ -0,0 +1,253 @@
+"""Servicio JSON con los mismos cálculos que la app.
+
+Rutas (todas reciben y devuelven JSON):
+
+- ``POST /evaluar``: ``{"compra": {...}, "alquiler": {...}, "tabla": false}``
+  devuelve el ``resumen`` de ``calcular_resultados`` y, si se pide, la tabla
+  anual como lista de filas.
+- ``POST /lote``: ``{"escenarios": [{"compra": ..., "alquiler": ...}, ...]}``
+  devuelve un resumen por escenario, en el mismo orden.
+- ``POST /equilibrio``: ``{"compra", "alquiler", "variable", "minimo",
+  "maximo", "por_anio"}`` devuelve el valor de ``variable`` con el que
+  comprar y alquilar empatan (``null`` si no hay empate en el rango).
+- ``GET /salud``.
+
+Los cálculos se ejecutan en un pool de procesos para que el bucle de eventos
+siga atendiendo peticiones mientras tanto.
+
+Uso: python api.py [--host 127.0.0.1] [--puerto 8000] [--procesos N]
+"""
+import argparse
+import asyncio
+import contextlib
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from cache_resultados import CAMPOS
+from equilibrio import punto_equilibrio
+from motor_lote import COLUMNAS, calcular_resultados_lote
+from procesar_lote import CLAVES_ALQUILER, CLAVES_COMPRA, OPCIONALES
+from sensibilidad import VARIABLES
+
+MAX_LOTE = 10_000
+# Datos que tienen que ser un número entero de años
+ANIOS = ("plazo_hipoteca", "horizonte_anios")
+
+
+class PeticionInvalida(ValueError):
+    """Datos de entrada que no describen un escenario válido. ``campo`` es
+    el dato que falla (``"alquiler.horizonte_anios"``), si es uno concreto."""
+
+    def __init__(self, mensaje, campo=None):
+        super().__init__(mensaje)
+        self.campo = campo
+
+
+def _numero(v):
+    """float de Python, con NaN e infinitos como ``None`` (JSON no los admite)."""
+    v = float(v)
+    return v if math.isfinite(v) else None
+
+
+def _escenario(datos):
+    """Valida y convierte ``{"compra": ..., "alquiler": ...}`` a float.
+
+    Cada valor tiene que estar en los límites de ``CAMPOS`` (los de los
+    controles de la app) y los años (plazo y horizonte) ser enteros.
+    """
+    if not isinstance(datos, dict):
+        raise PeticionInvalida("cada escenario debe ser un objeto con compra y alquiler")
+    resultado = []
+    for nombre, claves in (("compra", CLAVES_COMPRA), ("alquiler", CLAVES_ALQUILER)):
+        parte = datos.get(nombre)
+        if not isinstance(parte, dict):
+            raise PeticionInvalida(f"falta el objeto '{nombre}'")
+        faltan = [k for k in claves if k not in OPCIONALES and k not in parte]
+        if faltan:
+            raise PeticionInvalida(f"faltan en '{nombre}': {', '.join(faltan)}")
+        valores = {}
+        for k in claves:
+            if k not in parte:
+                continue
+            _, _, minimo, maximo = CAMPOS[k]
+            entero = k in ANIOS
+            try:
+                valor = float(parte[k])
+            except (TypeError, ValueError):
+                valor = math.nan
+            if not minimo <= valor <= maximo or (entero and not valor.is_integer()):
+                raise PeticionInvalida(
+                    f"'{nombre}.{k}' debe ser un {'entero' if entero else 'número'} "
+                    f"entre {minimo} y {maximo}", campo=f"{nombre}.{k}")
+            valores[k] = valor
+        resultado.append(valores)
+    return tuple(resultado)
+
+
+def _resumen(resumen, i):
+    """Resumen del escenario ``i`` con la forma que devuelve ``calcular_resultados``."""
+    horizonte = int(np.count_nonzero(~np.isnan(resumen["patrimonio_compra"][i])))
+    salida = {}
+    for k, v in resumen.items():
+        if k == "anios":
+            salida[k] = v[:horizonte].tolist()
+        elif v.ndim == 1:
+            salida[k] = _numero(v[i])
+        else:
+            salida[k] = v[i, :horizonte].tolist()
+    return salida
+
+
+def _tabla(tabla, i, horizonte):
+    filas = np.column_stack([tabla[col][i, :horizonte + 1] for col in COLUMNAS])
+    return [dict(zip(COLUMNAS, (int(f[0]), *f[1:].tolist()))) for f in filas]
+
+
+def evaluar(escenarios, con_tabla=False):
+    """Calcula una lista de escenarios ya validados en una sola pasada."""
+    c = {k: np.array([e[0].get(k, np.nan) for e in escenarios]) for k in CLAVES_COMPRA
+         if any(k in e[0] for e in escenarios)}
+    a = {k: np.array([e[1].get(k, np.nan) for e in escenarios]) for k in CLAVES_ALQUILER
+         if any(k in e[1] for e in escenarios)}
+    # Las claves opcionales ausentes en algunos escenarios toman su valor por defecto
+    for d in (c, a):
+        for k, v in d.items():
+            if k in OPCIONALES and np.isnan(v).any():
+                defecto = c["plazo_hipoteca"] if k == "horizonte_anios" else 0.0
+                d[k] = np.where(np.isnan(v), defecto, v)
+    resumen, tabla = calcular_resultados_lote(c, a, columnas=con_tabla)
+    resultados = []
+    for i in range(len(escenarios)):
+        salida = {"resumen": _resumen(resumen, i)}
+        if con_tabla:
+            salida["tabla"] = _tabla(tabla, i, len(salida["resumen"]["anios"]))
+        resultados.append(salida)
+    return resultados
+
+
+def equilibrio(escenario, variable, minimo, maximo, por_anio):
+    valor = punto_equilibrio(*escenario, variable, minimo=minimo, maximo=maximo,
+                             por_anio=por_anio)[0]
+    return [_numero(v) for v in valor] if por_anio else _numero(valor)
+
+
+async def _calcular(request, funcion, *args):
+    pool = request.app.state.pool
+    return await asyncio.get_running_loop().run_in_executor(pool, funcion, *args)
+
+
+async def _json(request):
+    try:
+        datos = await request.json()
+    except ValueError:
+        raise PeticionInvalida("el cuerpo no es JSON válido") from None
+    if not isinstance(datos, dict):
+        raise PeticionInvalida("el cuerpo debe ser un objeto JSON")
+    return datos
+
+
+async def ruta_evaluar(request):
+    datos = await _json(request)
+    resultado = await _calcular(request, evaluar, [_escenario(datos)],
+                                bool(datos.get("tabla", False)))
+    return JSONResponse(resultado[0])
+
+
+async def ruta_lote(request):
+    datos = await _json(request)
+    escenarios = datos.get("escenarios")
+    if not isinstance(escenarios, list) or not escenarios:
+        raise PeticionInvalida("'escenarios' debe ser una lista no vacía")
+    if len(escenarios) > MAX_LOTE:
+        raise PeticionInvalida(f"como mucho {MAX_LOTE} escenarios por petición")
+    resultado = await _calcular(request, evaluar, [_escenario(e) for e in escenarios],
+                                bool(datos.get("tabla", False)))
+    return JSONResponse({"resultados": resultado})
+
+
+def _limite(datos, nombre, variable):
+    """Extremo ``nombre`` del rango de búsqueda del equilibrio, dentro de
+    los límites de ``variable`` en ``CAMPOS``, o ``None`` si no se da."""
+    if datos.get(nombre) is None:
+        return None
+    _, _, minimo, maximo = CAMPOS[variable]
+    try:
+        valor = float(datos[nombre])
+    except (TypeError, ValueError):
+        valor = math.nan
+    if not minimo <= valor <= maximo:
+        raise PeticionInvalida(f"'{nombre}' debe ser un número entre {minimo} y {maximo}",
+                               campo=nombre)
+    return valor
+
+
+async def ruta_equilibrio(request):
+    datos = await _json(request)
+    variable = datos.get("variable")
+    if variable not in VARIABLES or VARIABLES[variable][4]:
+        continuas = [v for v, d in VARIABLES.items() if not d[4]]
+        raise PeticionInvalida(f"'variable' debe ser una de: {', '.join(continuas)}")
+    minimo = _limite(datos, "minimo", variable)
+    maximo = _limite(datos, "maximo", variable)
+    _, _, desde, hasta = CAMPOS[variable]
+    if (desde if minimo is None else minimo) >= (hasta if maximo is None else maximo):
+        raise PeticionInvalida("'minimo' debe ser menor que 'maximo'",
+                               campo="minimo" if maximo is None else "maximo")
+    por_anio = bool(datos.get("por_anio", False))
+    valor = await _calcular(request, equilibrio, _escenario(datos), variable,
+                            minimo, maximo, por_anio)
+    return JSONResponse({"variable": variable, "valor": valor})
+
+
+async def ruta_salud(request):
+    return JSONResponse({"estado": "ok"})
+
+
+async def _peticion_invalida(request, error):
+    cuerpo = {"error": str(error)}
+    if error.campo is not None:
+        cuerpo["campo"] = error.campo
+    return JSONResponse(cuerpo, status_code=422)
+
+
+def crear_app(procesos=None):
+    """Aplicación ASGI con su propio pool de ``procesos`` (todos los núcleos
+    por defecto)."""
+    @contextlib.asynccontextmanager
+    async def ciclo(app):
+        with ProcessPoolExecutor(max_workers=procesos or os.cpu_count() or 1) as pool:
+            app.state.pool = pool
+            yield
+
+    return Starlette(
+        routes=[
+            Route("/evaluar", ruta_evaluar, methods=["POST"]),
+            Route("/lote", ruta_lote, methods=["POST"]),
+            Route("/equilibrio", ruta_equilibrio, methods=["POST"]),
+            Route("/salud", ruta_salud, methods=["GET"]),
+        ],
+        exception_handlers={PeticionInvalida: _peticion_invalida},
+        lifespan=ciclo,
+    )
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servicio JSON alquiler vs compra.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--procesos", type=int, help="por defecto, todos los núcleos")
+    args = parser.parse_args()
+    uvicorn.run(crear_app(args.procesos), host=args.host, port=args.puerto,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
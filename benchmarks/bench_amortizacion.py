@@ -0,0 +1,72 @@
+"""Compara el calendario hipotecario en forma cerrada con el bucle mensual.
+
+Uso: python benchmarks/bench_amortizacion.py
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+import numpy_financial as npf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from hipoteca import amortizacion_hipoteca, calendario_hipoteca  # noqa: E402
+
+
+def amortizacion_mensual(capital, tasa_mensual, meses, horizonte):
+    """Implementación anterior, mes a mes, usada como referencia."""
+    cuota = npf.pmt(tasa_mensual, meses, -capital)
+    saldo_capital = capital
+    pagos_realizados = 0.0
+    deuda_total = cuota * meses
+    amort_anual = [0.0]
+    deuda_anual = [deuda_total]
+    for mes in range(1, min(meses, horizonte * 12) + 1):
+        interes = saldo_capital * tasa_mensual
+        principal = cuota - interes
+        saldo_capital -= principal
+        pagos_realizados += cuota
+        deuda_total -= cuota
+        if mes % 12 == 0:
+            amort_anual.append(pagos_realizados)
+            deuda_anual.append(max(deuda_total, 0.0))
+    while len(amort_anual) < horizonte + 1:
+        amort_anual.append(pagos_realizados)
+        deuda_anual.append(max(deuda_total, 0.0))
+    return amort_anual, deuda_anual
+
+
+def medir(funcion, repeticiones):
+    return min(timeit.repeat(funcion, number=repeticiones, repeat=5)) / repeticiones
+
+
+def main():
+    capital, tasa, meses, horizonte = 200_000.0, 0.028 / 12, 40 * 12, 40
+
+    ref = amortizacion_mensual(capital, tasa, meses, horizonte)
+    nuevo = amortizacion_hipoteca(capital, tasa, meses, horizonte)
+    error = max(np.max(np.abs(np.subtract(r, n))) for r, n in zip(ref, nuevo))
+    assert error < 0.005, f"diferencia de {error} EUR"
+
+    t_ref = medir(lambda: amortizacion_mensual(capital, tasa, meses, horizonte), 200)
+    t_nuevo = medir(lambda: amortizacion_hipoteca(capital, tasa, meses, horizonte), 200)
+    print(f"Hipoteca a 40 años (error máximo {error:.2e} EUR)")
+    print(f"  bucle mensual:  {t_ref * 1e6:9.1f} us")
+    print(f"  forma cerrada:  {t_nuevo * 1e6:9.1f} us  ({t_ref / t_nuevo:.1f}x)")
+
+    n = 10_000
+    rng = np.random.default_rng(0)
+    capitales = rng.uniform(50_000, 800_000, n)
+    tasas = rng.uniform(0.1, 10.0, n) / 100 / 12
+    plazos = rng.integers(5, 41, n) * 12
+    t_bucle = medir(lambda: [amortizacion_mensual(k, r, int(m), horizonte)
+                             for k, r, m in zip(capitales, tasas, plazos)], 1)
+    t_lote = medir(lambda: calendario_hipoteca(capitales, tasas, plazos, horizonte), 10)
+    print(f"{n} hipotecas, horizonte de 40 años")
+    print(f"  bucle mensual:  {t_bucle * 1e3:9.1f} ms")
+    print(f"  vectorizado:    {t_lote * 1e3:9.1f} ms  ({t_bucle / t_lote:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Tiempo de arranque en frío: motor de cálculo y primer paso de la app.
+
+Cada medida se hace en un intérprete nuevo. "antes" reproduce las
+importaciones que la app hacía al cargarse (pandas, numpy_financial,
+matplotlib y fpdf) antes de ejecutar el paso 1; "ahora" ejecuta el paso 1
+tal cual, que ya no carga las librerías de cálculo, gráficos ni PDF.
+
+Uso: python benchmarks/bench_arranque.py [--repeticiones 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PESADAS = ("numpy", "pandas", "numpy_financial", "matplotlib", "fpdf", "streamlit")
+IMPORTACIONES_ANTERIORES = (
+    "import numpy, pandas, numpy_financial, matplotlib.pyplot, matplotlib.ticker, fpdf"
+)
+
+MEDIR = """
+import json, sys, time
+sys.path.insert(0, {raiz!r})
+inicio = time.perf_counter()
+{codigo}
+segundos = time.perf_counter() - inicio
+print(json.dumps({{"segundos": segundos,
+                   "modulos": [m for m in {pesadas!r} if m in sys.modules]}}))
+"""
+
+# La app se ejecuta en modo "bare" (sin servidor), así que se silencian los
+# avisos de Streamlit antes de importarla
+APP = """
+import streamlit.logger
+streamlit.logger.set_log_level("error")
+import alquiler_vs_compra_app
+"""
+
+CASOS = {
+    "motor (import motor)": "import motor",
+    "app paso 1, antes": IMPORTACIONES_ANTERIORES + "\n" + APP,
+    "app paso 1, ahora": APP,
+}
+
+
+def medir(codigo, repeticiones):
+    programa = MEDIR.format(raiz=RAIZ, codigo=codigo, pesadas=PESADAS)
+    resultados = []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, "-c", programa], check=True,
+                                capture_output=True, text=True, cwd=RAIZ).stdout
+        resultados.append(json.loads(salida.splitlines()[-1]))
+    return min(r["segundos"] for r in resultados), resultados[0]["modulos"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    tiempos = {}
+    for nombre, codigo in CASOS.items():
+        tiempos[nombre], modulos = medir(codigo, args.repeticiones)
+        print(f"{nombre:<24} {tiempos[nombre] * 1e3:8.0f} ms   carga: {', '.join(modulos)}")
+    antes, ahora = tiempos["app paso 1, antes"], tiempos["app paso 1, ahora"]
+    print(f"Arranque del paso 1: {antes / ahora:.1f}x más rápido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Cache compartida entre sesiones: aciertos, trabajo evitado y límite de memoria.
+
+Simula sesiones concurrentes (hilos) que piden el resultado y los dos
+gráficos de escenarios populares: la mayoría eligen uno de unos pocos
+preajustes y el resto, un escenario propio. Muestra cuánto de lo pedido se
+llega a generar y falla si la cache supera su límite de bytes.
+
+Uso: python benchmarks/bench_cache_compartida.py [--sesiones 8 --peticiones 50 --limite-mb 4]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cache_resultados import CacheCompartida, clave_escenario, tamano_resultado  # noqa: E402
+from graficos import grafico_costes, grafico_patrimonio  # noqa: E402
+from motor import calcular_resultados  # noqa: E402
+
+COMPRA = {"precio_vivienda": 250000, "entrada_pct": 20, "gastos_compra_pct": 12,
+          "tipo_interes_hipoteca": 2.8, "plazo_hipoteca": 25,
+          "revalorizacion_vivienda_pct": 2.0, "gasto_propietario_pct": 1.0,
+          "seguro_hogar_eur": 400.0}
+ALQUILER = {"alquiler_inicial": 1000, "subida_alquiler_anual_pct": 2.0,
+            "rentabilidad_inversion_pct": 9.0, "horizonte_anios": 25}
+PREAJUSTES = [({**COMPRA, "precio_vivienda": p}, ALQUILER) for p in (150000, 250000, 400000)]
+
+
+def sesion(cache, peticiones, semilla, generados, maximo):
+    rng = random.Random(semilla)
+    for _ in range(peticiones):
+        if rng.random() < 0.8:
+            c, a = rng.choice(PREAJUSTES)
+        else:
+            c, a = {**COMPRA, "precio_vivienda": rng.randrange(50000, 1000000, 1000)}, ALQUILER
+        clave = clave_escenario(c, a)
+
+        def generar(tipo, funcion):
+            generados[tipo] += 1
+            return funcion()
+
+        resultado = cache.calcular(f"{clave}:resultado", lambda: generar(
+            "resultado", lambda: calcular_resultados(c, a)), tamano_resultado)
+        cache.calcular(f"{clave}:patrimonio", lambda: generar(
+            "grafico", lambda: grafico_patrimonio(resultado.resumen)))
+        cache.calcular(f"{clave}:costes", lambda: generar(
+            "grafico", lambda: grafico_costes(resultado.resumen)))
+        maximo[0] = max(maximo[0], cache.bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sesiones", type=int, default=8)
+    parser.add_argument("--peticiones", type=int, default=50, help="por sesión")
+    parser.add_argument("--limite-mb", type=float, default=4)
+    args = parser.parse_args()
+
+    cache = CacheCompartida(max_bytes=int(args.limite_mb * 2**20))
+    generados, maximo = Counter(), [0]
+    hilos = [threading.Thread(target=sesion, args=(cache, args.peticiones, i, generados, maximo))
+             for i in range(args.sesiones)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+
+    pedidos = 3 * args.sesiones * args.peticiones
+    print(f"{pedidos} artefactos pedidos por {args.sesiones} sesiones en {segundos:.2f} s")
+    print(f"generados: {generados['resultado']} resultados, {generados['grafico']} gráficos "
+          f"({sum(generados.values()) / pedidos:.0%} de lo pedido)")
+    print(f"aciertos {cache.aciertos}, fallos {cache.fallos}, expulsiones {cache.expulsiones}")
+    print(f"memoria: máxima {maximo[0] / 2**20:.2f} MiB, límite {cache.max_bytes / 2**20:.2f} MiB")
+    if maximo[0] > cache.max_bytes:
+        sys.exit("La cache ha superado su límite de memoria")
+
+
+if __name__ == "__main__":
+    main()
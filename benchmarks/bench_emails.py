@@ -0,0 +1,104 @@
+"""Mide el almacén de emails con altas concurrentes desde varios procesos.
+
+Cada proceso lanza varios hilos que registran emails de un conjunto común,
+con mayúsculas y espacios variados para que haya repetidos entre procesos.
+Al final comprueba que cada email normalizado aparece exactamente una vez.
+
+Uso: python benchmarks/bench_emails.py [--procesos 4] [--hilos 16] [--altas 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import Barrier, Process
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from registro_emails import AlmacenSQLite, exportar, normalizar_email  # noqa: E402
+
+
+def email(i: int) -> str:
+    return f"usuario{i}@ejemplo.com"
+
+
+def variante(i: int, rng) -> str:
+    """El email ``i`` escrito de otra forma equivalente."""
+    texto = email(i)
+    if rng.random() < 0.5:
+        texto = texto.upper()
+    return " " * rng.randint(0, 2) + texto + " " * rng.randint(0, 2)
+
+
+def proceso(ruta, barrera, indice, hilos, altas, distintos):
+    almacen = AlmacenSQLite(ruta)
+    rng = random.Random(indice)
+    por_hilo = [[variante(rng.randrange(distintos), rng) for _ in range(altas // hilos)]
+                for _ in range(hilos)]
+
+    def enviar(emails):
+        for e in emails:
+            almacen.guardar(e)
+
+    trabajadores = [threading.Thread(target=enviar, args=(emails,)) for emails in por_hilo]
+    barrera.wait()
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    almacen.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--procesos", type=int, default=4)
+    parser.add_argument("--hilos", type=int, default=16, help="hilos por proceso")
+    parser.add_argument("--altas", type=int, default=5000, help="altas por proceso")
+    parser.add_argument("--distintos", type=int, default=8000,
+                        help="emails distintos entre los que se elige")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "emails.db")
+        AlmacenSQLite(ruta).cerrar()
+        barrera = Barrier(args.procesos + 1)
+        procesos = [Process(target=proceso, args=(ruta, barrera, i, args.hilos,
+                                                  args.altas, args.distintos))
+                    for i in range(args.procesos)]
+        for p in procesos:
+            p.start()
+        barrera.wait()
+        inicio = time.perf_counter()
+        for p in procesos:
+            p.join()
+        segundos = time.perf_counter() - inicio
+        assert all(p.exitcode == 0 for p in procesos), "algún proceso ha fallado"
+
+        total = args.procesos * (args.altas // args.hilos) * args.hilos
+        almacen = AlmacenSQLite(ruta)
+        guardados = almacen.emails()
+        salida = os.path.join(directorio, "emails.txt")
+        exportados = exportar(almacen, salida)
+        almacen.cerrar()
+
+    # Los emails que se han enviado son los mismos que generan las semillas
+    esperados = set()
+    for i in range(args.procesos):
+        rng = random.Random(i)
+        for _ in range((args.altas // args.hilos) * args.hilos):
+            esperados.add(normalizar_email(variante(rng.randrange(args.distintos), rng)))
+    normalizados = [normalizar_email(e) for e in guardados]
+
+    print(f"{total} altas desde {args.procesos} procesos x {args.hilos} hilos "
+          f"en {segundos:.2f} s ({total / segundos:,.0f} altas/s)")
+    print(f"{len(guardados)} emails guardados, {len(esperados)} distintos enviados")
+    assert len(normalizados) == len(set(normalizados)), "hay emails duplicados"
+    assert set(normalizados) == esperados, "faltan emails o sobran"
+    assert exportados == len(guardados)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Tiempo, tamaño y memoria de la exportación en CSV, Parquet y Excel.
+
+Para una tabla (la descarga de la app, horizonte 25 años) mide el tiempo y
+los bytes de cada formato. Para muchos escenarios compara
+``exportar_escenarios``, que escribe el fichero a medida que los calcula, con
+juntar todas las tablas y exportarlas de una vez, y muestra el pico de
+memoria (tracemalloc) de cada forma.
+
+Uso: python benchmarks/bench_exportacion.py [--escenarios 500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from exportacion import exportar_escenarios, exportar_tabla, formatos_disponibles  # noqa: E402
+from motor import calcular_resultados  # noqa: E402
+
+COMPRA = {"precio_vivienda": 250000.0, "entrada_pct": 20.0, "gastos_compra_pct": 12.0,
+          "tipo_interes_hipoteca": 2.8, "plazo_hipoteca": 25,
+          "revalorizacion_vivienda_pct": 2.0, "gasto_propietario_pct": 1.0,
+          "seguro_hogar_eur": 400.0}
+ALQUILER = {"alquiler_inicial": 1000.0, "subida_alquiler_anual_pct": 2.0,
+            "rentabilidad_inversion_pct": 9.0, "horizonte_anios": 25}
+
+
+def escenarios(n):
+    for i in range(n):
+        c = {**COMPRA, "precio_vivienda": 150_000.0 + 100.0 * i}
+        yield i, calcular_resultados(c, ALQUILER).tabla()
+
+
+def todo_junto(n, formato):
+    """Alternativa sin streaming: una tabla con todos los escenarios en memoria."""
+    tabla = pd.concat([df.assign(escenario=i) for i, df in escenarios(n)], ignore_index=True)
+    return exportar_tabla(tabla, formato)
+
+
+def medir_pico(funcion):
+    """Tiempo de una llamada y pico de memoria de otra (tracemalloc la ralentiza)."""
+    inicio = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - inicio
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escenarios", type=int, default=500)
+    args = parser.parse_args()
+    formatos = formatos_disponibles()
+
+    df = calcular_resultados(COMPRA, ALQUILER).tabla()
+    print("Una tabla (26 filas):")
+    for formato in formatos:
+        segundos = min(timeit.repeat(lambda: exportar_tabla(df, formato), number=20, repeat=5)) / 20
+        print(f"  {formato:<8} {segundos * 1e3:8.2f} ms {len(exportar_tabla(df, formato)) / 1024:8.1f} KB")
+
+    print(f"{args.escenarios} escenarios:")
+    with tempfile.TemporaryDirectory() as directorio:
+        for formato in formatos:
+            ruta = os.path.join(directorio, "escenarios." + formato)
+            t_fichero, pico_fichero = medir_pico(
+                lambda: exportar_escenarios(escenarios(args.escenarios), ruta, formato))
+            t_junto, pico_junto = medir_pico(lambda: todo_junto(args.escenarios, formato))
+            print(f"  {formato:<8} por escenarios {t_fichero:6.2f} s {pico_fichero / 2**20:7.1f} MiB"
+                  f"   todo junto {t_junto:6.2f} s {pico_junto / 2**20:7.1f} MiB"
+                  f"   fichero {os.path.getsize(ruta) / 2**20:6.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
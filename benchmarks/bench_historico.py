@@ -0,0 +1,70 @@
+"""Backtest histórico: lectura de las series y cálculo de todas las cohortes.
+
+Genera series sintéticas de ``--anios`` años en un CSV y mide leerlo y
+convertirlo la primera vez, volver a abrirlo ya mapeado en memoria y volver
+a leer el CSV en cada backtest, además del propio ``backtest_historico``.
+
+Uso: python benchmarks/bench_historico.py [--anios 150]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from historico import backtest_historico, cargar_series, leer_csv  # noqa: E402
+
+COMPRA = {"precio_vivienda": 250000.0, "entrada_pct": 20.0, "gastos_compra_pct": 12.0,
+          "tipo_interes_hipoteca": 2.8, "plazo_hipoteca": 25,
+          "revalorizacion_vivienda_pct": 2.0, "gasto_propietario_pct": 1.0,
+          "seguro_hogar_eur": 400.0}
+ALQUILER = {"alquiler_inicial": 1000.0, "subida_alquiler_anual_pct": 2.0,
+            "rentabilidad_inversion_pct": 9.0, "horizonte_anios": 25}
+
+
+def series_sinteticas(anios: int, semilla: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        "anio": np.arange(2025 - anios, 2025),
+        "indice_vivienda": 100 * np.cumprod(1 + rng.normal(0.04, 0.06, anios)),
+        "indice_alquiler": 100 * np.cumprod(1 + rng.normal(0.03, 0.02, anios)),
+        "rentabilidad_inversion_pct": rng.normal(8.0, 17.0, anios),
+        "tipo_interes_hipoteca": rng.uniform(2.0, 12.0, anios),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--anios", type=int, default=150)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "series.csv")
+        series_sinteticas(args.anios).to_csv(ruta, index=False)
+        compiladas = os.path.join(directorio, "compiladas")
+
+        inicio = time.perf_counter()
+        series = cargar_series(ruta, compiladas)
+        primera = time.perf_counter() - inicio
+        mapeada = min(timeit.repeat(lambda: cargar_series(ruta, compiladas), number=100, repeat=5)) / 100
+        csv = min(timeit.repeat(lambda: leer_csv(ruta), number=20, repeat=5)) / 20
+        calculo = min(timeit.repeat(lambda: backtest_historico(COMPRA, ALQUILER, series),
+                                    number=20, repeat=5)) / 20
+        bt = backtest_historico(COMPRA, ALQUILER, series)
+
+    print(f"{args.anios} años de series, {len(bt['inicios'])} cohortes, "
+          f"{int(bt['cohortes'].sum()):,} pares cohorte-horizonte")
+    print(f"  primera carga (CSV + .npy) {primera * 1e3:8.2f} ms")
+    print(f"  carga mapeada              {mapeada * 1e3:8.2f} ms")
+    print(f"  leer el CSV otra vez       {csv * 1e3:8.2f} ms")
+    print(f"  backtest                   {calculo * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
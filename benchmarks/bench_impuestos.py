@@ -0,0 +1,60 @@
+"""Coste de aplicar los impuestos por comunidad frente a no aplicarlos.
+
+Calcula ``--escenarios`` escenarios aleatorios en las 17 comunidades a la
+vez (una fila por escenario y comunidad) con ``calcular_con_impuestos`` y
+las mismas filas sin impuestos con ``calcular_resultados_lote``, y muestra
+el tiempo de cada uno. Repite la comparación con un solo escenario, el caso
+del desplegable de la app.
+
+Uso: python benchmarks/bench_impuestos.py [--escenarios 5000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from impuestos import REGIONES, calcular_con_impuestos  # noqa: E402
+from motor_lote import calcular_resultados_lote  # noqa: E402
+
+COMPRA = {"precio_vivienda": 250000.0, "entrada_pct": 20.0, "gastos_compra_pct": 2.0,
+          "tipo_interes_hipoteca": 2.8, "plazo_hipoteca": 25,
+          "revalorizacion_vivienda_pct": 2.0, "gasto_propietario_pct": 0.7,
+          "seguro_hogar_eur": 400.0}
+ALQUILER = {"alquiler_inicial": 1000.0, "subida_alquiler_anual_pct": 2.0,
+            "rentabilidad_inversion_pct": 9.0, "horizonte_anios": 25}
+
+
+def escenarios(n: int, semilla: int = 0):
+    """``n`` escenarios repetidos en cada comunidad: (compra, alquiler, región)."""
+    rng = np.random.default_rng(semilla)
+    regiones = len(REGIONES)
+    c = {**COMPRA,
+         "precio_vivienda": np.repeat(rng.uniform(100_000, 800_000, n), regiones),
+         "plazo_hipoteca": np.repeat(rng.integers(5, 41, n), regiones)}
+    a = {**ALQUILER, "horizonte_anios": np.repeat(rng.integers(1, 41, n), regiones)}
+    return c, a, np.tile(np.arange(regiones), n)
+
+
+def mejor(funcion, numero):
+    return min(timeit.repeat(funcion, number=numero, repeat=5)) / numero
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escenarios", type=int, default=5000)
+    args = parser.parse_args()
+
+    for n, numero in ((1, 200), (args.escenarios, 1)):
+        c, a, region = escenarios(n)
+        sin = mejor(lambda: calcular_resultados_lote(c, a, columnas=False), numero)
+        con = mejor(lambda: calcular_con_impuestos(c, a, region, columnas=False), numero)
+        print(f"{n:>6} escenarios x {len(REGIONES)} comunidades: sin impuestos "
+              f"{sin * 1e3:8.2f} ms   con impuestos {con * 1e3:8.2f} ms ({con / sin:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
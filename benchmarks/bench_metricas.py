@@ -0,0 +1,40 @@
+"""Coste de medir una etapa con las métricas desactivadas y activadas.
+
+Uso: python benchmarks/bench_metricas.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import metricas  # noqa: E402
+
+
+def una_etapa():
+    with metricas.etapa("calculo"):
+        pass
+
+
+def ejecucion(etapas=8):
+    """Lo que añade la instrumentación a una ejecución del paso 5."""
+    metricas.iniciar(5, "sesion")
+    for _ in range(etapas):
+        una_etapa()
+    metricas.terminar()
+
+
+def medir(funcion, n=200_000):
+    return min(timeit.repeat(funcion, number=n, repeat=5)) / n
+
+
+def main():
+    for modo in (None, "prometheus"):
+        metricas.activar(modo, puerto=0)
+        print(f"métricas {modo or 'desactivadas'}:")
+        print(f"  etapa:                 {medir(una_etapa) * 1e9:8.0f} ns")
+        print(f"  ejecución (8 etapas):  {medir(ejecucion, 20_000) * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Optimizador de compra en una rejilla de un millón de combinaciones.
+
+Evalúa entrada (101 valores) x plazo (36) x horizonte (40) x interés (7)
+con un proceso y con todos los núcleos, comprueba que los dos frentes de
+Pareto coinciden y falla si la versión en paralelo supera el límite de
+tiempo.
+
+Uso: python benchmarks/bench_optimizador.py [--limite 60 --procesos N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from optimizador import optimizar_compra  # noqa: E402
+
+COMPRA = {"precio_vivienda": 250000.0, "entrada_pct": 20.0, "gastos_compra_pct": 12.0,
+          "tipo_interes_hipoteca": 2.8, "plazo_hipoteca": 25,
+          "revalorizacion_vivienda_pct": 2.0, "gasto_propietario_pct": 1.0,
+          "seguro_hogar_eur": 400.0}
+ALQUILER = {"alquiler_inicial": 1000.0, "subida_alquiler_anual_pct": 2.0,
+            "rentabilidad_inversion_pct": 3.0, "horizonte_anios": 25}
+REJILLA = {"entrada_pct": np.linspace(0, 50, 101), "plazo_hipoteca": np.arange(5, 41),
+           "precio_vivienda": np.linspace(100_000, 490_000, 40),
+           "tipo_interes_hipoteca": np.linspace(1, 5, 7)}
+
+
+def medir(procesos):
+    inicio = time.perf_counter()
+    resultado = optimizar_compra(COMPRA, ALQUILER, REJILLA, "ventaja", ahorros=100_000.0,
+                                 cuota_maxima=1500.0, desembolso_maximo=100_000.0,
+                                 procesos=procesos)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limite", type=float, default=60.0, help="segundos")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    secuencial, t_secuencial = medir(1)
+    paralelo, t_paralelo = medir(args.procesos)
+    print(f"{secuencial['combinaciones']:,} combinaciones, {secuencial['factibles']:,} factibles, "
+          f"{len(secuencial['frente'])} en el frente")
+    print(f"1 proceso: {t_secuencial:.2f} s   {args.procesos} procesos: {t_paralelo:.2f} s "
+          f"({t_secuencial / t_paralelo:.1f}x)")
+    if not secuencial["frente"].equals(paralelo["frente"]):
+        sys.exit("El frente depende del número de procesos")
+    if t_paralelo > args.limite:
+        sys.exit(f"La rejilla ha tardado más de {args.limite:.0f} s")
+
+
+if __name__ == "__main__":
+    main()
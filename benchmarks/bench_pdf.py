@@ -0,0 +1,94 @@
+"""Compara el informe PDF con la implementación anterior celda a celda.
+
+Uso: python benchmarks/bench_pdf.py
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+from fpdf import FPDF
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from informe import ETIQUETAS, generar_pdf  # noqa: E402
+from motor_lote import COLUMNAS, calcular_resultados_lote  # noqa: E402
+
+
+def generar_pdf_anterior(resumen, df):
+    """Implementación anterior, usada como referencia."""
+    pdf = FPDF(orientation="L", unit="mm", format="A4")
+    pdf.add_page()
+    pdf.set_font("Helvetica", "B", 16)
+    pdf.cell(0, 10, "Resultados Alquiler vs Compra", ln=True, align="C")
+    pdf.ln(5)
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(0, 10, "Resumen", ln=True)
+    pdf.set_font("Helvetica", size=11)
+    for k, label in ETIQUETAS.items():
+        val = resumen.get(k, "")
+        if isinstance(val, float):
+            val = f"{val:,.0f} EUR"
+        pdf.cell(0, 8, f"{label}: {val}", ln=True)
+    pdf.ln(5)
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(0, 10, "Resultados por año", ln=True)
+    pdf.set_font("Helvetica", size=7)
+    page_width = pdf.w - 2 * pdf.l_margin
+    col_width = page_width / len(df.columns)
+    th = pdf.font_size + 1
+    for col in df.columns:
+        pdf.cell(col_width, th, str(col), border=1)
+    pdf.ln(th)
+    for row in df.itertuples(index=False):
+        for item in row:
+            if isinstance(item, float):
+                cell_val = f"{item:,.0f}"
+            else:
+                cell_val = str(item)
+            pdf.cell(col_width, th, cell_val, border=1)
+        pdf.ln(th)
+    pdf_content = pdf.output(dest="S")
+    if isinstance(pdf_content, bytes):
+        pdf_content = pdf_content.decode("latin-1", errors="ignore")
+    pdf_content = pdf_content.replace("€", "EUR")
+    return pdf_content.encode("latin-1")
+
+
+def escenario(horizonte):
+    """Resumen y DataFrame de un escenario típico con el horizonte dado."""
+    import pandas as pd
+
+    compra = {"precio_vivienda": 250000, "entrada_pct": 20, "gastos_compra_pct": 12,
+              "tipo_interes_hipoteca": 2.8, "plazo_hipoteca": 25,
+              "revalorizacion_vivienda_pct": 2.0, "gasto_propietario_pct": 1.0,
+              "seguro_hogar_eur": 400}
+    alquiler = {"alquiler_inicial": 1000, "subida_alquiler_anual_pct": 2.0,
+                "rentabilidad_inversion_pct": 9.0, "horizonte_anios": horizonte}
+    resumen, tabla = calcular_resultados_lote(compra, alquiler)
+    resumen = {k: float(v[0]) for k, v in resumen.items() if v.ndim == 1 and k != "anios"}
+    df = pd.DataFrame({col: tabla[col][0] for col in COLUMNAS})
+    return resumen, df
+
+
+def medir(funcion, *args):
+    segundos = min(timeit.repeat(lambda: funcion(*args), number=10, repeat=5)) / 10
+    tracemalloc.start()
+    funcion(*args)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico
+
+
+def main():
+    print(f"{'años':>5} {'anterior':>18} {'actual':>18} {'mejora':>7}")
+    for horizonte in (10, 25, 40):
+        resumen, df = escenario(horizonte)
+        t_ref, m_ref = medir(generar_pdf_anterior, resumen, df)
+        t_nuevo, m_nuevo = medir(generar_pdf, resumen, df)
+        print(f"{horizonte:>5} {t_ref * 1e3:7.2f} ms {m_ref / 1024:6.0f} KiB "
+              f"{t_nuevo * 1e3:7.2f} ms {m_nuevo / 1024:6.0f} KiB {t_ref / t_nuevo:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Escalado y memoria de procesar_lote con ficheros de distintos tamaños.
+
+Genera ficheros Parquet de escenarios aleatorios y mide, en un proceso
+nuevo por ejecución, el rendimiento con 1..N procesos y la memoria máxima
+(proceso principal y trabajadores) al crecer la entrada.
+
+Uso: python benchmarks/bench_procesar_lote.py [--filas 20000 80000 320000] [--tablas]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Se ejecuta en un proceso aparte para que cada medida de memoria sea independiente
+MEDIR = """
+import json, resource, sys, time
+sys.path.insert(0, {raiz!r})
+from procesar_lote import procesar_fichero
+inicio = time.perf_counter()
+n = procesar_fichero({entrada!r}, {salida!r}, {tablas!r}, procesos={procesos})
+segundos = time.perf_counter() - inicio
+print(json.dumps({{
+    "segundos": segundos,
+    "escenarios": n,
+    "principal_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "trabajador_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+}}))
+"""
+
+
+def escenarios(n: int, semilla: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        "precio_vivienda": rng.uniform(100_000, 500_000, n),
+        "entrada_pct": rng.uniform(10, 40, n),
+        "gastos_compra_pct": 12.0,
+        "tipo_interes_hipoteca": rng.uniform(1, 5, n),
+        "plazo_hipoteca": rng.integers(10, 31, n),
+        "revalorizacion_vivienda_pct": rng.uniform(0, 4, n),
+        "gasto_propietario_pct": 1.0,
+        "seguro_hogar_eur": 400.0,
+        "alquiler_inicial": rng.uniform(500, 2000, n),
+        "subida_alquiler_anual_pct": rng.uniform(0, 4, n),
+        "rentabilidad_inversion_pct": rng.uniform(2, 9, n),
+        "horizonte_anios": rng.integers(5, 31, n),
+    })
+
+
+def medir(directorio, entrada, procesos, tablas):
+    codigo = MEDIR.format(
+        raiz=RAIZ, entrada=entrada, salida=os.path.join(directorio, "resumen.parquet"),
+        tablas=os.path.join(directorio, "tablas.parquet") if tablas else None,
+        procesos=procesos,
+    )
+    salida = subprocess.run([sys.executable, "-c", codigo], check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(salida)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, nargs="+", default=[20_000, 80_000, 320_000])
+    parser.add_argument("--tablas", action="store_true", help="escribe también las tablas anuales")
+    args = parser.parse_args()
+    nucleos = os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ficheros = {}
+        for n in args.filas:
+            ficheros[n] = os.path.join(directorio, f"escenarios_{n}.parquet")
+            escenarios(n).to_parquet(ficheros[n])
+
+        mayor = max(args.filas)
+        print(f"Escalado con {mayor} escenarios ({nucleos} núcleos)")
+        base = None
+        for procesos in sorted({1, 2, 4, nucleos} & set(range(1, nucleos + 1))):
+            r = medir(directorio, ficheros[mayor], procesos, args.tablas)
+            velocidad = r["escenarios"] / r["segundos"]
+            base = base or velocidad
+            print(f"  {procesos:>2} procesos: {velocidad:>10,.0f} escenarios/s "
+                  f"(x{velocidad / base:.2f})")
+
+        print("Memoria máxima según el tamaño de la entrada")
+        for n in args.filas:
+            r = medir(directorio, ficheros[n], min(2, nucleos), args.tablas)
+            print(f"  {n:>9} escenarios: principal {r['principal_mb']:.0f} MB, "
+                  f"trabajador {r['trabajador_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
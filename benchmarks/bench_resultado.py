@@ -0,0 +1,199 @@
+"""Memoria y tiempo de un resultado: listas de Python frente a columnas.
+
+Compara ``motor.calcular_resultados`` con la implementación anterior, que
+guardaba cada serie en una lista, la copiaba al DataFrame y volvía a copiar
+cuatro de ellas en el resumen. Mide la memoria que queda retenida por
+resultado al guardar muchos (como hace la cache) y el tiempo por llamada.
+
+Uso: python benchmarks/bench_resultado.py [--resultados 1000]
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from hipoteca import calendario_hipoteca  # noqa: E402
+from motor import calcular_resultados  # noqa: E402
+
+COMPRA = {"precio_vivienda": 250000.0, "entrada_pct": 20.0, "gastos_compra_pct": 12.0,
+          "tipo_interes_hipoteca": 2.8, "plazo_hipoteca": 25,
+          "revalorizacion_vivienda_pct": 2.0, "gasto_propietario_pct": 1.0,
+          "seguro_hogar_eur": 400.0}
+ALQUILER = {"alquiler_inicial": 1000.0, "subida_alquiler_anual_pct": 2.0,
+            "rentabilidad_inversion_pct": 9.0}
+
+
+def calcular_resultados_anterior(c, a):
+    """Implementación anterior con listas, usada como referencia."""
+    precio_vivienda = c['precio_vivienda']
+    entrada_pct = c['entrada_pct']
+    gastos_compra_pct = c['gastos_compra_pct']
+    tipo_interes_hipoteca = c['tipo_interes_hipoteca']
+    plazo_hipoteca = c['plazo_hipoteca']
+    revalorizacion_vivienda_pct = c['revalorizacion_vivienda_pct']
+    gasto_propietario_pct = c.get('gasto_propietario_pct', 0.0)
+    seguro_hogar_eur = c.get('seguro_hogar_eur', 0.0)
+    seguro_vida_eur = c.get('seguro_vida_eur', 0.0)
+
+    alquiler_inicial = a['alquiler_inicial']
+    subida_alquiler_anual_pct = a['subida_alquiler_anual_pct']
+    rentabilidad_inversion_pct = a['rentabilidad_inversion_pct']
+    horizonte_anios = a.get('horizonte_anios', plazo_hipoteca)
+
+    entrada = precio_vivienda * entrada_pct / 100
+    gastos_compra = precio_vivienda * gastos_compra_pct / 100
+    capital_financiado = precio_vivienda - entrada
+
+    tasa_mensual = tipo_interes_hipoteca / 100 / 12
+    meses_totales = plazo_hipoteca * 12
+    cuota_mensual, amort_acum, deuda_anual = calendario_hipoteca(
+        capital_financiado, tasa_mensual, meses_totales, horizonte_anios
+    )
+    cuota_anual = cuota_mensual * 12
+
+    gastos_iniciales = 0
+    years = [0]
+    precio_vivienda_lst = [precio_vivienda]
+    gastos_iniciales_lst = [entrada + gastos_compra]
+    hipoteca_amortizada_lst = [0.0]
+    deuda_pendiente_lst = [capital_financiado]
+    gastos_anuales_lst = [0.0]
+    gastos_acumulados_lst = [entrada + gastos_compra]
+    patrimonio_neto_lst = [-(entrada + gastos_compra)]
+    gasto_alquiler_anual_lst = [0.0]
+    gasto_alq_acum_lst = [0.0]
+    disponible_inv_lst = [entrada + gastos_compra]
+    total_invertido_lst = [entrada + gastos_compra]
+    inversion_acumulada_lst = [entrada + gastos_compra]
+    patrimonio_alq_lst = [entrada + gastos_compra]
+
+    inversion_inquilino = entrada + gastos_compra
+    capital_invertido = entrada + gastos_compra
+    gasto_acumulado = entrada + gastos_compra
+    gasto_alquiler_acum = 0.0
+
+    for year in range(1, horizonte_anios + 1):
+        valor_actual_vivienda = precio_vivienda * (1 + revalorizacion_vivienda_pct / 100) ** year
+        hipoteca_amortizada = amort_acum[year]
+        deuda_actual = deuda_anual[year]
+        patrimonio_actual = valor_actual_vivienda - deuda_actual
+
+        gastos_propietario = precio_vivienda * gasto_propietario_pct / 100 + seguro_hogar_eur + seguro_vida_eur
+        cuota_ano = cuota_anual if year <= plazo_hipoteca else 0.0
+        gasto_acumulado += gastos_propietario + cuota_ano
+
+        alquiler_anual = alquiler_inicial * (1 + subida_alquiler_anual_pct / 100) ** (year - 1) * 12
+        gasto_alquiler_acum += alquiler_anual
+
+        aportacion = max(cuota_ano + gastos_propietario - alquiler_anual, 0.0)
+
+        inversion_inquilino *= (1 + rentabilidad_inversion_pct / 100)
+        inversion_inquilino += aportacion
+        capital_invertido += aportacion
+
+        years.append(year)
+        precio_vivienda_lst.append(valor_actual_vivienda)
+        gastos_iniciales_lst.append(gastos_iniciales)
+        hipoteca_amortizada_lst.append(hipoteca_amortizada)
+        deuda_pendiente_lst.append(deuda_actual)
+        gastos_anuales_lst.append(gastos_propietario)
+        gastos_acumulados_lst.append(gasto_acumulado)
+        patrimonio_neto_lst.append(patrimonio_actual)
+        gasto_alquiler_anual_lst.append(alquiler_anual)
+        gasto_alq_acum_lst.append(gasto_alquiler_acum)
+        disponible_inv_lst.append(aportacion)
+        total_invertido_lst.append(capital_invertido)
+        inversion_acumulada_lst.append(inversion_inquilino)
+        patrimonio_alq_lst.append(inversion_inquilino)
+
+    df = pd.DataFrame({
+        "Año": years,
+        "Precio Vivienda (EUR)": precio_vivienda_lst,
+        "Gastos iniciales (EUR)": gastos_iniciales_lst,
+        "Hipoteca amortizada (EUR)": hipoteca_amortizada_lst,
+        "Deuda Pendiente (EUR)": deuda_pendiente_lst,
+        "Gastos anuales (EUR)": gastos_anuales_lst,
+        "Gastos acumulados (EUR)": gastos_acumulados_lst,
+        "Patrimonio neto compra (EUR)": patrimonio_neto_lst,
+        "Gasto alquiler anual (EUR)": gasto_alquiler_anual_lst,
+        "Gasto alquiler acumulado (EUR)": gasto_alq_acum_lst,
+        "Disponible inversión (EUR)": disponible_inv_lst,
+        "Total invertido (EUR)": total_invertido_lst,
+        "Inversión acumulada (EUR)": inversion_acumulada_lst,
+        "Patrimonio neto alquiler (EUR)": patrimonio_alq_lst,
+    })
+
+    resumen = {
+        "desembolso_inicial_compra": entrada + gastos_compra,
+        "costes_compra": gasto_acumulado,
+        "valor_prop_final": valor_actual_vivienda,
+        "hipoteca_pendiente": deuda_actual,
+        "patrimonio_neto_final": patrimonio_actual,
+        "inversion_inicial_alq": entrada + gastos_compra,
+        "costes_alquiler_total": gasto_alquiler_acum,
+        "capital_total_invertido": capital_invertido,
+        "valor_final_inversion": inversion_inquilino,
+        "patrimonio_neto_final_alq": inversion_inquilino,
+        "diferencia_patrimonio": inversion_inquilino - patrimonio_actual,
+        "diferencia_costes": gasto_alquiler_acum - gasto_acumulado,
+        "anios": list(range(1, horizonte_anios + 1)),
+        "patrimonio_compra": patrimonio_neto_lst[1:],
+        "inversion_alquiler": inversion_acumulada_lst[1:],
+        "coste_compra_acumulado": gastos_acumulados_lst[1:],
+        "coste_alquiler_acumulado": gasto_alq_acum_lst[1:],
+    }
+
+    return resumen, df
+
+
+def retenido(funcion, n, horizonte, con_tabla):
+    """Bytes retenidos por resultado al conservar ``n`` resultados."""
+    a = {**ALQUILER, "horizonte_anios": horizonte}
+    tracemalloc.start()
+    guardados = []
+    for i in range(n):
+        resultado = funcion({**COMPRA, "precio_vivienda": 200_000.0 + i}, a)
+        if con_tabla:
+            resumen, df = resultado
+            guardados.append((resumen, df))
+        else:
+            guardados.append(resultado)
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return actual / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resultados", type=int, default=1000)
+    args = parser.parse_args()
+
+    # Los dos dan exactamente la misma tabla y el mismo resumen
+    nuevo_resumen, nuevo_df = calcular_resultados(COMPRA, {**ALQUILER, "horizonte_anios": 25})
+    ref_resumen, ref_df = calcular_resultados_anterior(COMPRA, {**ALQUILER, "horizonte_anios": 25})
+    pd.testing.assert_frame_equal(nuevo_df, ref_df, check_exact=True)
+    assert all(list(nuevo_resumen[k]) == ref_resumen[k] if isinstance(ref_resumen[k], list)
+               else nuevo_resumen[k] == ref_resumen[k] for k in ref_resumen)
+
+    print(f"{'horizonte':>9} {'antes':>10} {'ahora':>10} {'ahora sin df':>13} "
+          f"{'t antes':>9} {'t ahora':>9}")
+    for horizonte in (1, 10, 25, 40):
+        a = {**ALQUILER, "horizonte_anios": horizonte}
+        antes = retenido(calcular_resultados_anterior, args.resultados, horizonte, True)
+        ahora = retenido(calcular_resultados, args.resultados, horizonte, True)
+        sin_df = retenido(calcular_resultados, args.resultados, horizonte, False)
+        t_antes = min(timeit.repeat(lambda: calcular_resultados_anterior(COMPRA, a),
+                                    number=200, repeat=5)) / 200
+        t_ahora = min(timeit.repeat(lambda: tuple(calcular_resultados(COMPRA, a)),
+                                    number=200, repeat=5)) / 200
+        print(f"{horizonte:>9} {antes / 1024:>8.1f}KB {ahora / 1024:>8.1f}KB "
+              f"{sin_df / 1024:>11.1f}KB {t_antes * 1e6:>7.0f}us {t_ahora * 1e6:>7.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Latencia interactiva con simulaciones largas en la cola de trabajos.
+
+Mide p50/p99 de ``calcular_resultados`` (lo que hace cada ejecución de la
+app) durante ``--segundos``: sin trabajos, con ``--trabajos`` simulaciones
+Monte Carlo en la cola a la prioridad normal y con la prioridad baja por
+defecto de ``ColaTrabajos``. Cada simulación usa todos los núcleos.
+
+Uso: python benchmarks/bench_trabajos.py [--trabajos 2] [--segundos 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from montecarlo import simular_montecarlo  # noqa: E402
+from motor import calcular_resultados  # noqa: E402
+from trabajos import ColaTrabajos  # noqa: E402
+
+COMPRA = {"precio_vivienda": 250000.0, "entrada_pct": 20.0, "gastos_compra_pct": 12.0,
+          "tipo_interes_hipoteca": 2.8, "plazo_hipoteca": 25,
+          "revalorizacion_vivienda_pct": 2.0, "gasto_propietario_pct": 1.0,
+          "seguro_hogar_eur": 400.0}
+ALQUILER = {"alquiler_inicial": 1000.0, "subida_alquiler_anual_pct": 2.0,
+            "rentabilidad_inversion_pct": 9.0, "horizonte_anios": 25}
+
+
+def latencias(segundos: float):
+    """p50 y p99 (ms) de ``calcular_resultados`` repetido durante ``segundos``."""
+    tiempos = []
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        calcular_resultados(COMPRA, ALQUILER)
+        tiempos.append(time.perf_counter() - inicio)
+    return np.percentile(tiempos, [50, 99]) * 1000
+
+
+def con_trabajos(n: int, prioridad: int, segundos: float):
+    cola = ColaTrabajos(max_procesos=n, prioridad=prioridad)
+    ids = [cola.enviar(simular_montecarlo, COMPRA, ALQUILER, n_trayectorias=100_000_000)
+           for _ in range(n)]
+    # Espera a que todos estén calculando antes de medir
+    while any(cola.estado(i)["progreso"] == 0 for i in ids):
+        time.sleep(0.1)
+    p50, p99 = latencias(segundos)
+    cola.cerrar()
+    return p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trabajos", type=int, default=2)
+    parser.add_argument("--segundos", type=float, default=5.0)
+    args = parser.parse_args()
+
+    calcular_resultados(COMPRA, ALQUILER)
+    print(f"{os.cpu_count()} núcleos, {args.trabajos} simulaciones en segundo plano")
+    print(f"{'':<28} {'p50 ms':>8} {'p99 ms':>8}")
+    p50, p99 = latencias(args.segundos)
+    print(f"{'sin trabajos':<28} {p50:>8.2f} {p99:>8.2f}")
+    for etiqueta, prioridad in (("prioridad normal", 0), ("prioridad baja (nice 10)", 10)):
+        p50, p99 = con_trabajos(args.trabajos, prioridad, args.segundos)
+        print(f"{etiqueta:<28} {p50:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
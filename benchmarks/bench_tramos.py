@@ -0,0 +1,69 @@
+"""Recalcular solo los tramos afectados al cambiar una entrada.
+
+Simula el paso 5 moviendo una sola entrada cada vez (como al arrastrar un
+control) y compara ``calcular_resultados`` completo con el cálculo por tramos
+de ``CacheTramos``. Muestra el tiempo por cambio y los aciertos de cada tramo.
+
+Uso: python benchmarks/bench_tramos.py [--cambios 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cache_resultados import CacheTramos  # noqa: E402
+from motor import calcular_resultados  # noqa: E402
+
+COMPRA = {"precio_vivienda": 250000.0, "entrada_pct": 20.0, "gastos_compra_pct": 12.0,
+          "tipo_interes_hipoteca": 2.8, "plazo_hipoteca": 25,
+          "revalorizacion_vivienda_pct": 2.0, "gasto_propietario_pct": 1.0,
+          "seguro_hogar_eur": 400.0}
+ALQUILER = {"alquiler_inicial": 1000.0, "subida_alquiler_anual_pct": 2.0,
+            "rentabilidad_inversion_pct": 9.0, "horizonte_anios": 25}
+
+# Entrada que se mueve -> (diccionario, clave)
+CAMBIOS = {
+    "rentabilidad inversión": ("alquiler", "rentabilidad_inversion_pct"),
+    "alquiler inicial": ("alquiler", "alquiler_inicial"),
+    "revalorización vivienda": ("compra", "revalorizacion_vivienda_pct"),
+    "tipo de interés": ("compra", "tipo_interes_hipoteca"),
+}
+
+
+def escenarios(entrada, clave, n):
+    for i in range(n):
+        c, a = dict(COMPRA), dict(ALQUILER)
+        destino = a if entrada == "alquiler" else c
+        destino[clave] = destino[clave] * (1 + i / n)
+        yield c, a
+
+
+def medir(funcion, entrada, clave, n):
+    lista = list(escenarios(entrada, clave, n))
+    inicio = time.perf_counter()
+    for c, a in lista:
+        funcion(c, a)
+    return (time.perf_counter() - inicio) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cambios", type=int, default=200)
+    args = parser.parse_args()
+
+    for nombre, (entrada, clave) in CAMBIOS.items():
+        completo = medir(calcular_resultados, entrada, clave, args.cambios)
+        tramos = CacheTramos()
+        por_tramos = medir(lambda c, a: calcular_resultados(c, a, tramos),
+                           entrada, clave, args.cambios)
+        reutilizados = ", ".join(f"{t} {e['aciertos']}/{e['aciertos'] + e['fallos']}"
+                                 for t, e in tramos.estadisticas().items())
+        print(f"{nombre:<24} completo {completo * 1e6:6.0f} us  por tramos "
+              f"{por_tramos * 1e6:6.0f} us  ({completo / por_tramos:.1f}x)  "
+              f"aciertos: {reutilizados}")
+
+
+if __name__ == "__main__":
+    main()
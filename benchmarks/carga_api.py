@@ -0,0 +1,122 @@
+"""Prueba de carga del servicio JSON (api.py).
+
+Arranca el servicio en un puerto libre (o usa ``--url``) y, para cada nivel
+de concurrencia, lanza tantos clientes como indica el nivel, cada uno con su
+conexión persistente, durante ``--segundos``. Informa de la latencia p50/p99
+y de las peticiones por segundo.
+
+Uso: python benchmarks/carga_api.py [--ruta evaluar] [--niveles 1 4 16 64]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+COMPRA = {"precio_vivienda": 250000, "entrada_pct": 20, "gastos_compra_pct": 12,
+          "tipo_interes_hipoteca": 2.8, "plazo_hipoteca": 25,
+          "revalorizacion_vivienda_pct": 2.0, "gasto_propietario_pct": 1.0,
+          "seguro_hogar_eur": 400}
+ALQUILER = {"alquiler_inicial": 1000, "subida_alquiler_anual_pct": 2.0,
+            "rentabilidad_inversion_pct": 9.0, "horizonte_anios": 25}
+
+CUERPOS = {
+    "evaluar": {"compra": COMPRA, "alquiler": ALQUILER},
+    "lote": {"escenarios": [{"compra": {**COMPRA, "precio_vivienda": 200000 + 1000 * i},
+                             "alquiler": ALQUILER} for i in range(100)]},
+    "equilibrio": {"compra": COMPRA, "alquiler": ALQUILER,
+                   "variable": "rentabilidad_inversion_pct"},
+}
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar(url, limite=30.0):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            urllib.request.urlopen(url + "/salud", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"el servicio no responde en {url}")
+
+
+def cliente(url, ruta, cuerpo, fin, latencias, errores):
+    destino = urllib.parse.urlsplit(url)
+    conexion = http.client.HTTPConnection(destino.hostname, destino.port)
+    cabeceras = {"Content-Type": "application/json"}
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        conexion.request("POST", "/" + ruta, cuerpo, cabeceras)
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        latencias.append(time.perf_counter() - inicio)
+        if respuesta.status != 200:
+            errores.append(respuesta.status)
+    conexion.close()
+
+
+def nivel(url, ruta, concurrencia, segundos):
+    cuerpo = json.dumps(CUERPOS[ruta])
+    latencias, errores = [], []
+    inicio = time.perf_counter()
+    fin = inicio + segundos
+    hilos = [threading.Thread(target=cliente, args=(url, ruta, cuerpo, fin, latencias, errores))
+             for _ in range(concurrencia)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    total = time.perf_counter() - inicio
+    p50, p99 = np.percentile(latencias, [50, 99]) * 1000
+    return len(latencias) / total, p50, p99, len(errores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="servicio ya arrancado; si no, se arranca uno")
+    parser.add_argument("--ruta", choices=sorted(CUERPOS), default="evaluar")
+    parser.add_argument("--niveles", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--segundos", type=float, default=5.0)
+    parser.add_argument("--procesos", type=int, help="procesos del servicio arrancado")
+    args = parser.parse_args()
+
+    servidor = None
+    url = args.url
+    if url is None:
+        puerto = puerto_libre()
+        orden = [sys.executable, os.path.join(RAIZ, "api.py"), "--puerto", str(puerto)]
+        if args.procesos:
+            orden += ["--procesos", str(args.procesos)]
+        servidor = subprocess.Popen(orden)
+        url = f"http://127.0.0.1:{puerto}"
+    try:
+        esperar(url)
+        print(f"/{args.ruta} en {url}")
+        print(f"{'clientes':>9} {'pet/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errores':>8}")
+        for concurrencia in args.niveles:
+            por_segundo, p50, p99, errores = nivel(url, args.ruta, concurrencia, args.segundos)
+            print(f"{concurrencia:>9} {por_segundo:>9,.0f} {p50:>8.1f} {p99:>8.1f} {errores:>8}")
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Comprueba que los gráficos del paso de resultados no acumulan memoria.
+
+Simula muchas re-ejecuciones del paso 5: cada una pide los dos PNG a la
+cache de gráficos, y el escenario cambia cada ``--cada`` re-ejecuciones, así
+que se mezclan aciertos y renders nuevos. Tras un calentamiento, la memoria
+residente no debe crecer más de ``--margen`` MB ni quedar figuras de pyplot
+abiertas.
+
+Uso: python benchmarks/memoria_graficos.py [--reruns 10000] [--cada 20]
+"""
+import argparse
+import gc
+import os
+import resource
+import sys
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cache_resultados import CacheLRU, clave_escenario  # noqa: E402
+from graficos import grafico_costes, grafico_patrimonio  # noqa: E402
+from motor_lote import calcular_resultados_lote  # noqa: E402
+
+
+COMPRA = {"precio_vivienda": 250000, "entrada_pct": 20, "gastos_compra_pct": 12,
+          "tipo_interes_hipoteca": 2.8, "plazo_hipoteca": 25,
+          "revalorizacion_vivienda_pct": 2.0, "gasto_propietario_pct": 1.0,
+          "seguro_hogar_eur": 400}
+ALQUILER = {"alquiler_inicial": 1000, "subida_alquiler_anual_pct": 2.0,
+            "rentabilidad_inversion_pct": 9.0, "horizonte_anios": 25}
+
+
+def memoria_mb() -> float:
+    """Memoria residente actual en MB (máximo histórico si no hay /proc)."""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def resumen_escenario(c, a):
+    """Resumen con la forma que usa la app (listas por año)."""
+    resumen, _ = calcular_resultados_lote(c, a, columnas=False)
+    return {k: v[0].tolist() if k != "anios" else v.tolist() for k, v in resumen.items()}
+
+
+def rerun(cache, c, a, resumen):
+    """Lo que hace el paso 5 con los gráficos en cada re-ejecución."""
+    clave = clave_escenario(c, a)
+    cache.calcular(f"{clave}:patrimonio", lambda: grafico_patrimonio(resumen))
+    cache.calcular(f"{clave}:costes", lambda: grafico_costes(resumen))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=10_000)
+    parser.add_argument("--cada", type=int, default=20,
+                        help="re-ejecuciones entre cambios de escenario")
+    parser.add_argument("--margen", type=float, default=10.0,
+                        help="crecimiento máximo admitido en MB")
+    args = parser.parse_args()
+
+    cache = CacheLRU(max_entradas=16)
+    # Hasta llenar la cache y estabilizar el asignador de memoria
+    calentamiento = min(50 * args.cada, args.reruns // 2)
+    inicial = None
+    for i in range(args.reruns):
+        if i % args.cada == 0:
+            a = {**ALQUILER, "alquiler_inicial": 800 + (i // args.cada) % 500}
+            resumen = resumen_escenario(COMPRA, a)
+        rerun(cache, COMPRA, a, resumen)
+        if i + 1 == calentamiento:
+            gc.collect()
+            inicial = memoria_mb()
+
+    gc.collect()
+    final = memoria_mb()
+    crecimiento = final - inicial
+    print(f"re-ejecuciones: {args.reruns}, renders: {cache.fallos}, aciertos: {cache.aciertos}")
+    print(f"memoria tras calentamiento: {inicial:.1f} MB, final: {final:.1f} MB "
+          f"(crecimiento {crecimiento:+.1f} MB)")
+    assert not plt.get_fignums(), f"figuras de pyplot abiertas: {plt.get_fignums()}"
+    assert crecimiento < args.margen, f"la memoria crece {crecimiento:.1f} MB"
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
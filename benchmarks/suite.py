@@ -0,0 +1,209 @@
+"""Suite de benchmarks con líneas base en JSON.
+
+Mide tiempo y memoria máxima de ``amortizacion_hipoteca``,
+``calcular_resultados``, ``calcular_resultados_lote`` (con y sin impuestos
+por comunidad), ``generar_pdf``, la exportación en CSV, Parquet y Excel, la
+hipoteca variable, los optimizadores de amortización anticipada y de compra
+y el backtest histórico, variando horizonte (1-40 años), plazo de la
+hipoteca (5-40 años), número de escenarios, trayectorias o combinaciones
+(1-100.000) y años de historia.
+
+Uso:
+
+    python benchmarks/suite.py ejecutar --salida benchmarks/base.json
+    python benchmarks/suite.py ejecutar --salida actual.json
+    python benchmarks/suite.py comparar benchmarks/base.json actual.json --umbral 0.2
+
+``comparar`` termina con código 1 si algún caso es más lento (o usa más
+memoria) que en la base en más del umbral indicado.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from amortizacion_anticipada import optimizar_amortizacion  # noqa: E402
+from exportacion import exportar_tabla, formatos_disponibles  # noqa: E402
+from hipoteca import amortizacion_hipoteca  # noqa: E402
+from hipoteca_variable import simular_hipoteca  # noqa: E402
+from historico import SERIES, backtest_historico  # noqa: E402
+from impuestos import REGIONES, calcular_con_impuestos  # noqa: E402
+from informe import generar_pdf  # noqa: E402
+from motor import calcular_resultados  # noqa: E402
+from motor_lote import calcular_resultados_lote  # noqa: E402
+from optimizador import optimizar_compra  # noqa: E402
+
+HORIZONTES = (1, 10, 25, 40)
+PLAZOS = (5, 15, 25, 40)
+LOTES = (1, 100, 10_000, 100_000)
+TRAYECTORIAS = (1_000, 10_000, 100_000)
+# Valores de entrada de la rejilla entrada x plazo (36) x precio (40)
+ENTRADAS = (1, 7, 70)
+HISTORIA = (50, 150)
+
+COMPRA = {"precio_vivienda": 250000.0, "entrada_pct": 20.0, "gastos_compra_pct": 12.0,
+          "tipo_interes_hipoteca": 2.8, "plazo_hipoteca": 25,
+          "revalorizacion_vivienda_pct": 2.0, "gasto_propietario_pct": 1.0,
+          "seguro_hogar_eur": 400.0}
+ALQUILER = {"alquiler_inicial": 1000.0, "subida_alquiler_anual_pct": 2.0,
+            "rentabilidad_inversion_pct": 9.0}
+
+
+def escenarios_lote(n: int, semilla: int = 0):
+    rng = np.random.default_rng(semilla)
+    c = {**COMPRA,
+         "precio_vivienda": rng.uniform(100_000, 500_000, n),
+         "tipo_interes_hipoteca": rng.uniform(1, 5, n),
+         "plazo_hipoteca": rng.integers(5, 41, n)}
+    a = {**ALQUILER,
+         "rentabilidad_inversion_pct": rng.uniform(2, 9, n),
+         "horizonte_anios": rng.integers(1, 41, n)}
+    return c, a
+
+
+def casos():
+    """Diccionario nombre -> función sin argumentos a medir."""
+    resultado = {}
+    for plazo in PLAZOS:
+        for horizonte in HORIZONTES:
+            resultado[f"amortizacion_hipoteca[plazo={plazo},horizonte={horizonte}]"] = (
+                lambda p=plazo, h=horizonte: amortizacion_hipoteca(200_000.0, 0.028 / 12, p * 12, h))
+    for horizonte in HORIZONTES:
+        a = {**ALQUILER, "horizonte_anios": horizonte}
+        resultado[f"calcular_resultados[horizonte={horizonte}]"] = (
+            lambda a=a: calcular_resultados(COMPRA, a))
+        resumen, df = calcular_resultados(COMPRA, a)
+        resultado[f"generar_pdf[horizonte={horizonte}]"] = (
+            lambda r=resumen, d=df: generar_pdf(r, d))
+        resultado[f"to_csv[horizonte={horizonte}]"] = lambda d=df: d.to_csv(index=False)
+        resultado[f"optimizar_amortizacion[horizonte={horizonte},plazo=40]"] = (
+            lambda a=a: optimizar_amortizacion({**COMPRA, "plazo_hipoteca": 40}, a, 5000.0))
+        for formato in formatos_disponibles():
+            resultado[f"exportar_tabla[formato={formato},horizonte={horizonte}]"] = (
+                lambda d=df, f=formato: exportar_tabla(d, f))
+    for n in LOTES:
+        c, a = escenarios_lote(n)
+        resultado[f"calcular_resultados_lote[n={n}]"] = (
+            lambda c=c, a=a: calcular_resultados_lote(c, a))
+        resultado[f"calcular_resultados_lote[n={n},columnas=False]"] = (
+            lambda c=c, a=a: calcular_resultados_lote(c, a, columnas=False))
+        regiones = np.arange(n) % len(REGIONES)
+        resultado[f"calcular_con_impuestos[n={n}]"] = (
+            lambda c=c, a=a, r=regiones: calcular_con_impuestos(c, a, r))
+        resultado[f"calcular_con_impuestos[n={n},columnas=False]"] = (
+            lambda c=c, a=a, r=regiones: calcular_con_impuestos(c, a, r, columnas=False))
+    for n in TRAYECTORIAS:
+        resultado[f"simular_hipoteca[n={n},modalidad=mixta]"] = (
+            lambda n=n: simular_hipoteca(COMPRA, n, "mixta", 0.8, 5, semilla=0))
+    for entradas in ENTRADAS:
+        rejilla = {"entrada_pct": np.linspace(0, 50, entradas),
+                   "plazo_hipoteca": np.arange(5, 41),
+                   "precio_vivienda": np.linspace(100_000, 490_000, 40)}
+        resultado[f"optimizar_compra[combinaciones={entradas * 36 * 40},procesos=1]"] = (
+            lambda r=rejilla: optimizar_compra(COMPRA, ALQUILER, r, ahorros=100_000.0,
+                                               cuota_maxima=1500.0, procesos=1))
+    for anios in HISTORIA:
+        rng = np.random.default_rng(0)
+        series = dict(zip(SERIES, (np.arange(2025 - anios, 2025.0), rng.normal(4, 6, anios),
+                                   rng.normal(3, 2, anios), rng.normal(8, 17, anios),
+                                   rng.uniform(2, 12, anios))))
+        resultado[f"backtest_historico[anios={anios}]"] = (
+            lambda s=series: backtest_historico(COMPRA, ALQUILER, s))
+    return resultado
+
+
+def medir(funcion, repeticiones: int = 5):
+    """Mejor tiempo por llamada (s) y pico de memoria de una llamada (bytes)."""
+    temporizador = timeit.Timer(funcion)
+    numero, _ = temporizador.autorange()
+    segundos = min(temporizador.repeat(number=numero, repeat=repeticiones)) / numero
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"segundos": segundos, "pico_bytes": pico}
+
+
+def ejecutar(args):
+    seleccion = {k: f for k, f in casos().items() if args.filtro in k}
+    resultados = {}
+    for nombre, funcion in seleccion.items():
+        resultados[nombre] = medir(funcion, args.repeticiones)
+        r = resultados[nombre]
+        print(f"{nombre:<55} {r['segundos'] * 1e3:>10.3f} ms {r['pico_bytes'] / 2**20:>9.2f} MiB")
+    datos = {
+        "meta": {
+            "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "maquina": platform.platform(),
+        },
+        "casos": resultados,
+    }
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(datos, f, indent=2, sort_keys=True)
+        print(f"Resultados guardados en {args.salida}")
+
+
+def comparar(args):
+    with open(args.base) as f:
+        base = json.load(f)["casos"]
+    with open(args.actual) as f:
+        actual = json.load(f)["casos"]
+    umbral_memoria = args.umbral if args.umbral_memoria is None else args.umbral_memoria
+
+    regresiones = []
+    print(f"{'caso':<55} {'tiempo':>9} {'memoria':>9}")
+    for nombre in sorted(base.keys() & actual.keys()):
+        tiempo = actual[nombre]["segundos"] / base[nombre]["segundos"]
+        memoria = (actual[nombre]["pico_bytes"] + 1) / (base[nombre]["pico_bytes"] + 1)
+        marca = ""
+        if tiempo > 1 + args.umbral or memoria > 1 + umbral_memoria:
+            regresiones.append(nombre)
+            marca = "  <- regresión"
+        print(f"{nombre:<55} {tiempo:>8.2f}x {memoria:>8.2f}x{marca}")
+    for nombre in sorted(base.keys() - actual.keys()):
+        print(f"{nombre:<55} sin medir")
+    for nombre in sorted(actual.keys() - base.keys()):
+        print(f"{nombre:<55} nuevo, sin base")
+
+    if regresiones:
+        print(f"{len(regresiones)} casos empeoran más de un "
+              f"{args.umbral:.0%} (tiempo) o {umbral_memoria:.0%} (memoria)")
+        sys.exit(1)
+    print("Sin regresiones")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ordenes = parser.add_subparsers(dest="orden", required=True)
+    orden_ejecutar = ordenes.add_parser("ejecutar", help="mide todos los casos")
+    orden_ejecutar.add_argument("--salida", help="fichero JSON donde guardar los resultados")
+    orden_ejecutar.add_argument("--filtro", default="", help="solo casos cuyo nombre lo contenga")
+    orden_ejecutar.add_argument("--repeticiones", type=int, default=5)
+    orden_ejecutar.set_defaults(funcion=ejecutar)
+    orden_comparar = ordenes.add_parser("comparar", help="compara con una línea base")
+    orden_comparar.add_argument("base")
+    orden_comparar.add_argument("actual")
+    orden_comparar.add_argument("--umbral", type=float, default=0.2,
+                                help="empeoramiento de tiempo admitido (0.2 = 20%%)")
+    orden_comparar.add_argument("--umbral-memoria", type=float,
+                                help="empeoramiento de memoria admitido (por defecto, --umbral)")
+    orden_comparar.set_defaults(funcion=comparar)
+    args = parser.parse_args()
+    args.funcion(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from numbers import Number
+from urllib.parse import urlencode
+
+import metricas
+
+
+# Tramos en los que motor.calcular_resultados divide el cálculo
+TRAMOS = ("hipoteca", "compra", "alquiler", "inversion")
+
+# Valores que calcular_resultados asume cuando falta una clave
+DEFECTOS_COMPRA = {
+    "gasto_propietario_pct": 0.0,
+    "seguro_hogar_eur": 0.0,
+    "seguro_vida_eur": 0.0,
+}
+
+# Datos de un escenario codificado: clave -> (diccionario, tipo, mínimo, máximo),
+# con los mismos límites que los controles del paso 5 de la app
+CAMPOS = {
+    "precio_vivienda": ("compra", int, 50000, 1000000),
+    "entrada_pct": ("compra", int, 0, 50),
+    "gastos_compra_pct": ("compra", int, 0, 15),
+    "tipo_interes_hipoteca": ("compra", float, 0.1, 10.0),
+    "plazo_hipoteca": ("compra", int, 5, 40),
+    "revalorizacion_vivienda_pct": ("compra", float, -5.0, 15.0),
+    "gasto_propietario_pct": ("compra", float, 0.0, 5.0),
+    "seguro_hogar_eur": ("compra", float, 0.0, 5000.0),
+    "seguro_vida_eur": ("compra", float, 0.0, 5000.0),
+    "alquiler_inicial": ("alquiler", int, 300, 5000),
+    "subida_alquiler_anual_pct": ("alquiler", float, 0.0, 10.0),
+    "rentabilidad_inversion_pct": ("alquiler", float, 0.0, 20.0),
+    "horizonte_anios": ("alquiler", int, 1, 40),
+}
+
+
+def normalizar_escenario(c, a):
+    """Devuelve copias de compra y alquiler con los valores por defecto
+    explícitos y los números como float, para que escenarios equivalentes
+    (25 y 25.0, clave ausente o a cero) se representen igual."""
+    def numero(v):
+        return float(v) if isinstance(v, Number) and not isinstance(v, bool) else v
+
+    compra = {**DEFECTOS_COMPRA, **c}
+    alquiler = dict(a)
+    alquiler.setdefault("horizonte_anios", compra["plazo_hipoteca"])
+    return ({k: numero(v) for k, v in compra.items()},
+            {k: numero(v) for k, v in alquiler.items()})
+
+
+def _texto_numero(v) -> str:
+    texto = repr(v)
+    return texto[:-2] if texto.endswith(".0") else texto
+
+
+def codificar_escenario(c, a) -> dict:
+    """Codificación canónica de un escenario como diccionario ordenado de
+    textos, que sirve como parámetros de una URL: 25 y 25.0 se escriben
+    ``"25"`` y las claves ausentes aparecen con su valor por defecto."""
+    compra, alquiler = normalizar_escenario(c, a)
+    return {k: _texto_numero(v) for k, v in sorted({**compra, **alquiler}.items())}
+
+
+def decodificar_escenario(parametros) -> tuple:
+    """Devuelve ``(compra, alquiler)`` a partir de los parámetros de
+    ``codificar_escenario`` (se ignoran los que no son de ``CAMPOS``).
+
+    Los valores tienen el tipo y los límites de los controles de la app; si
+    falta alguno obligatorio o no es válido se lanza ``ValueError``.
+    """
+    escenario = {"compra": {}, "alquiler": {}}
+    for clave, (destino, tipo, minimo, maximo) in CAMPOS.items():
+        if clave not in parametros:
+            continue
+        try:
+            valor = float(parametros[clave])
+        except (TypeError, ValueError):
+            raise ValueError(f"{clave} no es un número: {parametros[clave]!r}") from None
+        if not minimo <= valor <= maximo or (tipo is int and not valor.is_integer()):
+            raise ValueError(f"{clave} debe ser un {'entero' if tipo is int else 'número'} "
+                             f"entre {minimo} y {maximo}")
+        escenario[destino][clave] = tipo(valor)
+    compra, alquiler = escenario["compra"], escenario["alquiler"]
+    faltan = [k for k, (destino, *_) in CAMPOS.items()
+              if k not in escenario[destino] and k not in DEFECTOS_COMPRA
+              and k != "horizonte_anios"]
+    if faltan:
+        raise ValueError(f"Faltan datos del escenario: {', '.join(faltan)}")
+    for clave, valor in DEFECTOS_COMPRA.items():
+        compra.setdefault(clave, valor)
+    alquiler.setdefault("horizonte_anios", compra["plazo_hipoteca"])
+    return compra, alquiler
+
+
+def clave_escenario(c, a) -> str:
+    """Hash canónico (sha256 hex) de un escenario, calculado sobre
+    ``codificar_escenario``."""
+    return hashlib.sha256(urlencode(codificar_escenario(c, a)).encode()).hexdigest()
+
+
+def tamano_resultado(resultado) -> int:
+    """Estimación en bytes de un ``motor.Resultado``: sus arrays más el
+    diccionario del resumen."""
+    resumen = resultado.resumen
+    return (resultado.nbytes + sys.getsizeof(resumen)
+            + sum(sys.getsizeof(v) for v in resumen.values()))
+
+
+def tamano_tramo(valor) -> int:
+    """Bytes de los arrays (y escalares) de un tramo de ``calcular_resultados``."""
+    return sum(getattr(x, "nbytes", 8) for x in valor)
+
+
+class CacheLRU:
+    """Cache LRU limitada por número de entradas y por bytes.
+
+    Conserva como mucho ``max_entradas`` valores y ``max_bytes`` bytes
+    estimados, expulsando primero los usados hace más tiempo. ``aciertos``,
+    ``fallos`` y ``expulsiones`` cuentan el uso acumulado.
+    """
+
+    def __init__(self, max_entradas: int = 32, max_bytes: int = 8 * 1024 * 1024):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def get(self, clave):
+        """Devuelve el valor guardado con ``clave`` o ``None``."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def put(self, clave, valor, tamano: int):
+        """Guarda ``valor``; los que superan ``max_bytes`` por sí solos se ignoran."""
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self.bytes -= anterior[1]
+            self._entradas[clave] = (valor, tamano)
+            self.bytes += tamano
+            while len(self._entradas) > self.max_entradas or self.bytes > self.max_bytes:
+                _, (_, expulsado) = self._entradas.popitem(last=False)
+                self.bytes -= expulsado
+                self.expulsiones += 1
+
+    def calcular(self, clave, generar, tamano=len):
+        """Devuelve el valor de ``clave`` o lo genera con ``generar()`` y lo
+        guarda, midiendo su tamaño con ``tamano``."""
+        valor = self.get(clave)
+        if valor is None:
+            valor = generar()
+            self.put(clave, valor, tamano(valor))
+        return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.bytes = 0
+
+
+class CacheTramos:
+    """Una ``CacheLRU`` por tramo de ``motor.calcular_resultados``, para
+    pasarla como ``tramos``: al cambiar una entrada solo se recalculan los
+    tramos que dependen de ella.
+
+    La hipoteca solo se consulta cuando hay que calcular la compra.
+    ``estadisticas()`` da aciertos y fallos por tramo; cada acierto es un
+    tramo que no se ha vuelto a calcular. Con las métricas activadas también
+    se cuentan en ``app_cache_tramo_total``.
+    """
+
+    def __init__(self, max_entradas: int = 32, max_bytes: int = 2 * 1024 * 1024):
+        self.caches = {tramo: CacheLRU(max_entradas, max_bytes) for tramo in TRAMOS}
+
+    def calcular(self, tramo, clave, generar):
+        cache = self.caches[tramo]
+        valor = cache.get(clave)
+        acierto = valor is not None
+        if not acierto:
+            valor = generar()
+            cache.put(clave, valor, tamano_tramo(valor))
+        metricas.contar("cache_tramo", tramo=tramo,
+                        resultado="acierto" if acierto else "fallo")
+        return valor
+
+    def estadisticas(self):
+        """``{tramo: {"aciertos": n, "fallos": n}}``."""
+        return {tramo: {"aciertos": cache.aciertos, "fallos": cache.fallos}
+                for tramo, cache in self.caches.items()}
+
+    def limpiar(self):
+        for cache in self.caches.values():
+            cache.limpiar()
+
+
+class CacheCompartida(CacheLRU):
+    """``CacheLRU`` para compartir entre sesiones (hilos) del mismo proceso.
+
+    Si varias sesiones piden a la vez una clave que no está, solo la primera
+    la genera y las demás esperan a su resultado.
+    """
+
+    def __init__(self, max_entradas: int = 4096, max_bytes: int = 128 * 1024 * 1024):
+        super().__init__(max_entradas, max_bytes)
+        self._en_curso = {}
+
+    def calcular(self, clave, generar, tamano=len):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[0]
+            evento = self._en_curso.get(clave)
+            propio = evento is None
+            if propio:
+                evento = self._en_curso[clave] = threading.Event()
+                self.fallos += 1
+        if not propio:
+            evento.wait()
+            # Si no se pudo guardar (demasiado grande o ya expulsado), se genera aquí
+            valor = self.get(clave)
+            return generar() if valor is None else valor
+        try:
+            valor = generar()
+            self.put(clave, valor, tamano(valor))
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+            evento.set()
+        return valor
@@ -0,0 +1,112 @@
+import numpy as np
+
+from motor_lote import calcular_resultados_lote
+from sensibilidad import VARIABLES
+
+
+def _escenarios(c, a):
+    """Difunde las entradas del escenario a arrays 1-D de la misma longitud."""
+    claves = list(c) + list(a)
+    valores = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=np.float64))
+                                    for v in (*c.values(), *a.values())))
+    todos = dict(zip(claves, valores))
+    return {k: todos[k] for k in c}, {k: todos[k] for k in a}, valores[0].shape[0]
+
+
+def _evaluador(c, a, variable, escenario, anio):
+    """Función f(valores) = diferencia de patrimonio para cada problema.
+
+    ``escenario`` indica a qué escenario pertenece cada problema y ``anio`` el
+    índice del año a comparar (``None`` para el horizonte de cada escenario).
+    """
+    dic = VARIABLES[variable][0]
+
+    def f(valores, activos):
+        cc = {k: v[escenario[activos]] for k, v in c.items()}
+        aa = {k: v[escenario[activos]] for k, v in a.items()}
+        (cc if dic == "compra" else aa)[variable] = valores
+        resumen, _ = calcular_resultados_lote(cc, aa, columnas=False)
+        if anio is None:
+            return resumen["diferencia_patrimonio"]
+        diferencia = resumen["inversion_alquiler"] - resumen["patrimonio_compra"]
+        return diferencia[np.arange(valores.shape[0]), anio[activos]]
+
+    return f
+
+
+def _illinois(f, bajo, alto, tol_x, tol_eur, max_iter):
+    """Regula falsi (variante Illinois) vectorizada sobre muchos problemas.
+
+    Solo se resuelven los problemas cuya función cambia de signo en el
+    intervalo; el resto devuelve NaN. En cada iteración se evalúan a la vez
+    todos los problemas que aún no han convergido.
+    """
+    todos = np.arange(bajo.shape[0])
+    f_bajo, f_alto = f(bajo, todos), f(alto, todos)
+    raiz = np.full(bajo.shape, np.nan)
+    raiz[f_bajo == 0] = bajo[f_bajo == 0]
+    raiz[f_alto == 0] = alto[f_alto == 0]
+    activos = np.flatnonzero((np.sign(f_bajo) * np.sign(f_alto) < 0))
+    a, b = bajo[activos], alto[activos]
+    fa, fb = f_bajo[activos], f_alto[activos]
+
+    for _ in range(max_iter):
+        if activos.size == 0:
+            break
+        x = b - fb * (b - a) / (fb - fa)
+        fx = f(x, activos)
+        # Si x queda al mismo lado que b se conserva a y se reduce su peso
+        cambia = np.sign(fx) != np.sign(fb)
+        a = np.where(cambia, b, a)
+        fa = np.where(cambia, fb, fa / 2)
+        b, fb = x, fx
+
+        hecho = (np.abs(fx) <= tol_eur) | (np.abs(b - a) <= tol_x)
+        raiz[activos[hecho]] = x[hecho]
+        seguir = ~hecho
+        activos, a, b, fa, fb = activos[seguir], a[seguir], b[seguir], fa[seguir], fb[seguir]
+
+    raiz[activos] = b
+    return raiz
+
+
+def punto_equilibrio(c, a, variable: str, minimo=None, maximo=None,
+                     por_anio: bool = False, tol_x: float = 1e-6,
+                     tol_eur: float = 0.01, max_iter: int = 100):
+    """Valor de ``variable`` con el que comprar y alquilar empatan.
+
+    Busca, entre ``minimo`` y ``maximo`` (por defecto el rango de la variable
+    en la app), el valor en que ``diferencia_patrimonio`` cruza cero. ``c`` y
+    ``a`` pueden contener arrays para resolver muchos escenarios a la vez. Con
+    ``por_anio=True`` resuelve además cada año del horizonte y devuelve un
+    array (N, años) en lugar de (N,). Si no hay cambio de signo en el rango,
+    el resultado es NaN.
+    """
+    if VARIABLES[variable][4]:
+        raise ValueError(f"{variable} es entera; no admite búsqueda de raíces")
+    c, a, n = _escenarios(c, a)
+    rango = VARIABLES[variable]
+    minimo = rango[2] if minimo is None else minimo
+    maximo = rango[3] if maximo is None else maximo
+
+    if por_anio:
+        horizonte = a.get("horizonte_anios", c["plazo_hipoteca"]).astype(np.int64)
+        anios = int(horizonte.max())
+        escenario = np.repeat(np.arange(n), anios)
+        anio = np.tile(np.arange(anios), n)
+        # Los años posteriores al horizonte de un escenario no se resuelven
+        validos = anio < horizonte[escenario]
+        escenario, anio = escenario[validos], anio[validos]
+    else:
+        escenario, anio = np.arange(n), None
+
+    f = _evaluador(c, a, variable, escenario, anio)
+    bajo = np.broadcast_to(np.asarray(minimo, dtype=np.float64), (n,))[escenario]
+    alto = np.broadcast_to(np.asarray(maximo, dtype=np.float64), (n,))[escenario]
+    raiz = _illinois(f, bajo.copy(), alto.copy(), tol_x, tol_eur, max_iter)
+
+    if not por_anio:
+        return raiz
+    resultado = np.full((n, anios), np.nan)
+    resultado[escenario, anio] = raiz
+    return resultado
@@ -0,0 +1,157 @@
+"""Exportación de la tabla anual en CSV, Parquet y Excel (XLSX).
+
+``exportar_tabla`` devuelve los bytes de una tabla en el formato pedido; la
+app la llama solo al descargar y guarda el resultado por escenario.
+``exportar_escenarios`` escribe muchas tablas en un único fichero, en formato
+largo con una columna ``escenario``, sin tenerlas todas en memoria: las junta
+en grupos de ``FILAS_GRUPO`` filas y escribe cada grupo en cuanto se completa
+(en Parquet, como un grupo de filas; en Excel, con el modo de memoria
+constante de xlsxwriter).
+
+Parquet necesita pyarrow y Excel, xlsxwriter; ``formatos_disponibles`` dice
+cuáles se pueden usar con lo instalado.
+"""
+import importlib.util
+import io
+
+# formato -> (tipo MIME, extensión)
+FORMATOS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".xlsx"),
+}
+# formato -> módulo que necesita
+DEPENDENCIAS = {"csv": None, "parquet": "pyarrow", "xlsx": "xlsxwriter"}
+# Filas que exportar_escenarios junta antes de escribirlas
+FILAS_GRUPO = 16_384
+# Filas de una hoja de Excel; las que no caben pasan a una hoja nueva
+FILAS_HOJA = 1_048_576
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("la exportación a Parquet necesita pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def _xlsxwriter():
+    try:
+        import xlsxwriter
+    except ImportError:
+        raise ImportError("la exportación a Excel necesita xlsxwriter: pip install xlsxwriter") from None
+    return xlsxwriter
+
+
+def formatos_disponibles():
+    """Formatos de ``FORMATOS`` cuyas dependencias están instaladas (sin
+    llegar a importarlas)."""
+    return [formato for formato, modulo in DEPENDENCIAS.items()
+            if modulo is None or importlib.util.find_spec(modulo) is not None]
+
+
+def _comprobar_formato(formato):
+    if formato not in FORMATOS:
+        raise ValueError(f"formato de exportación desconocido: {formato!r}")
+
+
+def _filas(df):
+    """Filas de ``df`` como listas de valores de Python, que xlsxwriter
+    escribe como números sin conversiones."""
+    return zip(*(df[col].tolist() for col in df.columns))
+
+
+class _HojasExcel:
+    """Escribe filas en un libro de xlsxwriter, abriendo una hoja nueva (con
+    la cabecera) cada vez que se llena la anterior."""
+
+    def __init__(self, libro, cabecera):
+        self.libro = libro
+        self.cabecera = list(cabecera)
+        self.negrita = libro.add_format({"bold": True})
+        self.hoja = None
+        self.fila = FILAS_HOJA
+
+    def escribir(self, filas):
+        for valores in filas:
+            if self.fila == FILAS_HOJA:
+                self.hoja = self.libro.add_worksheet()
+                self.hoja.write_row(0, 0, self.cabecera, self.negrita)
+                self.fila = 1
+            self.hoja.write_row(self.fila, 0, valores)
+            self.fila += 1
+
+
+def exportar_tabla(df, formato: str = "csv") -> bytes:
+    """Bytes de ``df`` en ``formato`` (``"csv"``, ``"parquet"`` o ``"xlsx"``)."""
+    _comprobar_formato(formato)
+    if formato == "csv":
+        return df.to_csv(index=False).encode()
+    buffer = io.BytesIO()
+    if formato == "parquet":
+        pa = _pyarrow()
+        pa.parquet.write_table(pa.Table.from_pandas(df, preserve_index=False), buffer)
+    else:
+        with _xlsxwriter().Workbook(buffer, {"in_memory": True}) as libro:
+            _HojasExcel(libro, df.columns).escribir(_filas(df))
+    return buffer.getvalue()
+
+
+def _grupos(escenarios, contador):
+    """Junta las tablas de ``escenarios`` con su columna ``escenario`` en
+    DataFrames de al menos ``FILAS_GRUPO`` filas (salvo el último), contando
+    los escenarios en ``contador[0]``."""
+    import pandas as pd
+
+    pendientes, filas = [], 0
+    for nombre, df in escenarios:
+        df = df.copy(deep=False)
+        df.insert(0, "escenario", nombre)
+        pendientes.append(df)
+        filas += len(df)
+        contador[0] += 1
+        if filas >= FILAS_GRUPO:
+            yield pd.concat(pendientes, ignore_index=True)
+            pendientes, filas = [], 0
+    if pendientes:
+        yield pd.concat(pendientes, ignore_index=True)
+
+
+def exportar_escenarios(escenarios, destino: str, formato: str = "csv") -> int:
+    """Escribe en el fichero ``destino`` las tablas de ``escenarios``, un
+    iterable de pares ``(escenario, df)`` con las mismas columnas, una detrás
+    de otra y con la columna ``escenario`` delante.
+
+    Solo tiene en memoria un grupo de unas ``FILAS_GRUPO`` filas, que en
+    Parquet es también un grupo de filas del fichero. Devuelve el número de
+    escenarios escritos.
+    """
+    _comprobar_formato(formato)
+    contador = [0]
+    grupos = _grupos(escenarios, contador)
+    if formato == "csv":
+        with open(destino, "w", newline="") as f:
+            for i, grupo in enumerate(grupos):
+                grupo.to_csv(f, index=False, header=i == 0)
+    elif formato == "parquet":
+        pa = _pyarrow()
+        escritor = None
+        try:
+            for grupo in grupos:
+                tabla = pa.Table.from_pandas(grupo, preserve_index=False)
+                if escritor is None:
+                    escritor = pa.parquet.ParquetWriter(destino, tabla.schema)
+                escritor.write_table(tabla, row_group_size=len(grupo))
+        finally:
+            if escritor is not None:
+                escritor.close()
+    else:
+        with _xlsxwriter().Workbook(destino, {"constant_memory": True}) as libro:
+            hojas = None
+            for grupo in grupos:
+                if hojas is None:
+                    hojas = _HojasExcel(libro, grupo.columns)
+                hojas.escribir(_filas(grupo))
+    return contador[0]
@@ -0,0 +1,138 @@
+import io
+
+import matplotlib.ticker as mticker
+import numpy as np
+from matplotlib.figure import Figure
+
+
+# Mismas opciones que usa st.pyplot al rasterizar
+OPCIONES_PNG = {"format": "png", "dpi": 200, "bbox_inches": "tight"}
+
+
+def figura_png(fig) -> bytes:
+    """Rasteriza una figura a PNG.
+
+    Las figuras se crean con ``Figure`` y no con ``pyplot``, así que no quedan
+    registradas en ningún sitio y se liberan al salir de la función que las
+    crea.
+    """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, **OPCIONES_PNG)
+    return buffer.getvalue()
+
+
+def grafico_lineas(anios, series, etiqueta_y) -> bytes:
+    """PNG de un gráfico de líneas por años con el eje Y en euros.
+
+    ``series`` es una lista de pares ``(valores, etiqueta)``.
+    """
+    fig = Figure()
+    ax = fig.subplots()
+    for valores, etiqueta in series:
+        ax.plot(anios, valores, label=etiqueta)
+    ax.set_xlabel("Años")
+    ax.set_ylabel(etiqueta_y)
+    ax.legend()
+    ax.yaxis.set_major_formatter(mticker.StrMethodFormatter('{x:,.0f}'))
+    return figura_png(fig)
+
+
+def grafico_patrimonio(resumen) -> bytes:
+    """Gráfico "Evolución del patrimonio" del paso de resultados."""
+    return grafico_lineas(resumen["anios"], [
+        (resumen["patrimonio_compra"], "Compra"),
+        (resumen["inversion_alquiler"], "Alquilar e invertir"),
+    ], "Patrimonio (€)")
+
+
+def grafico_costes(resumen) -> bytes:
+    """Gráfico "Coste acumulado" del paso de resultados."""
+    return grafico_lineas(resumen["anios"], [
+        (resumen["coste_compra_acumulado"], "Coste Compra"),
+        (resumen["coste_alquiler_acumulado"], "Coste Alquiler"),
+    ], "Coste acumulado (€)")
+
+
+def figura_montecarlo(mc) -> Figure:
+    """Bandas P5-P95 y mediana del patrimonio de ``simular_montecarlo``."""
+    fig = Figure()
+    ax = fig.subplots()
+    for serie, etiqueta in (("compra", "Compra"), ("alquiler", "Alquilar e invertir")):
+        bandas = mc[serie]
+        linea, = ax.plot(mc["anios"], bandas[50], label=f"{etiqueta} (P50)")
+        ax.fill_between(mc["anios"], bandas[5], bandas[95],
+                        color=linea.get_color(), alpha=0.2,
+                        label=f"{etiqueta} (P5-P95)")
+    ax.set_xlabel("Años")
+    ax.set_ylabel("Patrimonio (€)")
+    ax.legend()
+    ax.yaxis.set_major_formatter(mticker.StrMethodFormatter('{x:,.0f}'))
+    return fig
+
+
+def figura_hipoteca_variable(hv) -> Figure:
+    """Bandas P5-P95 y mediana de la cuota mensual y el capital pendiente de
+    ``simular_hipoteca``."""
+    fig = Figure(figsize=(6.4, 6.4))
+    ejes = fig.subplots(2, 1, sharex=True)
+    for ax, serie, etiqueta in zip(ejes, ("cuota", "capital"),
+                                   ("Cuota mensual (€)", "Capital pendiente (€)")):
+        bandas = hv[serie]
+        linea, = ax.plot(hv["anios"], bandas[50], label="P50")
+        ax.fill_between(hv["anios"], bandas[5], bandas[95],
+                        color=linea.get_color(), alpha=0.2, label="P5-P95")
+        ax.set_ylabel(etiqueta)
+        ax.yaxis.set_major_formatter(mticker.StrMethodFormatter('{x:,.0f}'))
+    ejes[0].legend()
+    ejes[1].set_xlabel("Años")
+    return fig
+
+
+def figura_sensibilidad(valores_x, valores_y, malla, etiqueta_x, etiqueta_y,
+                        punto=(None, None)) -> Figure:
+    """Mapa de calor de la diferencia de patrimonio con la línea de empate y,
+    si se indica, el escenario actual como ``punto``."""
+    fig = Figure()
+    ax = fig.subplots()
+    limite = max(float(np.nanmax(np.abs(malla))), 1.0)
+    mapa = ax.pcolormesh(valores_x, valores_y, malla, cmap="coolwarm",
+                         vmin=-limite, vmax=limite, shading="nearest")
+    if np.nanmin(malla) < 0 < np.nanmax(malla):
+        ax.contour(valores_x, valores_y, malla, levels=[0.0], colors="black")
+    if None not in punto:
+        ax.plot(*punto, "o", color="black")
+    ax.set_xlabel(etiqueta_x)
+    ax.set_ylabel(etiqueta_y)
+    barra = fig.colorbar(mapa, ax=ax, format=mticker.StrMethodFormatter('{x:,.0f}'))
+    barra.set_label("Diferencia patrimonio (€)")
+    return fig
+
+
+def figura_frente(frente, columna, etiqueta_y) -> Figure:
+    """Frente de Pareto de ``optimizar_compra``: ``columna`` frente a la
+    liquidez."""
+    fig = Figure()
+    ax = fig.subplots()
+    ax.plot(frente["liquidez"], frente[columna], "o-", drawstyle="steps-post")
+    ax.set_xlabel("Liquidez tras la compra (€)")
+    ax.set_ylabel(etiqueta_y)
+    for eje in (ax.xaxis, ax.yaxis):
+        eje.set_major_formatter(mticker.StrMethodFormatter('{x:,.0f}'))
+    return fig
+
+
+def figura_backtest(bt) -> Figure:
+    """Bandas P5-P95 y mediana de la diferencia de patrimonio por horizonte
+    de ``backtest_historico``."""
+    fig = Figure()
+    ax = fig.subplots()
+    bandas = bt["diferencia"]
+    linea, = ax.plot(bt["horizontes"], bandas[50], label="P50")
+    ax.fill_between(bt["horizontes"], bandas[5], bandas[95],
+                    color=linea.get_color(), alpha=0.2, label="P5-P95")
+    ax.axhline(0.0, color="black", linewidth=0.8)
+    ax.set_xlabel("Horizonte (años)")
+    ax.set_ylabel("Diferencia patrimonio (€)")
+    ax.legend()
+    ax.yaxis.set_major_formatter(mticker.StrMethodFormatter('{x:,.0f}'))
+    return fig
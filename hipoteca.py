@@ -0,0 +1,44 @@
+import numpy as np
+import numpy_financial as npf
+
+
+def calendario_hipoteca(capital, tasa_mensual, meses, horizonte: int):
+    """Calendario anual de la hipoteca en forma cerrada.
+
+    ``capital``, ``tasa_mensual`` y ``meses`` pueden ser escalares o arrays
+    (se difunden entre sí), de modo que muchas hipotecas se calculan en una
+    sola llamada. Devuelve ``(cuota, amortizado, deuda)``: la cuota mensual con
+    la forma de las entradas y, para los años 0..horizonte en el último eje,
+    lo pagado hasta la fecha y la deuda pendiente (capital más intereses
+    futuros), igual que ``amortizacion_hipoteca``.
+    """
+    capital = np.asarray(capital, dtype=np.float64)
+    tasa_mensual = np.asarray(tasa_mensual, dtype=np.float64)
+    meses = np.asarray(meses, dtype=np.float64)
+
+    cuota = npf.pmt(tasa_mensual, meses, -capital)
+
+    # Con cuota constante, lo pagado al final del año y es cuota * meses pagados
+    meses_anuales = 12.0 * np.arange(horizonte + 1)
+    meses_pagados = np.minimum(meses_anuales, meses[..., None])
+    amortizado = cuota[..., None] * meses_pagados
+    deuda = np.maximum(cuota[..., None] * (meses[..., None] - meses_pagados), 0.0)
+    return cuota, amortizado, deuda
+
+
+def capital_tras(saldo, tasa_mensual, cuota, meses):
+    """Capital pendiente tras pagar ``meses`` cuotas de ``cuota`` a tipo
+    constante; admite arrays y no comprueba que no baje de 0."""
+    sin_interes = tasa_mensual == 0
+    factor = (1 + tasa_mensual) ** meses
+    con_interes = saldo * factor - cuota * (factor - 1) / np.where(sin_interes, 1.0, tasa_mensual)
+    return np.where(sin_interes, saldo - cuota * meses, con_interes)
+
+
+def amortizacion_hipoteca(capital: float, tasa_mensual: float, meses: int,
+                          horizonte: int):
+    """Devuelve la amortización y la deuda pendiente por año considerando
+    capital e intereses."""
+
+    _, amortizado, deuda = calendario_hipoteca(capital, tasa_mensual, meses, horizonte)
+    return amortizado.tolist(), deuda.tolist()
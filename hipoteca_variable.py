@@ -0,0 +1,186 @@
+"""Hipotecas variables y mixtas (Euríbor + diferencial) sobre muchas
+trayectorias del Euríbor a la vez.
+
+En una hipoteca variable el tipo de cada periodo de revisión (un año por
+defecto) es el Euríbor de ese momento más el diferencial; en una mixta, los
+primeros años van a un tipo fijo y después pasan a variable. En cada
+revisión se recalcula la cuota con el capital y los meses que quedan.
+
+El calendario se calcula para todas las trayectorias en bloque: solo se
+recorre cada periodo de revisión (como mucho 40 años) y, dentro de él, la
+evolución del capital a tipo constante tiene forma cerrada.
+
+A diferencia de ``hipoteca.calendario_hipoteca``, que da la deuda como
+cuotas pendientes (capital más intereses futuros), aquí la deuda es el
+capital pendiente, porque los intereses futuros dependen de la trayectoria.
+"""
+import numpy as np
+import numpy_financial as npf
+
+from hipoteca import capital_tras
+
+
+MODALIDADES = ("fija", "variable", "mixta")
+
+# Euríbor a 12 meses como proceso de reversión a la media (Vasicek discreto,
+# anual): x[t+1] = x[t] + reversion * (media - x[t]) + volatilidad * z
+EURIBOR = {"inicial": 2.2, "media": 2.5, "reversion": 0.15, "volatilidad": 0.8}
+
+PERCENTILES = (5, 50, 95)
+
+
+def simular_euribor(n: int, periodos: int, inicial: float = EURIBOR["inicial"],
+                    media: float = EURIBOR["media"], reversion: float = EURIBOR["reversion"],
+                    volatilidad: float = EURIBOR["volatilidad"], semilla=None):
+    """Trayectorias (n, periodos) del Euríbor en %, un valor por revisión;
+    la primera columna es ``inicial``."""
+    rng = np.random.default_rng(semilla)
+    euribor = np.empty((n, periodos))
+    euribor[:, 0] = inicial
+    z = rng.standard_normal((n, periodos - 1))
+    for t in range(1, periodos):
+        anterior = euribor[:, t - 1]
+        euribor[:, t] = anterior + reversion * (media - anterior) + volatilidad * z[:, t - 1]
+    return euribor
+
+
+def tipos_hipoteca(modalidad: str, periodos: int, tipo_fijo: float = 0.0,
+                   diferencial: float = 0.0, euribor=None, periodos_fijos: int = 0):
+    """Tipo anual en % de cada periodo de revisión, (n, periodos).
+
+    - ``"fija"``: ``tipo_fijo`` durante toda la hipoteca.
+    - ``"variable"``: ``euribor + diferencial`` desde el primer periodo (o
+      tras ``periodos_fijos`` a ``tipo_fijo``, como el primer año de muchas
+      hipotecas variables).
+    - ``"mixta"``: ``periodos_fijos`` periodos a ``tipo_fijo`` y después
+      ``euribor + diferencial``.
+
+    ``euribor`` son trayectorias (n, periodos) en % (por ejemplo, de
+    ``simular_euribor``). El tipo nunca baja de 0: la cuota no puede
+    reducirse por un Euríbor negativo.
+    """
+    if modalidad not in MODALIDADES:
+        raise ValueError(f"modalidad de hipoteca desconocida: {modalidad!r}")
+    if modalidad == "fija":
+        return np.full((1, periodos), float(tipo_fijo))
+    if modalidad == "mixta" and periodos_fijos <= 0:
+        raise ValueError("una hipoteca mixta necesita al menos un periodo a tipo fijo")
+    if euribor is None:
+        raise ValueError(f"una hipoteca {modalidad} necesita trayectorias del Euríbor")
+    euribor = np.atleast_2d(np.asarray(euribor, dtype=np.float64))
+    if euribor.shape[1] < periodos:
+        raise ValueError(f"las trayectorias del Euríbor tienen {euribor.shape[1]} periodos "
+                         f"y la hipoteca necesita {periodos}")
+    tipos = np.maximum(euribor[:, :periodos] + diferencial, 0.0)
+    tipos[:, :periodos_fijos] = tipo_fijo
+    return tipos
+
+
+def calendario_variable(capital, tipos, meses: int, horizonte: int,
+                        meses_revision: int = 12):
+    """Calendario anual de una hipoteca cuyo tipo cambia en cada revisión.
+
+    ``tipos`` es (n, periodos) con el tipo anual en % de cada periodo de
+    ``meses_revision`` meses (un divisor de 12); ``capital`` es un escalar o
+    un array de n valores. Al empezar cada periodo la cuota se recalcula con
+    el capital pendiente y los meses que quedan.
+
+    Devuelve un diccionario con arrays (n, horizonte + 1) para los años
+    0..horizonte: ``capital`` pendiente e ``intereses`` y ``pagado``
+    acumulados; ``cuota`` (n, horizonte) con la cuota mensual al empezar cada
+    año; e ``intereses_totales`` (n,) de toda la hipoteca, aunque el plazo
+    supere el horizonte.
+    """
+    if 12 % meses_revision:
+        raise ValueError("meses_revision debe dividir a 12")
+    tipos = np.atleast_2d(np.asarray(tipos, dtype=np.float64))
+    n = tipos.shape[0]
+    periodos = -(-meses // meses_revision)
+    if tipos.shape[1] < periodos:
+        raise ValueError(f"hay tipos para {tipos.shape[1]} periodos y la hipoteca "
+                         f"necesita {periodos}")
+
+    saldo = np.broadcast_to(np.asarray(capital, dtype=np.float64), (n,)).copy()
+    resultado = {
+        "capital": np.zeros((n, horizonte + 1)),
+        "intereses": np.zeros((n, horizonte + 1)),
+        "pagado": np.zeros((n, horizonte + 1)),
+        "cuota": np.zeros((n, horizonte)),
+    }
+    resultado["capital"][:, 0] = saldo
+    intereses = np.zeros(n)
+    pagado = np.zeros(n)
+    por_anio = 12 // meses_revision
+
+    for periodo in range(periodos):
+        mes = periodo * meses_revision
+        tasa = tipos[:, periodo] / 100 / 12
+        duracion = min(meses_revision, meses - mes)
+        cuota = npf.pmt(tasa, meses - mes, -saldo)
+        nuevo = np.maximum(capital_tras(saldo, tasa, cuota, duracion), 0.0)
+        pagado += cuota * duracion
+        intereses += cuota * duracion - (saldo - nuevo)
+        saldo = nuevo
+
+        anio = mes // 12
+        if periodo % por_anio == 0 and anio < horizonte:
+            resultado["cuota"][:, anio] = cuota
+        fin = (mes + duracion) // 12
+        if (mes + duracion) % 12 == 0 and fin <= horizonte:
+            resultado["capital"][:, fin] = saldo
+            resultado["intereses"][:, fin] = intereses
+            resultado["pagado"][:, fin] = pagado
+
+    # Tras el plazo (también a mitad de año) ya no hay deuda ni pagos nuevos
+    ultimo = -(-meses // 12)
+    if ultimo <= horizonte:
+        for clave, valor in (("capital", saldo), ("intereses", intereses), ("pagado", pagado)):
+            resultado[clave][:, ultimo:] = valor[:, None]
+    resultado["intereses_totales"] = intereses
+    return resultado
+
+
+def simular_hipoteca(c, n_trayectorias: int = 10_000, modalidad: str = "variable",
+                     diferencial: float = 1.0, anios_fijos: int = 0, euribor=None,
+                     parametros_euribor=None, horizonte=None, semilla=None,
+                     percentiles=PERCENTILES):
+    """Distribución de la deuda y los intereses de la hipoteca del escenario
+    ``c`` con revisión anual.
+
+    El capital y el plazo salen de ``c`` como en ``calcular_resultados``;
+    ``tipo_interes_hipoteca`` es el tipo de los años fijos. ``euribor`` son
+    trayectorias anuales (n, años) propias; si no se dan, se simulan
+    ``n_trayectorias`` con ``simular_euribor`` y ``parametros_euribor``
+    (sobrescribe ``EURIBOR``). ``horizonte`` es por defecto el plazo.
+
+    Devuelve un diccionario con ``anios``, ``n_trayectorias`` y, como
+    ``{percentil: valores}``, las bandas por año de ``capital`` pendiente,
+    ``intereses`` acumulados y ``cuota`` mensual, y ``intereses_totales`` de
+    toda la hipoteca; más ``intereses_fija``, los intereses totales de la
+    misma hipoteca a tipo fijo para comparar.
+    """
+    precio = c["precio_vivienda"]
+    capital = precio - precio * c["entrada_pct"] / 100
+    plazo = int(c["plazo_hipoteca"])
+    horizonte = plazo if horizonte is None else int(horizonte)
+    tipo_fijo = c["tipo_interes_hipoteca"]
+
+    if modalidad != "fija" and euribor is None:
+        euribor = simular_euribor(n_trayectorias, plazo, semilla=semilla,
+                                  **(parametros_euribor or {}))
+    tipos = tipos_hipoteca(modalidad, plazo, tipo_fijo, diferencial, euribor, anios_fijos)
+    calendario = calendario_variable(capital, tipos, plazo * 12, horizonte)
+    fija = calendario_variable(capital, [[tipo_fijo] * plazo], plazo * 12, 0)
+
+    resultado = {
+        "anios": np.arange(1, horizonte + 1),
+        "n_trayectorias": tipos.shape[0],
+        "intereses_fija": float(fija["intereses_totales"][0]),
+    }
+    for clave, valores in (("capital", calendario["capital"][:, 1:]),
+                           ("intereses", calendario["intereses"][:, 1:]),
+                           ("cuota", calendario["cuota"]),
+                           ("intereses_totales", calendario["intereses_totales"])):
+        bandas = np.percentile(valores, percentiles, axis=0)
+        resultado[clave] = dict(zip(percentiles, bandas))
+    return resultado
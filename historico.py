@@ -0,0 +1,138 @@
+"""Backtest histórico: comprar o alquilar empezando en cada año del pasado.
+
+Las series anuales se leen de un CSV con las columnas de ``COLUMNAS_CSV``:
+``anio``, los índices de precios de vivienda y de alquiler (cualquier base),
+la rentabilidad total de la inversión (bolsa con dividendos, en %) y el tipo
+de las hipotecas nuevas de ese año (en %). La revalorización y la subida del
+alquiler de cada año son la variación de su índice respecto al año anterior,
+así que la serie empieza el segundo año del fichero.
+
+La primera vez las series ya convertidas se guardan como ``.npy``, con una
+huella del CSV (ruta, tamaño y fecha de modificación) por nombre; las siguientes se
+abren con ``np.load(mmap_mode="r")`` sin volver a leer el CSV, y solo se
+traen a memoria las páginas que se usan.
+
+``backtest_historico`` calcula de una vez, con ``calcular_resultados_lote``,
+una cohorte por año de inicio con las trayectorias reales desde ese año.
+Como el horizonte solo recorta la tabla, cada cohorte da la diferencia de
+patrimonio para todos los horizontes que caben en la serie.
+"""
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from motor_lote import calcular_resultados_lote
+
+
+COLUMNAS_CSV = ("anio", "indice_vivienda", "indice_alquiler",
+                "rentabilidad_inversion_pct", "tipo_interes_hipoteca")
+# Filas del .npy: una serie anual por fila, contigua en disco
+SERIES = ("anio", "revalorizacion_vivienda_pct", "subida_alquiler_anual_pct",
+          "rentabilidad_inversion_pct", "tipo_interes_hipoteca")
+PERCENTILES = (5, 50, 95)
+DIRECTORIO = os.path.join(tempfile.gettempdir(), "alquiler_vs_compra_series")
+
+
+def leer_csv(ruta: str) -> np.ndarray:
+    """Lee el CSV de series y devuelve un array (len(SERIES), años)."""
+    df = pd.read_csv(ruta)
+    faltan = [col for col in COLUMNAS_CSV if col not in df.columns]
+    if faltan:
+        raise ValueError(f"faltan columnas en el CSV: {', '.join(faltan)}")
+    df = df[list(COLUMNAS_CSV)].sort_values("anio")
+    if df.isna().any().any():
+        raise ValueError("hay valores vacíos en el CSV")
+    if len(df) < 2 or (np.diff(df["anio"].to_numpy()) != 1).any():
+        raise ValueError("el CSV necesita al menos dos años consecutivos y sin huecos")
+    if (df[["indice_vivienda", "indice_alquiler"]] <= 0).any().any():
+        raise ValueError("los índices del CSV deben ser positivos")
+
+    variacion = df[["indice_vivienda", "indice_alquiler"]].pct_change().iloc[1:] * 100
+    return np.vstack([
+        df["anio"].to_numpy(np.float64)[1:],
+        variacion.to_numpy(np.float64).T,
+        df[["rentabilidad_inversion_pct", "tipo_interes_hipoteca"]].to_numpy(np.float64)[1:].T,
+    ])
+
+
+def _ruta_compilada(ruta: str, directorio: str) -> str:
+    info = os.stat(ruta)
+    huella = f"{os.path.abspath(ruta)}:{info.st_size}:{info.st_mtime_ns}"
+    return os.path.join(directorio, hashlib.sha1(huella.encode()).hexdigest() + ".npy")
+
+
+def cargar_series(ruta: str, directorio: str = DIRECTORIO) -> dict:
+    """Series históricas del CSV ``ruta`` como ``{serie: array por año}``.
+
+    Los arrays son vistas de solo lectura de un ``.npy`` en ``directorio``
+    abierto como memoria mapeada. Si el CSV cambia, su huella cambia y se
+    vuelve a convertir.
+    """
+    compilada = _ruta_compilada(ruta, directorio)
+    if not os.path.exists(compilada):
+        datos = leer_csv(ruta)
+        os.makedirs(directorio, exist_ok=True)
+        # Se escribe aparte y se renombra para que otro proceso nunca lea un fichero a medias
+        temporal = f"{compilada}.{os.getpid()}.tmp"
+        with open(temporal, "wb") as f:
+            np.save(f, datos)
+        os.replace(temporal, compilada)
+    datos = np.load(compilada, mmap_mode="r")
+    return dict(zip(SERIES, datos))
+
+
+def _ventanas(serie, n: int, anios: int):
+    """Vista (n, anios) con la serie desde cada año de inicio (ceros al final)."""
+    relleno = np.concatenate([np.asarray(serie, dtype=np.float64), np.zeros(anios)])
+    return np.lib.stride_tricks.sliding_window_view(relleno, anios)[:n]
+
+
+def backtest_historico(c, a, series, horizonte_max=None, tipo_historico: bool = True,
+                       percentiles=PERCENTILES):
+    """Diferencia de patrimonio (alquiler - compra) de cada cohorte histórica.
+
+    Cada cohorte compra (o alquila) al empezar un año de ``series`` (como
+    las de ``cargar_series``) con los precios, la entrada, el plazo y el
+    alquiler inicial de ``c`` y ``a``, y a partir de ahí la revalorización,
+    la subida del alquiler y la rentabilidad son las de los años
+    siguientes. Con ``tipo_historico`` la hipoteca es a tipo fijo al tipo
+    de su año de inicio; si no, al de ``c``. Los horizontes van de 1 a
+    ``horizonte_max`` (por defecto, toda la serie).
+
+    Devuelve un diccionario con ``inicios`` (año de cada cohorte),
+    ``horizontes``, ``por_cohorte`` (cohortes, horizontes) con NaN donde la
+    serie no llega, y por horizonte el número de ``cohortes``, las bandas de
+    ``diferencia`` como ``{percentil: array}`` y ``prob_alquiler_mejor``.
+    """
+    inicios = np.asarray(series["anio"], dtype=np.int64)
+    n = len(inicios)
+    anios = n if horizonte_max is None else min(int(horizonte_max), n)
+    if anios < 1:
+        raise ValueError("el backtest necesita al menos un año de historia")
+
+    compra = {**c, "revalorizacion_vivienda_pct": _ventanas(
+        series["revalorizacion_vivienda_pct"], n, anios)}
+    if tipo_historico:
+        compra["tipo_interes_hipoteca"] = np.asarray(series["tipo_interes_hipoteca"])
+    alquiler = {
+        **a,
+        "subida_alquiler_anual_pct": _ventanas(series["subida_alquiler_anual_pct"], n, anios),
+        "rentabilidad_inversion_pct": _ventanas(series["rentabilidad_inversion_pct"], n, anios),
+        "horizonte_anios": np.minimum(n - np.arange(n), anios),
+    }
+    resumen, _ = calcular_resultados_lote(compra, alquiler, columnas=False)
+    por_cohorte = resumen["inversion_alquiler"] - resumen["patrimonio_compra"]
+
+    validas = ~np.isnan(por_cohorte)
+    bandas = np.nanpercentile(por_cohorte, percentiles, axis=0)
+    return {
+        "inicios": inicios,
+        "horizontes": np.arange(1, anios + 1),
+        "por_cohorte": por_cohorte,
+        "cohortes": validas.sum(axis=0),
+        "diferencia": dict(zip(percentiles, bandas)),
+        "prob_alquiler_mejor": (por_cohorte > 0).sum(axis=0) / validas.sum(axis=0),
+    }
@@ -0,0 +1,251 @@
+"""Impuestos de la compra y del alquiler por comunidad autónoma.
+
+Aplica a las dos opciones los impuestos que ``gastos_compra_pct`` y
+``gasto_propietario_pct`` solo recogen como un porcentaje fijo:
+
+- Al comprar, ITP en segunda mano (por tramos en algunas comunidades) o, en
+  obra nueva, IVA (IGIC en Canarias) más AJD. Se suman al desembolso inicial,
+  así que quien alquila invierte también ese dinero.
+- Cada año, el IBI sobre el valor catastral, como un gasto más del
+  propietario.
+- Si se vende en un año, la plusvalía municipal: el menor entre el método
+  objetivo (valor catastral del suelo por el coeficiente de los años de
+  tenencia) y la ganancia real atribuible al suelo. Se descuenta del
+  patrimonio de la compra.
+- Si se rescata la inversión en un año, el IRPF de la base del ahorro sobre
+  la ganancia. Se descuenta del patrimonio del alquiler.
+
+La ganancia por vender la vivienda habitual se supone exenta por
+reinversión. Las tablas son los tipos generales orientativos de 2025, sin
+reducciones (jóvenes, familia numerosa, vivienda protegida...) ni
+particularidades forales del IRPF; conviene revisarlas antes de usarlas.
+
+Los tramos de todas las comunidades se compilan al importar en arrays
+(comunidades, tramos) con el umbral, el tipo marginal y la cuota acumulada
+de cada tramo, de modo que calcular un impuesto es indexar la fila de la
+comunidad y buscar el tramo con operaciones vectorizadas, sin ramas en
+Python por escenario.
+"""
+import numpy as np
+import pandas as pd
+
+from motor_lote import calcular_resultados_lote
+
+
+# comunidad: (tramos ITP como (desde €, tipo %), AJD %, IVA o IGIC %)
+COMUNIDADES = {
+    "Andalucía": (((0, 7.0),), 1.2, 10.0),
+    "Aragón": (((0, 8.0), (400_000, 8.5), (450_000, 9.0), (500_000, 9.5), (750_000, 10.0)),
+               1.5, 10.0),
+    "Asturias": (((0, 8.0), (300_000, 9.0), (500_000, 10.0)), 1.2, 10.0),
+    "Illes Balears": (((0, 8.0), (400_000, 9.0), (600_000, 10.0), (1_000_000, 12.0),
+                       (2_000_000, 13.0)), 1.5, 10.0),
+    "Canarias": (((0, 6.5),), 1.0, 7.0),
+    "Cantabria": (((0, 9.0),), 1.5, 10.0),
+    "Castilla-La Mancha": (((0, 9.0),), 1.5, 10.0),
+    "Castilla y León": (((0, 8.0), (250_000, 10.0)), 1.5, 10.0),
+    "Cataluña": (((0, 10.0), (1_000_000, 11.0)), 1.5, 10.0),
+    "Comunitat Valenciana": (((0, 10.0), (1_000_000, 11.0)), 1.5, 10.0),
+    "Extremadura": (((0, 8.0), (360_000, 10.0), (600_000, 11.0)), 1.5, 10.0),
+    "Galicia": (((0, 8.0),), 1.5, 10.0),
+    "Comunidad de Madrid": (((0, 6.0),), 0.75, 10.0),
+    "Región de Murcia": (((0, 7.75),), 1.5, 10.0),
+    "Navarra": (((0, 6.0),), 0.5, 10.0),
+    "País Vasco": (((0, 4.0),), 0.5, 10.0),
+    "La Rioja": (((0, 7.0),), 1.0, 10.0),
+}
+REGIONES = tuple(COMUNIDADES)
+
+# Base del ahorro del IRPF (estatal + autonómica)
+TRAMOS_IRPF_AHORRO = ((0, 19.0), (6_000, 21.0), (50_000, 23.0), (200_000, 27.0),
+                      (300_000, 30.0))
+
+# Coeficientes máximos de la plusvalía municipal por años completos de
+# tenencia (el último vale para 20 años o más)
+COEFICIENTES_PLUSVALIA = (0.15, 0.15, 0.14, 0.15, 0.17, 0.18, 0.19, 0.20, 0.19, 0.15, 0.12,
+                          0.10, 0.09, 0.09, 0.09, 0.10, 0.13, 0.17, 0.23, 0.26, 0.36)
+
+# Dependen del municipio: valores habituales que se pueden sobrescribir
+MUNICIPALES = {
+    "tipo_ibi_pct": 0.6,           # sobre el valor catastral
+    "valor_catastral_pct": 50.0,   # valor catastral sobre el precio de compra
+    "suelo_pct": 40.0,             # parte del valor catastral que es suelo
+    "tipo_plusvalia_pct": 30.0,    # máximo legal
+}
+
+
+def _compilar_tramos(tramos_por_fila):
+    """Arrays (filas, tramos) de umbral, tipo marginal (tanto por uno) y cuota
+    acumulada al llegar a cada umbral. Las filas con menos tramos se rellenan
+    con umbrales infinitos, que nunca se alcanzan."""
+    columnas = max(len(t) for t in tramos_por_fila)
+    umbrales = np.full((len(tramos_por_fila), columnas), np.inf)
+    tipos = np.zeros((len(tramos_por_fila), columnas))
+    acumulado = np.zeros((len(tramos_por_fila), columnas))
+    for i, tramos in enumerate(tramos_por_fila):
+        desde, tipo = np.array(tramos, dtype=np.float64).T
+        umbrales[i, :len(tramos)] = desde
+        tipos[i, :len(tramos)] = tipo / 100
+        acumulado[i, 1:len(tramos)] = np.cumsum(np.diff(desde) * tipo[:-1] / 100)
+    return umbrales, tipos, acumulado
+
+
+_ITP = _compilar_tramos([tramos for tramos, _, _ in COMUNIDADES.values()])
+_AJD = np.array([ajd for _, ajd, _ in COMUNIDADES.values()]) / 100
+_IVA = np.array([iva for _, _, iva in COMUNIDADES.values()]) / 100
+_IRPF = _compilar_tramos([TRAMOS_IRPF_AHORRO])
+_COEFICIENTES = np.array(COEFICIENTES_PLUSVALIA)
+
+
+def indice_region(region):
+    """Posición en ``REGIONES`` de una comunidad o de un array de ellas
+    (nombres o posiciones)."""
+    region = np.asarray(region)
+    if region.dtype.kind in "iu":
+        if ((region < 0) | (region >= len(REGIONES))).any():
+            raise ValueError(f"posición de comunidad fuera de rango: {region}")
+        return region.astype(np.intp)
+    nombres = np.array(REGIONES)
+    orden = np.argsort(nombres)
+    posicion = np.searchsorted(nombres, region, sorter=orden)
+    posicion = orden[np.minimum(posicion, len(nombres) - 1)]
+    desconocidas = np.unique(region[nombres[posicion] != region])
+    if desconocidas.size:
+        raise ValueError(f"comunidades desconocidas: {', '.join(map(str, desconocidas))}")
+    return posicion
+
+
+def cuota_tramos(base, tablas, fila=0):
+    """Cuota de un impuesto por tramos sobre ``base`` con las tablas de
+    ``_compilar_tramos``, usando la fila ``fila`` (escalar o array que se
+    difunde con ``base``)."""
+    umbrales, tipos, acumulado = tablas
+    base = np.maximum(np.asarray(base, dtype=np.float64), 0.0)
+    if np.ndim(fila) == 0:
+        # Una sola tabla (el IRPF): la cuota es lineal a trozos entre umbrales
+        validos = np.isfinite(umbrales[fila])
+        desde, acumulada = umbrales[fila, validos], acumulado[fila, validos]
+        return (np.interp(base, desde, acumulada)
+                + np.maximum(base - desde[-1], 0.0) * tipos[fila, validos][-1])
+    # Tramo de cada base: cuántos umbrales (además del 0) alcanza
+    base, fila = np.broadcast_arrays(base, fila)
+    tramo = (base[..., None] >= umbrales[fila][..., 1:]).sum(axis=-1)
+    desde = umbrales[fila, tramo]
+    return acumulado[fila, tramo] + (base - desde) * tipos[fila, tramo]
+
+
+def impuestos_compra(precio, region, obra_nueva=False):
+    """ITP (segunda mano) o IVA + AJD (obra nueva), en euros."""
+    region = indice_region(region)
+    itp = cuota_tramos(precio, _ITP, region)
+    nueva = np.asarray(precio, dtype=np.float64) * (_IVA[region] + _AJD[region])
+    return np.where(obra_nueva, nueva, itp)
+
+
+def irpf_ahorro(ganancia):
+    """IRPF de la base del ahorro sobre una ganancia (0 si es pérdida)."""
+    return cuota_tramos(ganancia, _IRPF)
+
+
+def plusvalia_municipal(precio, valor, anios, municipales=None):
+    """Plusvalía municipal al vender por ``valor`` tras ``anios`` completos
+    una vivienda comprada por ``precio``; 0 si no hay ganancia."""
+    m = {**MUNICIPALES, **(municipales or {})}
+    precio = np.asarray(precio, dtype=np.float64)
+    ganancia = np.asarray(valor, dtype=np.float64) - precio
+    suelo = m["suelo_pct"] / 100
+    catastral_suelo = precio * m["valor_catastral_pct"] / 100 * suelo
+    coeficiente = _COEFICIENTES[np.minimum(np.asarray(anios, dtype=np.intp), len(_COEFICIENTES) - 1)]
+    base = np.minimum(catastral_suelo * coeficiente, np.maximum(ganancia, 0.0) * suelo)
+    return base * m["tipo_plusvalia_pct"] / 100
+
+
+def calcular_con_impuestos(c, a, region, obra_nueva=False, municipales=None,
+                           columnas: bool = True):
+    """``calcular_resultados_lote`` con los impuestos de ``region``.
+
+    ``region`` es una comunidad de ``REGIONES`` (nombre o posición) o un
+    array de N, y ``obra_nueva`` un booleano o un array de N; se difunden
+    con el resto de entradas, así que ``region=REGIONES`` calcula el mismo
+    escenario en las 17 comunidades. Aquí ``gastos_compra_pct`` y
+    ``gasto_propietario_pct`` son los gastos sin impuestos (notaría,
+    registro, comunidad, mantenimiento...). ``municipales`` sobrescribe
+    ``MUNICIPALES``.
+
+    Devuelve ``(resumen, tabla)`` como ``calcular_resultados_lote``, con el
+    patrimonio de cada año neto de la plusvalía (compra) y del IRPF
+    (alquiler) que se pagarían vendiendo o rescatando ese año, y además
+    ``impuestos_compra``, ``ibi_anual``, ``plusvalia_municipal`` e
+    ``irpf_inversion`` al horizonte. Con ``columnas=False`` la tabla es
+    ``None`` y los impuestos solo se calculan al horizonte, así que el
+    resumen no trae las series anuales ``patrimonio_compra`` e
+    ``inversion_alquiler``.
+    """
+    m = {**MUNICIPALES, **(municipales or {})}
+    region = indice_region(region)
+    precio = np.asarray(c["precio_vivienda"], dtype=np.float64)
+    impuestos = impuestos_compra(precio, region, obra_nueva)
+    ibi_pct = m["tipo_ibi_pct"] * m["valor_catastral_pct"] / 100
+    compra = {
+        **c,
+        "gastos_compra_pct": np.asarray(c["gastos_compra_pct"]) + impuestos / precio * 100,
+        "gasto_propietario_pct": np.asarray(c.get("gasto_propietario_pct", 0.0)) + ibi_pct,
+    }
+    resumen, tabla = calcular_resultados_lote(compra, a, columnas=columnas)
+
+    n = len(resumen["desembolso_inicial_compra"])
+    precio = np.broadcast_to(precio, (n,))
+    horizonte = np.broadcast_to(np.asarray(a.get("horizonte_anios", c["plazo_hipoteca"])),
+                                (n,)).astype(np.int64)
+    if columnas:
+        valor = tabla["Precio Vivienda (EUR)"][:, 1:]
+        plusvalia = plusvalia_municipal(precio[:, None], valor, resumen["anios"], m)
+        inversion = tabla["Inversión acumulada (EUR)"][:, 1:]
+        irpf = irpf_ahorro(inversion - tabla["Total invertido (EUR)"][:, 1:])
+        patrimonio_compra = resumen["patrimonio_compra"] - plusvalia
+        patrimonio_alquiler = inversion - irpf
+
+        def final(serie):
+            return np.take_along_axis(serie, horizonte[:, None] - 1, axis=1)[:, 0]
+
+        plusvalia, irpf = final(plusvalia), final(irpf)
+        resumen.update({"patrimonio_compra": patrimonio_compra,
+                        "inversion_alquiler": patrimonio_alquiler})
+    else:
+        # Sin las series anuales, que quedarían sin descontar los impuestos
+        del resumen["patrimonio_compra"], resumen["inversion_alquiler"]
+        plusvalia = plusvalia_municipal(precio, resumen["valor_prop_final"], horizonte, m)
+        irpf = irpf_ahorro(resumen["valor_final_inversion"] - resumen["capital_total_invertido"])
+
+    patrimonio_final = resumen["patrimonio_neto_final"] - plusvalia
+    patrimonio_final_alq = resumen["valor_final_inversion"] - irpf
+    resumen.update({
+        "patrimonio_neto_final": patrimonio_final,
+        "patrimonio_neto_final_alq": patrimonio_final_alq,
+        "diferencia_patrimonio": patrimonio_final_alq - patrimonio_final,
+        "impuestos_compra": np.broadcast_to(impuestos, (n,)),
+        "ibi_anual": precio * ibi_pct / 100,
+        "plusvalia_municipal": plusvalia,
+        "irpf_inversion": irpf,
+    })
+    if not columnas:
+        return resumen, None
+    for columna, serie in (("Patrimonio neto compra (EUR)", patrimonio_compra),
+                           ("Patrimonio neto alquiler (EUR)", patrimonio_alquiler)):
+        tabla[columna] = np.concatenate([tabla[columna][:, :1], serie], axis=1)
+    return resumen, tabla
+
+
+def comparar_regiones(c, a, obra_nueva: bool = False, municipales=None) -> pd.DataFrame:
+    """El mismo escenario en las 17 comunidades, en una sola pasada."""
+    resumen, _ = calcular_con_impuestos(c, a, np.arange(len(REGIONES)), obra_nueva,
+                                        municipales, columnas=False)
+    return pd.DataFrame({
+        "Comunidad": REGIONES,
+        "Impuestos compra (€)": resumen["impuestos_compra"],
+        "Plusvalía (€)": resumen["plusvalia_municipal"],
+        "IRPF inversión (€)": resumen["irpf_inversion"],
+        "Patrimonio compra (€)": resumen["patrimonio_neto_final"],
+        "Patrimonio alquiler (€)": resumen["patrimonio_neto_final_alq"],
+        "Diferencia (€)": resumen["diferencia_patrimonio"],
+    })
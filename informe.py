@@ -0,0 +1,164 @@
+from fpdf import FPDF
+
+
+ETIQUETAS = {
+    "desembolso_inicial_compra": "Desembolso inicial compra",
+    "costes_compra": "Costes acumulados compra",
+    "valor_prop_final": "Valor estimado propiedad",
+    "hipoteca_pendiente": "Hipoteca pendiente",
+    "patrimonio_neto_final": "Patrimonio neto final compra",
+    "inversion_inicial_alq": "Inversión inicial alquiler",
+    "costes_alquiler_total": "Costes alquiler acumulados",
+    "capital_total_invertido": "Capital total invertido",
+    "valor_final_inversion": "Valor final inversión",
+    "patrimonio_neto_final_alq": "Patrimonio neto final alquiler",
+    "diferencia_patrimonio": "Diferencia patrimonio final",
+    "diferencia_costes": "Diferencia costes acumulados",
+}
+
+TAMANO_TABLA = 7
+MARGEN_CELDA = 1.5
+
+
+def _texto(valor):
+    """Texto de una celda: números sin decimales y con separador de miles."""
+    if isinstance(valor, float):
+        return f"{valor:,.0f}"
+    return str(valor).replace("€", "EUR")
+
+
+def _partir(pdf, texto, ancho):
+    """Parte una cabecera en líneas que quepan en ``ancho``."""
+    lineas, actual = [], ""
+    for palabra in texto.split():
+        candidata = f"{actual} {palabra}".strip()
+        if actual and pdf.get_string_width(candidata) > ancho:
+            lineas.append(actual)
+            actual = palabra
+        else:
+            actual = candidata
+    return lineas + [actual]
+
+
+def _maquetar_tabla(pdf, df):
+    """Formatea todas las celdas y calcula los anchos una sola vez.
+
+    Cada columna recibe un ancho proporcional a su texto más largo (valores o
+    palabra más larga de la cabecera), escalado al ancho de la página.
+    Devuelve las filas como pares (texto, ancho del texto), los anchos de
+    columna y las líneas de cada cabecera.
+    """
+    columnas = [[_texto(v) for v in df[col].tolist()] for col in df.columns]
+    # Mide cada carácter una vez y suma por texto, sin pasar por FPDF en cada celda
+    caracteres = set().union(*(set("".join(valores)) for valores in columnas))
+    ancho_car = {ch: pdf.get_string_width(ch) for ch in caracteres}
+    medidas = [[sum(map(ancho_car.__getitem__, t)) for t in valores] for valores in columnas]
+    cabeceras = [_texto(col) for col in df.columns]
+
+    ancho_pagina = pdf.w - pdf.l_margin - pdf.r_margin
+    naturales = [
+        max(anchos_texto + [pdf.get_string_width(p) for p in cabecera.split()])
+        + 2 * MARGEN_CELDA
+        for cabecera, anchos_texto in zip(cabeceras, medidas)
+    ]
+    escala = ancho_pagina / sum(naturales)
+    anchos = [a * escala for a in naturales]
+    lineas_cabecera = [_partir(pdf, c, a - 2 * MARGEN_CELDA) for c, a in zip(cabeceras, anchos)]
+    filas = list(zip(*(list(zip(t, m)) for t, m in zip(columnas, medidas))))
+    return filas, anchos, lineas_cabecera
+
+
+def _cabecera_tabla(pdf, anchos, lineas_cabecera, alto):
+    """Dibuja la cabecera de la tabla en la posición actual."""
+    n_lineas = max(len(lineas) for lineas in lineas_cabecera)
+    x0, y0 = pdf.get_x(), pdf.get_y()
+    x = x0
+    for ancho, lineas in zip(anchos, lineas_cabecera):
+        pdf.rect(x, y0, ancho, alto * n_lineas)
+        for i, linea in enumerate(lineas):
+            pdf.set_xy(x, y0 + i * alto)
+            pdf.cell(ancho, alto, linea, align="C")
+        x += ancho
+    pdf.set_xy(x0, y0 + alto * n_lineas)
+
+
+def _rejilla(pdf, bordes, y0, y1, alto):
+    """Dibuja las líneas de un bloque de filas entre ``y0`` e ``y1``."""
+    for x in bordes:
+        pdf.line(x, y0, x, y1)
+    y = y0
+    while y <= y1 + 1e-6:
+        pdf.line(bordes[0], y, bordes[-1], y)
+        y += alto
+
+
+def _tabla(pdf, df):
+    """Escribe la tabla de resultados, repitiendo la cabecera en cada página
+    y sin partir filas entre páginas.
+
+    En lugar de una celda con borde por valor, cada página dibuja su rejilla
+    con una línea por fila y columna y escribe los textos ya medidos,
+    alineados a la derecha.
+    """
+    pdf.set_font("Helvetica", size=TAMANO_TABLA)
+    alto = pdf.font_size + 1
+    filas, anchos, lineas_cabecera = _maquetar_tabla(pdf, df)
+    margen = pdf.b_margin
+    limite = pdf.h - margen
+    alto_cabecera = alto * max(len(lineas) for lineas in lineas_cabecera)
+    bordes = [pdf.l_margin]
+    for ancho in anchos:
+        bordes.append(bordes[-1] + ancho)
+    derechas = [b - MARGEN_CELDA for b in bordes[1:]]
+    # Desplazamiento de la línea base dentro de la fila, como en FPDF.cell
+    base = 0.5 * alto + 0.3 * pdf.font_size
+
+    # Los saltos de página los decide la tabla para no partir filas
+    pdf.set_auto_page_break(False)
+    if pdf.get_y() + alto_cabecera + alto > limite:
+        pdf.add_page()
+    _cabecera_tabla(pdf, anchos, lineas_cabecera, alto)
+    inicio = y = pdf.get_y()
+    for fila in filas:
+        if y + alto > limite:
+            _rejilla(pdf, bordes, inicio, y, alto)
+            pdf.add_page()
+            _cabecera_tabla(pdf, anchos, lineas_cabecera, alto)
+            inicio = y = pdf.get_y()
+        for (texto, ancho_texto), derecha in zip(fila, derechas):
+            pdf.text(derecha - ancho_texto, y + base, texto)
+        y += alto
+    _rejilla(pdf, bordes, inicio, y, alto)
+    pdf.set_xy(pdf.l_margin, y)
+    pdf.set_auto_page_break(True, margen)
+
+
+def generar_pdf(resumen, df):
+    """Genera un PDF con el resumen y la tabla de resultados."""
+    pdf = FPDF(orientation="L", unit="mm", format="A4")
+    pdf.add_page()
+
+    pdf.set_font("Helvetica", "B", 16)
+    pdf.cell(0, 10, "Resultados Alquiler vs Compra", ln=True, align="C")
+    pdf.ln(5)
+
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(0, 10, "Resumen", ln=True)
+
+    pdf.set_font("Helvetica", size=11)
+    for k, label in ETIQUETAS.items():
+        val = resumen.get(k, "")
+        if isinstance(val, float):
+            val = f"{val:,.0f} EUR"
+        pdf.cell(0, 8, f"{label}: {val}", ln=True)
+
+    pdf.ln(5)
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(0, 10, "Resultados por año", ln=True)
+    _tabla(pdf, df)
+
+    # fpdf devuelve str en latin-1; fpdf2, bytearray
+    contenido = pdf.output(dest="S")
+    if isinstance(contenido, str):
+        return contenido.encode("latin-1")
+    return bytes(contenido)
@@ -0,0 +1,268 @@
+"""Tiempos por etapa de cada ejecución de la app.
+
+Se activa con la variable de entorno ``METRICAS``:
+
+- ``prometheus``: histogramas en formato de texto de Prometheus en
+  ``http://<METRICAS_HOST>:<METRICAS_PUERTO>/metrics`` (127.0.0.1:9464 por
+  defecto, solo accesible desde la propia máquina).
+- ``log``: una línea JSON por ejecución en el logger ``metricas``.
+
+Sin la variable, ``etapa`` devuelve siempre el mismo contexto vacío y no se
+mide nada.
+
+Cada ejecución de la app llama a ``iniciar`` con el paso y la sesión, mide
+sus etapas con ``with etapa("calculo"):`` y termina con ``terminar``. Las
+que no llegan a ``terminar`` también se cuentan: las que acaban con
+``st.rerun()`` al empezar la siguiente, que Streamlit lanza en el mismo
+hilo, y las que acaban con un error cuando termina su hilo.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Límites superiores de los intervalos de los histogramas, en segundos
+LIMITES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Descripción de los contadores de ``contar`` en la exposición de Prometheus
+AYUDAS = {"cache_tramo": "Consultas a la cache de cada tramo del cálculo.",
+          "trabajos": "Trabajos en segundo plano acabados, por estado final."}
+# Una sesión cuenta como activa si ha ejecutado la app en este tiempo
+VENTANA_SESION = 600.0
+
+log = logging.getLogger("metricas")
+
+
+class Histograma:
+    """Histograma acumulado al estilo de Prometheus."""
+
+    def __init__(self):
+        self.cuentas = [0] * (len(LIMITES) + 1)
+        self.suma = 0.0
+        self.n = 0
+
+    def observar(self, segundos):
+        i = 0
+        while i < len(LIMITES) and segundos > LIMITES[i]:
+            i += 1
+        self.cuentas[i] += 1
+        self.suma += segundos
+        self.n += 1
+
+
+class Registro:
+    """Histogramas por etapa y paso, ejecuciones por paso, contadores y
+    sesiones vistas."""
+
+    def __init__(self):
+        self.histogramas = {}
+        self.ejecuciones = {}
+        self.contadores = {}
+        self.sesiones = {}
+        self._lock = threading.Lock()
+
+    def observar(self, etapa, paso, segundos):
+        with self._lock:
+            clave = (etapa, paso)
+            if clave not in self.histogramas:
+                self.histogramas[clave] = Histograma()
+            self.histogramas[clave].observar(segundos)
+
+    def contar(self, nombre, etiquetas):
+        with self._lock:
+            clave = (nombre, tuple(sorted(etiquetas.items())))
+            self.contadores[clave] = self.contadores.get(clave, 0) + 1
+
+    def ejecucion(self, paso, sesion):
+        ahora = time.monotonic()
+        with self._lock:
+            self.ejecuciones[paso] = self.ejecuciones.get(paso, 0) + 1
+            self.sesiones[sesion] = ahora
+            # Olvida las sesiones inactivas para que el diccionario no crezca
+            if len(self.sesiones) > 1000:
+                self.sesiones = {s: t for s, t in self.sesiones.items()
+                                 if ahora - t <= VENTANA_SESION}
+
+    def sesiones_activas(self):
+        ahora = time.monotonic()
+        with self._lock:
+            return sum(ahora - t <= VENTANA_SESION for t in self.sesiones.values())
+
+    def texto_prometheus(self):
+        """Exposición en formato de texto de Prometheus."""
+        lineas = [
+            "# HELP app_etapa_segundos Duración de cada etapa de una ejecución.",
+            "# TYPE app_etapa_segundos histogram",
+        ]
+        with self._lock:
+            histogramas = sorted(self.histogramas.items(), key=lambda x: (str(x[0][1]), x[0][0]))
+            for (etapa, paso), h in histogramas:
+                etiquetas = f'etapa="{etapa}",paso="{paso}"'
+                acumulado = 0
+                for limite, cuenta in zip(LIMITES + ("+Inf",), h.cuentas):
+                    acumulado += cuenta
+                    lineas.append(f'app_etapa_segundos_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+                lineas.append(f"app_etapa_segundos_sum{{{etiquetas}}} {h.suma}")
+                lineas.append(f"app_etapa_segundos_count{{{etiquetas}}} {h.n}")
+            lineas += [
+                "# HELP app_ejecuciones_total Ejecuciones de la app por paso.",
+                "# TYPE app_ejecuciones_total counter",
+            ]
+            lineas += [f'app_ejecuciones_total{{paso="{p}"}} {n}'
+                       for p, n in sorted(self.ejecuciones.items(), key=lambda x: str(x[0]))]
+            anterior = None
+            for (nombre, etiquetas), n in sorted(self.contadores.items()):
+                if nombre != anterior:
+                    if nombre in AYUDAS:
+                        lineas.append(f"# HELP app_{nombre}_total {AYUDAS[nombre]}")
+                    lineas.append(f"# TYPE app_{nombre}_total counter")
+                    anterior = nombre
+                texto = ",".join(f'{k}="{v}"' for k, v in etiquetas)
+                lineas.append(f"app_{nombre}_total{{{texto}}} {n}")
+        lineas += [
+            "# HELP app_sesiones_activas Sesiones con actividad reciente.",
+            "# TYPE app_sesiones_activas gauge",
+            f"app_sesiones_activas {self.sesiones_activas()}",
+        ]
+        return "\n".join(lineas) + "\n"
+
+
+class _Nulo:
+    """Contexto que no hace nada, para cuando las métricas están desactivadas."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Etapa:
+    def __init__(self, nombre, paso, ejecucion):
+        self.nombre = nombre
+        self.paso = paso
+        self.ejecucion = ejecucion
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self.inicio
+        registro.observar(self.nombre, self.paso, segundos)
+        if self.ejecucion is not None:
+            etapas = self.ejecucion["etapas"]
+            etapas[self.nombre] = etapas.get(self.nombre, 0.0) + segundos
+        return False
+
+
+NULO = _Nulo()
+registro = Registro()
+modo = None
+_local = threading.local()
+_servidor = None
+_lock_activar = threading.Lock()
+
+
+def activar(nuevo_modo, puerto: int = 9464, host: str = "127.0.0.1"):
+    """Activa las métricas en modo ``"prometheus"`` o ``"log"``; con ``None``
+    las desactiva. El servidor HTTP escucha en ``host`` (``"0.0.0.0"`` para
+    todas las interfaces) y se arranca una sola vez por proceso."""
+    global modo, _servidor
+    if nuevo_modo not in (None, "prometheus", "log"):
+        raise ValueError(f"modo de métricas desconocido: {nuevo_modo!r}")
+    with _lock_activar:
+        if nuevo_modo == "prometheus" and _servidor is None:
+            try:
+                _servidor = ThreadingHTTPServer((host, puerto), _Manejador)
+            except OSError as e:
+                # Otro proceso de la app ya sirve las métricas en ese puerto
+                log.warning("No se puede servir métricas en %s:%s: %s", host, puerto, e)
+            else:
+                threading.Thread(target=_servidor.serve_forever, daemon=True).start()
+        if nuevo_modo == "log" and not log.handlers:
+            log.addHandler(logging.StreamHandler())
+            log.setLevel(logging.INFO)
+        modo = nuevo_modo
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = registro.texto_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Centinela:
+    """Objeto que solo guarda el hilo: se libera cuando el hilo termina."""
+
+
+def iniciar(paso, sesion=None):
+    """Empieza a medir una ejecución de la app en este hilo, cerrando antes
+    la anterior si no llegó a ``terminar``."""
+    if modo is None:
+        return
+    terminar()
+    registro.ejecucion(paso, sesion)
+    ejecucion = {"paso": paso, "inicio": time.perf_counter(), "etapas": {}}
+    _local.ejecucion = ejecucion
+    _local.centinela = _Centinela()
+    _local.cierre = weakref.finalize(_local.centinela, _cerrar, ejecucion)
+
+
+def etapa(nombre: str, paso=None):
+    """Contexto que mide una etapa. Fuera de una ejecución (por ejemplo, al
+    generar una descarga) se puede indicar el ``paso`` explícitamente."""
+    if modo is None:
+        return NULO
+    ejecucion = getattr(_local, "ejecucion", None)
+    if paso is None and ejecucion is not None:
+        paso = ejecucion["paso"]
+    return _Etapa(nombre, paso, ejecucion)
+
+
+def contar(nombre: str, **etiquetas):
+    """Suma uno al contador ``app_<nombre>_total`` con esas etiquetas."""
+    if modo is not None:
+        registro.contar(nombre, etiquetas)
+
+
+def terminar():
+    """Cierra la ejecución en curso: registra el total y, en modo ``log``,
+    escribe una línea con todas sus etapas."""
+    cierre = getattr(_local, "cierre", None)
+    if cierre is None:
+        return
+    _local.ejecucion = _local.centinela = _local.cierre = None
+    # Llamar al finalizador lo ejecuta una sola vez: al liberar el centinela ya no hace nada
+    cierre()
+
+
+def _cerrar(ejecucion):
+    if modo is None:
+        return
+    total = time.perf_counter() - ejecucion["inicio"]
+    registro.observar("total", ejecucion["paso"], total)
+    if modo == "log":
+        log.info(json.dumps({
+            "paso": ejecucion["paso"],
+            "sesiones": registro.sesiones_activas(),
+            "total": round(total, 6),
+            "etapas": {k: round(v, 6) for k, v in ejecucion["etapas"].items()},
+        }))
+
+
+if os.environ.get("METRICAS"):
+    activar(os.environ["METRICAS"], int(os.environ.get("METRICAS_PUERTO", 9464)),
+            os.environ.get("METRICAS_HOST", "127.0.0.1"))
@@ -0,0 +1,208 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from motor_lote import calcular_resultados_lote
+
+
+VARIABLES = (
+    "revalorizacion_vivienda_pct",
+    "rentabilidad_inversion_pct",
+    "subida_alquiler_anual_pct",
+)
+
+DISTRIBUCIONES = {
+    "revalorizacion_vivienda_pct": {"tipo": "normal", "desviacion": 4.0},
+    "rentabilidad_inversion_pct": {"tipo": "t", "desviacion": 15.0, "gl": 5},
+    "subida_alquiler_anual_pct": {"tipo": "normal", "desviacion": 1.5},
+}
+
+# Orden de VARIABLES: vivienda, inversión, alquiler
+CORRELACION = (
+    (1.0, 0.2, 0.6),
+    (0.2, 1.0, 0.1),
+    (0.6, 0.1, 1.0),
+)
+
+SERIES = ("compra", "alquiler", "diferencia")
+PERCENTILES = (5, 50, 95)
+
+
+def _distribuciones(c, a, distribuciones):
+    """Completa la configuración de cada variable con la media del escenario."""
+    medias = {**c, **a}
+    resultado = {}
+    for var in VARIABLES:
+        conf = {"media": medias[var], **DISTRIBUCIONES[var]}
+        conf.update((distribuciones or {}).get(var, {}))
+        resultado[var] = conf
+    return resultado
+
+
+def muestrear_trayectorias(rng, n, anios, distribuciones, correlacion=CORRELACION):
+    """Genera trayectorias anuales (n, anios) correlacionadas de cada variable.
+
+    Cada variable sigue una normal o una t de Student (``"tipo": "t"`` con
+    ``"gl"`` grados de libertad) con la media y desviación configuradas; la
+    correlación entre variables se impone sobre las innovaciones normales.
+    """
+    cholesky = np.linalg.cholesky(np.asarray(correlacion, dtype=np.float64))
+    z = np.einsum("ij,jnt->int", cholesky, rng.standard_normal((len(VARIABLES), n, anios)))
+    trayectorias = {}
+    for i, var in enumerate(VARIABLES):
+        conf = distribuciones[var]
+        if conf["tipo"] == "t":
+            gl = conf["gl"]
+            if gl <= 2:
+                raise ValueError(f"La t de Student necesita más de 2 grados de libertad: {gl}")
+            # Escala a varianza unitaria para que "desviacion" signifique lo mismo
+            z[i] *= np.sqrt((gl - 2) / rng.chisquare(gl, (n, anios)))
+        elif conf["tipo"] != "normal":
+            raise ValueError(f"Distribución desconocida: {conf['tipo']}")
+        # Una caída del 100% o más anularía el valor acumulado
+        trayectorias[var] = np.maximum(conf["media"] + conf["desviacion"] * z[i], -99.0)
+    return trayectorias
+
+
+def _simular_bloque(c, a, n, semilla, distribuciones, correlacion):
+    """Patrimonio por año (3, n, anios) de un bloque de trayectorias."""
+    anios = int(a.get("horizonte_anios", c["plazo_hipoteca"]))
+    rng = np.random.default_rng(semilla)
+    trayectorias = muestrear_trayectorias(rng, n, anios, distribuciones, correlacion)
+    resumen, _ = calcular_resultados_lote(
+        {**c, **{k: v for k, v in trayectorias.items() if k in c}},
+        {**a, **{k: v for k, v in trayectorias.items() if k in a}},
+        columnas=False,
+    )
+    compra = resumen["patrimonio_compra"]
+    alquiler = resumen["inversion_alquiler"]
+    return np.stack([compra, alquiler, alquiler - compra])
+
+
+def _histograma_bloque(c, a, n, semilla, distribuciones, correlacion, bordes):
+    """Cuenta cada serie y año de un bloque en los intervalos de ``bordes``.
+
+    Devuelve los conteos (3, anios, intervalos) y cuántas trayectorias acaban
+    con más patrimonio alquilando. Los valores fuera de rango se acumulan en
+    los intervalos extremos.
+    """
+    return _contar(_simular_bloque(c, a, n, semilla, distribuciones, correlacion), bordes)
+
+
+def _contar(valores, bordes):
+    """Conteos (3, anios, intervalos) y trayectorias con ventaja del alquiler
+    de un bloque ya simulado."""
+    minimo, ancho, intervalos = bordes
+    idx = ((valores - minimo[:, None, :]) / ancho[:, None, :]).astype(np.int64)
+    np.clip(idx, 0, intervalos - 1, out=idx)
+    series, _, anios = valores.shape
+    # Desplaza cada (serie, año) a su propio tramo para un único bincount
+    idx += (np.arange(series * anios).reshape(series, 1, anios) * intervalos)
+    conteos = np.bincount(idx.ravel(), minlength=series * anios * intervalos)
+    return conteos.reshape(series, anios, intervalos), int((valores[2, :, -1] > 0).sum())
+
+
+def _percentiles(conteos, bordes, percentiles):
+    """Percentiles interpolados dentro de cada intervalo del histograma."""
+    minimo, ancho, _ = bordes
+    acumulado = np.cumsum(conteos, axis=-1)
+    total = acumulado[..., -1:]
+    resultado = {}
+    for p in percentiles:
+        objetivo = total * p / 100
+        pos = np.argmax(acumulado >= objetivo, axis=-1)[..., None]
+        hasta = np.take_along_axis(acumulado, pos, axis=-1)
+        en_intervalo = np.take_along_axis(conteos, pos, axis=-1)
+        fraccion = 1 - (hasta - objetivo) / np.maximum(en_intervalo, 1)
+        resultado[p] = (minimo + (pos[..., 0] + fraccion[..., 0]) * ancho)
+    return resultado
+
+
+def simular_montecarlo(c, a, n_trayectorias: int = 1_000_000, distribuciones=None,
+                       correlacion=CORRELACION, semilla=None, tam_bloque: int = 10_000,
+                       procesos=None, intervalos: int = 4096,
+                       percentiles=PERCENTILES, progreso=None):
+    """Simula el escenario con revalorización, rentabilidad y subida del
+    alquiler aleatorias año a año.
+
+    ``distribuciones`` sobrescribe por variable la configuración de
+    ``DISTRIBUCIONES`` (``tipo``, ``media``, ``desviacion``, ``gl``); la media
+    por defecto es el valor del escenario. Las trayectorias se simulan por
+    bloques en un pool de ``procesos`` (todos los núcleos por defecto) y se
+    reducen en histogramas por año, así que la memoria no depende de
+    ``n_trayectorias``. Con la misma ``semilla`` y ``tam_bloque`` el resultado
+    es idéntico sea cual sea el número de procesos. Si se pasa,
+    ``progreso(hechos, total)`` se llama tras cada bloque; si lanza una
+    excepción, se cancelan los bloques pendientes y la excepción sigue.
+
+    Devuelve un diccionario con ``anios``, las bandas de percentiles de
+    ``compra``, ``alquiler`` y ``diferencia`` (alquiler - compra) como
+    ``{percentil: array por año}`` y ``prob_alquiler_mejor`` al horizonte.
+    """
+    if n_trayectorias <= 0:
+        raise ValueError("n_trayectorias debe ser positivo")
+    if tam_bloque <= 0:
+        raise ValueError("tam_bloque debe ser positivo")
+    distribuciones = _distribuciones(c, a, distribuciones)
+    tamanos = [tam_bloque] * (n_trayectorias // tam_bloque)
+    if n_trayectorias % tam_bloque:
+        tamanos.append(n_trayectorias % tam_bloque)
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+
+    # El primer bloque fija el rango de los histogramas; las colas extremas se
+    # recortan a los intervalos de los bordes sin afectar a P5..P95
+    piloto = _simular_bloque(c, a, tamanos[0], semillas[0], distribuciones, correlacion)
+    bajo, alto = np.percentile(piloto, [0.5, 99.5], axis=1)
+    margen = np.maximum(0.5 * (alto - bajo), 1.0)
+    minimo = bajo - margen
+    ancho = (alto - bajo + 2 * margen) / intervalos
+    bordes = (minimo, ancho, intervalos)
+    conteos, alquiler_mejor = _contar(piloto, bordes)
+    del piloto
+    hechos = 1
+
+    def sumar(parcial, mejor):
+        nonlocal alquiler_mejor, hechos
+        conteos[...] += parcial
+        alquiler_mejor += mejor
+        hechos += 1
+        if progreso is not None:
+            progreso(hechos, len(tamanos))
+
+    if progreso is not None:
+        progreso(hechos, len(tamanos))
+    tareas = ((c, a, n, s, distribuciones, correlacion, bordes)
+              for n, s in zip(tamanos[1:], semillas[1:]))
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1 or len(tamanos) <= 2:
+        for tarea in tareas:
+            sumar(*_histograma_bloque(*tarea))
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            # Como mucho dos bloques por proceso en vuelo: cada histograma se
+            # suma y se suelta en cuanto llega, así que la memoria no depende
+            # de n_trayectorias
+            en_vuelo = set()
+            try:
+                for tarea in tareas:
+                    if len(en_vuelo) >= 2 * procesos:
+                        listos, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                        for futuro in listos:
+                            sumar(*futuro.result())
+                    en_vuelo.add(pool.submit(_histograma_bloque, *tarea))
+                while en_vuelo:
+                    listos, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                    for futuro in listos:
+                        sumar(*futuro.result())
+            except BaseException:
+                pool.shutdown(cancel_futures=True)
+                raise
+
+    bandas = _percentiles(conteos, bordes, percentiles)
+    resultado = {"anios": np.arange(1, conteos.shape[1] + 1),
+                 "n_trayectorias": n_trayectorias,
+                 "prob_alquiler_mejor": alquiler_mejor / n_trayectorias}
+    for i, serie in enumerate(SERIES):
+        resultado[serie] = {p: bandas[p][i] for p in percentiles}
+    return resultado
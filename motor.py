@@ -0,0 +1,258 @@
+"""Motor de cálculo de la app, sin dependencias de la interfaz.
+
+Solo importa numpy, numpy_financial y pandas, así que se puede usar desde la
+línea de órdenes, el servicio JSON o los benchmarks sin cargar Streamlit,
+matplotlib ni fpdf.
+"""
+import numpy as np
+import pandas as pd
+
+from hipoteca import calendario_hipoteca
+from motor_lote import COLUMNAS
+
+try:
+    from pandas.api.internals import create_dataframe_from_blocks
+except ImportError:  # pandas < 3
+    create_dataframe_from_blocks = None
+
+# Con copy-on-write (pandas 3) una copia superficial ya protege los arrays
+_COPIA_PROFUNDA = int(pd.__version__.split(".")[0]) < 3
+
+# Filas de Resultado.datos: todas las columnas de la tabla salvo "Año"
+FILAS = COLUMNAS[1:]
+_INDICE_COLUMNAS = pd.Index(COLUMNAS)
+_POSICION_ANIOS = np.array([0])
+_POSICION_FILAS = np.arange(1, len(COLUMNAS))
+
+
+class Resultado:
+    """Resultado de ``calcular_resultados`` guardado en columnas float64.
+
+    ``datos`` es un único array de solo lectura (13, años + 1) con las series
+    de la tabla anual en el orden de ``FILAS``, con la misma disposición que
+    un bloque float64 de pandas. ``resumen`` es el diccionario de siempre,
+    pero sus series anuales son vistas de solo lectura de ``datos`` (sin el
+    año 0). Los resultados se comparten entre sesiones a través de la cache,
+    así que ``resumen`` y ``tabla()`` devuelven en cada llamada un
+    diccionario y un DataFrame nuevos que se pueden modificar sin afectar al
+    resultado. Con pandas 3 el DataFrame comparte los arrays hasta que se
+    escribe en él (copy-on-write); con versiones anteriores es una copia.
+    ``resumen, df = resultado`` sigue funcionando.
+
+    Memoria por resultado: 112 bytes por año del horizonte más unos 1,5 KB
+    fijos (diccionario del resumen y objetos NumPy), unos 4,4 KB a 25 años
+    frente a 11 KB con las listas de antes. El DataFrame, si se pide, añade
+    solo su índice y metadatos (~1,7 KB).
+    """
+
+    __slots__ = ("datos", "anios", "_resumen", "_df")
+
+    def __init__(self, datos, anios, resumen):
+        datos.flags.writeable = False
+        anios.flags.writeable = False
+        self.datos = datos
+        self.anios = anios
+        self._resumen = resumen
+        self._df = None
+
+    def __iter__(self):
+        return iter((self.resumen, self.tabla()))
+
+    @property
+    def resumen(self) -> dict:
+        """Copia del diccionario del resumen."""
+        return dict(self._resumen)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes de los arrays del resultado."""
+        return self.datos.nbytes + self.anios.nbytes
+
+    def tabla(self) -> pd.DataFrame:
+        """Tabla anual como DataFrame nuevo; los bloques se montan la primera
+        vez que se pide."""
+        if self._df is None:
+            # Dos bloques: la columna de años (int64) y ``datos`` tal cual
+            if create_dataframe_from_blocks is not None:
+                self._df = create_dataframe_from_blocks(
+                    [(self.anios[None, :], _POSICION_ANIOS), (self.datos, _POSICION_FILAS)],
+                    index=pd.RangeIndex(len(self.anios)), columns=_INDICE_COLUMNAS,
+                )
+            else:
+                df = pd.DataFrame(self.datos.T, columns=FILAS, copy=False)
+                df.insert(0, COLUMNAS[0], self.anios)
+                self._df = df
+        return self._df.copy(deep=_COPIA_PROFUNDA)
+
+
+def _solo_lectura(*arrays):
+    for x in arrays:
+        x.flags.writeable = False
+    return arrays
+
+
+def _directo(tramo, clave, generar):
+    return generar()
+
+
+def tramo_hipoteca(capital, tasa_mensual, meses, horizonte):
+    """Cuota mensual y calendario anual (amortizado y deuda pendiente)."""
+    cuota_mensual, amort_acum, deuda_anual = calendario_hipoteca(
+        capital, tasa_mensual, meses, horizonte
+    )
+    return (cuota_mensual,) + _solo_lectura(amort_acum, deuda_anual)
+
+
+def tramo_compra(c, horizonte_anios, hipoteca):
+    """Columnas de la compra (las 7 primeras de ``FILAS``) y lo que paga el
+    propietario cada año (cuota más gastos), que la inversión del inquilino
+    necesita para calcular su aportación."""
+    precio_vivienda = c['precio_vivienda']
+    plazo_hipoteca = c['plazo_hipoteca']
+    revalorizacion_vivienda_pct = c['revalorizacion_vivienda_pct']
+    gasto_propietario_pct = c.get('gasto_propietario_pct', 0.0)
+    seguro_hogar_eur = c.get('seguro_hogar_eur', 0.0)
+    seguro_vida_eur = c.get('seguro_vida_eur', 0.0)
+
+    entrada = precio_vivienda * c['entrada_pct'] / 100
+    gastos_compra = precio_vivienda * c['gastos_compra_pct'] / 100
+    capital_financiado = precio_vivienda - entrada
+
+    cuota_mensual, amort_acum, deuda_anual = hipoteca
+    cuota_anual = cuota_mensual * 12
+
+    gastos_iniciales = 0
+    compra = np.empty((7, horizonte_anios + 1))
+    pagos = np.zeros(horizonte_anios + 1)
+    compra[:, 0] = (
+        precio_vivienda, entrada + gastos_compra, 0.0, capital_financiado, 0.0,
+        entrada + gastos_compra, -(entrada + gastos_compra),
+    )
+
+    gasto_acumulado = entrada + gastos_compra
+
+    for year in range(1, horizonte_anios + 1):
+        valor_actual_vivienda = precio_vivienda * (1 + revalorizacion_vivienda_pct / 100) ** year
+        hipoteca_amortizada = amort_acum[year]
+        deuda_actual = deuda_anual[year]
+        patrimonio_actual = valor_actual_vivienda - deuda_actual
+
+        gastos_propietario = precio_vivienda * gasto_propietario_pct / 100 + seguro_hogar_eur + seguro_vida_eur
+        cuota_ano = cuota_anual if year <= plazo_hipoteca else 0.0
+        gasto_acumulado += gastos_propietario + cuota_ano
+        pagos[year] = cuota_ano + gastos_propietario
+
+        compra[:, year] = (
+            valor_actual_vivienda, gastos_iniciales, hipoteca_amortizada, deuda_actual,
+            gastos_propietario, gasto_acumulado, patrimonio_actual,
+        )
+
+    return _solo_lectura(compra, pagos)
+
+
+def tramo_alquiler(a, horizonte_anios):
+    """Alquiler anual y acumulado (columnas 8 y 9 de ``FILAS``)."""
+    alquiler_inicial = a['alquiler_inicial']
+    subida_alquiler_anual_pct = a['subida_alquiler_anual_pct']
+
+    alquiler = np.zeros((2, horizonte_anios + 1))
+    gasto_alquiler_acum = 0.0
+    for year in range(1, horizonte_anios + 1):
+        alquiler_anual = alquiler_inicial * (1 + subida_alquiler_anual_pct / 100) ** (year - 1) * 12
+        gasto_alquiler_acum += alquiler_anual
+        alquiler[:, year] = alquiler_anual, gasto_alquiler_acum
+    return _solo_lectura(alquiler)
+
+
+def tramo_inversion(desembolso, pagos, alquiler, rentabilidad_inversion_pct):
+    """Inversión del inquilino (las 4 últimas columnas de ``FILAS``): parte
+    del desembolso inicial de la compra y aporta cada año lo que el
+    propietario paga de más que el inquilino."""
+    horizonte_anios = len(pagos) - 1
+    inversion = np.empty((4, horizonte_anios + 1))
+    inversion[:, 0] = desembolso
+
+    inversion_inquilino = desembolso
+    capital_invertido = desembolso
+    for year in range(1, horizonte_anios + 1):
+        aportacion = max(pagos[year] - alquiler[0, year], 0.0)
+
+        inversion_inquilino *= (1 + rentabilidad_inversion_pct / 100)
+        inversion_inquilino += aportacion
+        capital_invertido += aportacion
+
+        inversion[:, year] = aportacion, capital_invertido, inversion_inquilino, inversion_inquilino
+    return _solo_lectura(inversion)
+
+
+def calcular_resultados(c, a, tramos=None):
+    """Realiza todos los cálculos y devuelve un ``Resultado`` (que se puede
+    desempaquetar como ``resumen, df``).
+
+    El cálculo se divide en tramos que dependen de distintas entradas: la
+    hipoteca (capital, tipo y plazo), la compra, el alquiler y la inversión
+    del inquilino. ``tramos`` es opcional y permite reutilizarlos: un objeto
+    con ``calcular(tramo, clave, generar)`` que devuelva lo guardado con esa
+    clave o llame a ``generar()`` (por ejemplo, ``cache_resultados.CacheTramos``).
+    Así, cambiar solo la rentabilidad de la inversión recalcula ese tramo.
+    """
+    calcular = _directo if tramos is None else tramos.calcular
+
+    precio_vivienda = c['precio_vivienda']
+    plazo_hipoteca = c['plazo_hipoteca']
+    horizonte_anios = a.get('horizonte_anios', plazo_hipoteca)
+
+    entrada = precio_vivienda * c['entrada_pct'] / 100
+    gastos_compra = precio_vivienda * c['gastos_compra_pct'] / 100
+    capital_financiado = precio_vivienda - entrada
+    desembolso = entrada + gastos_compra
+
+    # Las claves son tuplas con las entradas de cada tramo; 25 y 25.0 coinciden
+    clave_hipoteca = (capital_financiado, c['tipo_interes_hipoteca'], plazo_hipoteca,
+                      horizonte_anios)
+    clave_compra = clave_hipoteca + (
+        precio_vivienda, c['entrada_pct'], c['gastos_compra_pct'],
+        c['revalorizacion_vivienda_pct'], c.get('gasto_propietario_pct', 0.0),
+        c.get('seguro_hogar_eur', 0.0), c.get('seguro_vida_eur', 0.0),
+    )
+    clave_alquiler = (a['alquiler_inicial'], a['subida_alquiler_anual_pct'], horizonte_anios)
+    clave_inversion = clave_compra + clave_alquiler + (a['rentabilidad_inversion_pct'],)
+
+    def compra():
+        hipoteca = calcular("hipoteca", clave_hipoteca, lambda: tramo_hipoteca(
+            capital_financiado, c['tipo_interes_hipoteca'] / 100 / 12, plazo_hipoteca * 12,
+            horizonte_anios))
+        return tramo_compra(c, horizonte_anios, hipoteca)
+
+    datos_compra, pagos = calcular("compra", clave_compra, compra)
+    (datos_alquiler,) = calcular("alquiler", clave_alquiler,
+                                 lambda: tramo_alquiler(a, horizonte_anios))
+    (datos_inversion,) = calcular("inversion", clave_inversion, lambda: tramo_inversion(
+        desembolso, pagos, datos_alquiler, a['rentabilidad_inversion_pct']))
+
+    # De solo lectura antes de crear las vistas del resumen, que lo heredan
+    anios, datos = _solo_lectura(
+        np.arange(horizonte_anios + 1),
+        np.concatenate((datos_compra, datos_alquiler, datos_inversion)))
+
+    resumen = {
+        "desembolso_inicial_compra": desembolso,
+        "costes_compra": datos[5, -1],
+        "valor_prop_final": datos[0, -1],
+        "hipoteca_pendiente": datos[3, -1],
+        "patrimonio_neto_final": datos[6, -1],
+        "inversion_inicial_alq": desembolso,
+        "costes_alquiler_total": datos[8, -1],
+        "capital_total_invertido": datos[10, -1],
+        "valor_final_inversion": datos[11, -1],
+        "patrimonio_neto_final_alq": datos[12, -1],
+        "diferencia_patrimonio": datos[11, -1] - datos[6, -1],
+        "diferencia_costes": datos[8, -1] - datos[5, -1],
+        "anios": anios[1:],
+        "patrimonio_compra": datos[6, 1:],
+        "inversion_alquiler": datos[11, 1:],
+        "coste_compra_acumulado": datos[5, 1:],
+        "coste_alquiler_acumulado": datos[8, 1:],
+    }
+
+    return Resultado(datos, anios, resumen)
@@ -0,0 +1,197 @@
+import numpy as np
+
+from hipoteca import calendario_hipoteca
+
+
+COLUMNAS = (
+    "Año",
+    "Precio Vivienda (EUR)",
+    "Gastos iniciales (EUR)",
+    "Hipoteca amortizada (EUR)",
+    "Deuda Pendiente (EUR)",
+    "Gastos anuales (EUR)",
+    "Gastos acumulados (EUR)",
+    "Patrimonio neto compra (EUR)",
+    "Gasto alquiler anual (EUR)",
+    "Gasto alquiler acumulado (EUR)",
+    "Disponible inversión (EUR)",
+    "Total invertido (EUR)",
+    "Inversión acumulada (EUR)",
+    "Patrimonio neto alquiler (EUR)",
+)
+
+
+def _entrada(d, clave, defecto=None):
+    """Lee una variable del escenario como array float64."""
+    valor = d[clave] if defecto is None else d.get(clave, defecto)
+    return np.asarray(valor, dtype=np.float64)
+
+
+def _columna(x, n):
+    """Adapta una entrada a (N, 1), o a (N, años) si es una trayectoria anual."""
+    if x.ndim == 2:
+        return np.broadcast_to(x, (n, x.shape[1]))
+    return np.broadcast_to(x, (n,))[:, None]
+
+
+def _factor_acumulado(pct, year):
+    """Factor de crecimiento acumulado al final de cada año.
+
+    Con un tipo constante es ``(1 + pct / 100) ** year``; con una trayectoria
+    (N, años) es el producto de los crecimientos de los años ya transcurridos.
+    """
+    if pct.shape[1] == 1:
+        return (1 + pct / 100) ** year
+    h = year.shape[1] - 1
+    if pct.shape[1] < h:
+        raise ValueError(f"La trayectoria tiene {pct.shape[1]} años y el horizonte es {h}")
+    factor = np.ones((pct.shape[0], h + 1))
+    np.cumprod(1 + pct[:, :h] / 100, axis=1, out=factor[:, 1:])
+    return factor
+
+
+def calcular_resultados_lote(c, a, columnas: bool = True):
+    """Calcula ``calcular_resultados`` para N escenarios a la vez.
+
+    ``c`` y ``a`` tienen las mismas claves que los diccionarios de compra y
+    alquiler de la app (sirve también un DataFrame), pero cada valor puede ser
+    un escalar o un array 1-D de N escenarios. ``revalorizacion_vivienda_pct``,
+    ``subida_alquiler_anual_pct`` y ``rentabilidad_inversion_pct`` admiten
+    además trayectorias (N, años) con un valor por año. Devuelve
+    ``(resumen, tabla)``: ``resumen`` tiene las claves del resumen escalar con
+    vectores (N,) y las series anuales como arrays (N, años); ``tabla``
+    contiene las columnas del DataFrame como arrays (N, años + 1), o es
+    ``None`` si ``columnas=False``. Con horizontes distintos, los años
+    posteriores al horizonte de cada escenario quedan a NaN.
+    """
+    precio_vivienda = _entrada(c, 'precio_vivienda')
+    entrada_pct = _entrada(c, 'entrada_pct')
+    gastos_compra_pct = _entrada(c, 'gastos_compra_pct')
+    tipo_interes_hipoteca = _entrada(c, 'tipo_interes_hipoteca')
+    plazo_hipoteca = _entrada(c, 'plazo_hipoteca')
+    revalorizacion_vivienda_pct = _entrada(c, 'revalorizacion_vivienda_pct')
+    gasto_propietario_pct = _entrada(c, 'gasto_propietario_pct', 0.0)
+    seguro_hogar_eur = _entrada(c, 'seguro_hogar_eur', 0.0)
+    seguro_vida_eur = _entrada(c, 'seguro_vida_eur', 0.0)
+
+    alquiler_inicial = _entrada(a, 'alquiler_inicial')
+    subida_alquiler_anual_pct = _entrada(a, 'subida_alquiler_anual_pct')
+    rentabilidad_inversion_pct = _entrada(a, 'rentabilidad_inversion_pct')
+    horizonte_anios = _entrada(a, 'horizonte_anios', plazo_hipoteca)
+
+    entradas = (
+        precio_vivienda, entrada_pct, gastos_compra_pct, tipo_interes_hipoteca,
+        plazo_hipoteca, revalorizacion_vivienda_pct, gasto_propietario_pct,
+        seguro_hogar_eur, seguro_vida_eur, alquiler_inicial,
+        subida_alquiler_anual_pct, rentabilidad_inversion_pct, horizonte_anios,
+    )
+    (n,) = np.broadcast_shapes((1,), *(x.shape[:1] for x in entradas))
+    (precio_vivienda, entrada_pct, gastos_compra_pct, tipo_interes_hipoteca,
+     plazo_hipoteca, revalorizacion_vivienda_pct, gasto_propietario_pct,
+     seguro_hogar_eur, seguro_vida_eur, alquiler_inicial,
+     subida_alquiler_anual_pct, rentabilidad_inversion_pct,
+     horizonte_anios) = (_columna(x, n) for x in entradas)
+    horizonte_anios = horizonte_anios.astype(np.int64)
+    h_max = int(horizonte_anios.max()) if n else 0
+
+    # Todas las operaciones son (N, 1) contra (1, años + 1)
+    year = np.arange(h_max + 1, dtype=np.float64)[None, :]
+    activo = year >= 1
+
+    entrada = precio_vivienda * entrada_pct / 100
+    gastos_compra = precio_vivienda * gastos_compra_pct / 100
+    capital_financiado = precio_vivienda - entrada
+    desembolso_inicial = entrada + gastos_compra
+
+    tasa_mensual = tipo_interes_hipoteca / 100 / 12
+    meses_totales = plazo_hipoteca * 12
+    cuota_mensual, hipoteca_amortizada, deuda_pendiente = calendario_hipoteca(
+        capital_financiado[:, 0], tasa_mensual[:, 0], meses_totales[:, 0], h_max
+    )
+    cuota_anual = cuota_mensual[:, None] * 12
+    deuda_pendiente[:, 0] = capital_financiado[:, 0]
+
+    valor_vivienda = precio_vivienda * _factor_acumulado(revalorizacion_vivienda_pct, year)
+    patrimonio_compra = valor_vivienda - deuda_pendiente
+    patrimonio_compra[:, 0] = -desembolso_inicial[:, 0]
+
+    gastos_propietario = (precio_vivienda * gasto_propietario_pct / 100
+                          + seguro_hogar_eur + seguro_vida_eur)
+    gastos_anuales = np.where(activo, gastos_propietario, 0.0)
+    cuota_ano = np.where(activo & (year <= plazo_hipoteca), cuota_anual, 0.0)
+    gastos_acumulados = desembolso_inicial + np.cumsum(gastos_anuales + cuota_ano, axis=1)
+
+    # El alquiler del año t sube con las subidas de los años anteriores
+    alquiler_anual = np.zeros((n, h_max + 1))
+    alquiler_anual[:, 1:] = (
+        alquiler_inicial * _factor_acumulado(subida_alquiler_anual_pct, year)[:, :-1] * 12
+    )
+    gasto_alquiler_acum = np.cumsum(alquiler_anual, axis=1)
+
+    aportacion = np.where(
+        activo, np.maximum(cuota_ano + gastos_propietario - alquiler_anual, 0.0), 0.0
+    )
+    total_invertido = desembolso_inicial + np.cumsum(aportacion, axis=1)
+
+    # I_t = I_{t-1} * g + aportacion_t  =>  I_t = g^t * (I_0 + sum_j aportacion_j / g^j)
+    crecimiento = _factor_acumulado(rentabilidad_inversion_pct, year)
+    inversion_acumulada = crecimiento * (
+        desembolso_inicial + np.cumsum(aportacion / crecimiento, axis=1)
+    )
+    inversion_acumulada[:, 0] = desembolso_inicial[:, 0]
+    aportacion[:, 0] = desembolso_inicial[:, 0]
+
+    fuera = year > horizonte_anios
+    series = (
+        valor_vivienda, hipoteca_amortizada, deuda_pendiente, gastos_anuales,
+        gastos_acumulados, patrimonio_compra, alquiler_anual,
+        gasto_alquiler_acum, aportacion, total_invertido, inversion_acumulada,
+    )
+    if fuera.any():
+        for serie in series:
+            serie[fuera] = np.nan
+
+    def final(serie):
+        return np.take_along_axis(serie, horizonte_anios, axis=1)[:, 0]
+
+    desembolso = desembolso_inicial[:, 0]
+    costes_compra = final(gastos_acumulados)
+    patrimonio_final = final(patrimonio_compra)
+    costes_alquiler = final(gasto_alquiler_acum)
+    valor_final_inversion = final(inversion_acumulada)
+
+    resumen = {
+        "desembolso_inicial_compra": desembolso,
+        "costes_compra": costes_compra,
+        "valor_prop_final": final(valor_vivienda),
+        "hipoteca_pendiente": final(deuda_pendiente),
+        "patrimonio_neto_final": patrimonio_final,
+        "inversion_inicial_alq": desembolso,
+        "costes_alquiler_total": costes_alquiler,
+        "capital_total_invertido": final(total_invertido),
+        "valor_final_inversion": valor_final_inversion,
+        "patrimonio_neto_final_alq": valor_final_inversion,
+        "diferencia_patrimonio": valor_final_inversion - patrimonio_final,
+        "diferencia_costes": costes_alquiler - costes_compra,
+        "anios": np.arange(1, h_max + 1),
+        "patrimonio_compra": patrimonio_compra[:, 1:],
+        "inversion_alquiler": inversion_acumulada[:, 1:],
+        "coste_compra_acumulado": gastos_acumulados[:, 1:],
+        "coste_alquiler_acumulado": gasto_alquiler_acum[:, 1:],
+    }
+
+    if not columnas:
+        return resumen, None
+
+    gastos_iniciales = np.zeros((n, h_max + 1))
+    gastos_iniciales[:, 0] = desembolso
+    if fuera.any():
+        gastos_iniciales[fuera] = np.nan
+    tabla = dict(zip(COLUMNAS, (
+        np.broadcast_to(year, (n, h_max + 1)).astype(np.int64),
+        valor_vivienda, gastos_iniciales, hipoteca_amortizada,
+        deuda_pendiente, gastos_anuales, gastos_acumulados, patrimonio_compra,
+        alquiler_anual, gasto_alquiler_acum, aportacion, total_invertido,
+        inversion_acumulada, inversion_acumulada,
+    )))
+    return resumen, tabla
@@ -0,0 +1,179 @@
+"""Optimizador en rejilla de los datos de compra: patrimonio frente a liquidez.
+
+Evalúa todas las combinaciones (producto cartesiano) de los valores elegidos
+para varias variables, por defecto ``entrada_pct`` y ``plazo_hipoteca``, y
+devuelve el frente de Pareto entre el patrimonio final de la compra (más es
+mejor) y la liquidez, los ahorros que quedan tras el desembolso inicial (más
+es mejor). Una combinación está en el frente si ninguna otra tiene a la vez
+más patrimonio y más liquidez. El horizonte sale del escenario: un horizonte
+más largo no cambia la liquidez y casi siempre da más patrimonio, así que en
+la rejilla el frente se quedaría con el último.
+
+La rejilla no se construye entera: cada bloque de combinaciones se
+reconstruye a partir de su posición, se descartan las que no cumplen las
+restricciones (cuota mensual o desembolso máximos) antes de pasarlas por
+``calcular_resultados_lote`` y cada bloque devuelve solo su propio frente,
+porque un punto dominado dentro de su bloque también lo está en el total.
+Los bloques se reparten entre procesos como en ``simular_montecarlo``.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import numpy_financial as npf
+import pandas as pd
+
+from motor_lote import calcular_resultados_lote
+from sensibilidad import VARIABLES
+
+
+REJILLA = {
+    "entrada_pct": np.arange(0.0, 51.0, 1.0),
+    "plazo_hipoteca": np.arange(5, 41),
+}
+
+# Patrimonio que se maximiza: (etiqueta, clave del resumen, signo)
+OBJETIVOS = {
+    "patrimonio": ("Patrimonio final comprando (€)", "patrimonio_neto_final", 1.0),
+    "ventaja": ("Patrimonio comprando menos alquilando (€)", "diferencia_patrimonio", -1.0),
+}
+
+
+def frente_pareto(patrimonio, liquidez):
+    """Posiciones de los puntos no dominados (máximo patrimonio y liquidez).
+
+    De los puntos repetidos se queda el primero. Devuelve las posiciones
+    ordenadas de más a menos patrimonio (y de menos a más liquidez).
+    """
+    patrimonio = np.asarray(patrimonio, dtype=np.float64)
+    liquidez = np.asarray(liquidez, dtype=np.float64)
+    orden = np.lexsort((np.arange(len(patrimonio)), -liquidez, -patrimonio))
+    ordenada = liquidez[orden]
+    # Un punto sobrevive si supera la liquidez de todos los que tienen más patrimonio
+    previa = np.empty_like(ordenada)
+    previa[:1] = -np.inf
+    np.maximum.accumulate(ordenada[:-1], out=previa[1:])
+    return orden[ordenada > previa]
+
+
+def _evaluar_bloque(c, a, variables, valores, inicio, fin, objetivo, ahorros,
+                    cuota_maxima, desembolso_maximo):
+    """Frente de Pareto de las combinaciones ``inicio..fin`` de la rejilla.
+
+    Devuelve ``(indices, patrimonio, liquidez, cuota, factibles)``: la
+    posición en la rejilla y los objetivos de los puntos del frente del
+    bloque, y cuántas combinaciones cumplían las restricciones.
+    """
+    indices = np.arange(inicio, fin, dtype=np.int64)
+    posiciones = np.unravel_index(indices, tuple(len(v) for v in valores))
+    escenario = {"compra": dict(c), "alquiler": dict(a)}
+    for var, vals, pos in zip(variables, valores, posiciones):
+        escenario[VARIABLES[var][0]][var] = vals[pos]
+    compra = escenario["compra"]
+
+    precio = np.asarray(compra["precio_vivienda"], dtype=np.float64)
+    entrada_pct = np.asarray(compra["entrada_pct"], dtype=np.float64)
+    desembolso = precio * (entrada_pct + np.asarray(compra["gastos_compra_pct"])) / 100
+    cuota = npf.pmt(np.asarray(compra["tipo_interes_hipoteca"]) / 100 / 12,
+                    np.asarray(compra["plazo_hipoteca"]) * 12,
+                    -(precio - precio * entrada_pct / 100))
+    factible = np.ones(len(indices), dtype=bool)
+    if cuota_maxima is not None:
+        factible &= cuota <= cuota_maxima
+    if desembolso_maximo is not None:
+        factible &= desembolso <= desembolso_maximo
+    if not factible.any():
+        vacio = np.empty(0)
+        return indices[:0], vacio, vacio, vacio, 0
+
+    # Solo se evalúan las combinaciones factibles
+    for d in escenario.values():
+        for var in variables:
+            if var in d:
+                d[var] = d[var][factible]
+    resumen, _ = calcular_resultados_lote(escenario["compra"], escenario["alquiler"],
+                                          columnas=False)
+    _, clave, signo = OBJETIVOS[objetivo]
+    patrimonio = signo * resumen[clave]
+    liquidez = ahorros - np.broadcast_to(desembolso, indices.shape)[factible]
+    frente = frente_pareto(patrimonio, liquidez)
+    return (indices[factible][frente], patrimonio[frente], liquidez[frente],
+            np.broadcast_to(cuota, indices.shape)[factible][frente], int(factible.sum()))
+
+
+def optimizar_compra(c, a, rejilla=None, objetivo: str = "patrimonio",
+                     ahorros: float = 0.0, cuota_maxima=None,
+                     desembolso_maximo=None, tam_bloque: int = 20_000, procesos=None,
+                     progreso=None):
+    """Frente de Pareto de patrimonio y liquidez sobre una rejilla de datos.
+
+    ``rejilla`` es ``{variable: valores}`` con variables de
+    ``sensibilidad.VARIABLES`` (por defecto ``REJILLA``); el resto de datos
+    sale de ``c`` y ``a``. ``objetivo`` es una clave de ``OBJETIVOS``: el
+    patrimonio final comprando o su ventaja sobre alquilar e invertir, que
+    sí descuenta lo que se habría ganado invirtiendo la entrada y la
+    diferencia de cuotas. La liquidez es ``ahorros`` menos el desembolso
+    inicial (entrada más gastos de compra). ``cuota_maxima`` (€/mes) y
+    ``desembolso_maximo`` (€) descartan las combinaciones que los superan.
+    Los bloques de ``tam_bloque`` combinaciones se evalúan en un pool de
+    ``procesos`` (todos los núcleos por defecto); el resultado no depende
+    del número de procesos. ``progreso(hechos, total)``, si se pasa, se llama
+    tras cada bloque como en ``simular_montecarlo``.
+
+    Devuelve un diccionario con el ``frente`` (DataFrame con las variables
+    de la rejilla, el ``objetivo``, ``liquidez``, ``desembolso`` y ``cuota``,
+    de más a menos patrimonio), el número de ``combinaciones`` de la
+    rejilla y cuántas eran ``factibles``.
+    """
+    rejilla = REJILLA if rejilla is None else rejilla
+    if objetivo not in OBJETIVOS:
+        raise ValueError(f"objetivo desconocido: {objetivo!r}")
+    desconocidas = [var for var in rejilla if var not in VARIABLES]
+    if desconocidas:
+        raise ValueError(f"variables desconocidas en la rejilla: {', '.join(desconocidas)}")
+    variables = tuple(rejilla)
+    valores = [np.asarray(rejilla[var], dtype=np.float64).ravel() for var in variables]
+    if not variables or any(len(v) == 0 for v in valores):
+        raise ValueError("la rejilla necesita al menos un valor por variable")
+    combinaciones = int(np.prod([len(v) for v in valores]))
+
+    tareas = [(c, a, variables, valores, inicio, min(inicio + tam_bloque, combinaciones),
+               objetivo, ahorros, cuota_maxima, desembolso_maximo)
+              for inicio in range(0, combinaciones, tam_bloque)]
+    parciales = []
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1 or len(tareas) == 1:
+        for tarea in tareas:
+            parciales.append(_evaluar_bloque(*tarea))
+            if progreso is not None:
+                progreso(len(parciales), len(tareas))
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            futuros = [pool.submit(_evaluar_bloque, *tarea) for tarea in tareas]
+            try:
+                for futuro in as_completed(futuros):
+                    parciales.append(futuro.result())
+                    if progreso is not None:
+                        progreso(len(parciales), len(tareas))
+            except BaseException:
+                pool.shutdown(cancel_futures=True)
+                raise
+
+    # Une los frentes de los bloques en el orden de la rejilla, para que los
+    # empates se resuelvan igual sea cual sea el orden de llegada
+    indices, patrimonio, liquidez, cuota = (np.concatenate(p) for p in list(zip(*parciales))[:4])
+    orden = np.argsort(indices, kind="stable")
+    indices, patrimonio, liquidez, cuota = (x[orden] for x in (indices, patrimonio, liquidez, cuota))
+    frente = frente_pareto(patrimonio, liquidez)
+
+    posiciones = np.unravel_index(indices[frente], tuple(len(v) for v in valores))
+    tabla = pd.DataFrame({var: vals[pos] for var, vals, pos in zip(variables, valores, posiciones)})
+    tabla[objetivo] = patrimonio[frente]
+    tabla["liquidez"] = liquidez[frente]
+    tabla["desembolso"] = ahorros - liquidez[frente]
+    tabla["cuota"] = cuota[frente]
+    return {
+        "frente": tabla,
+        "combinaciones": combinaciones,
+        "factibles": sum(p[4] for p in parciales),
+    }
@@ -0,0 +1,203 @@
+"""Calcula escenarios desde un fichero CSV o Parquet sin pasar por la app.
+
+Cada fila es un escenario; las columnas son las claves de los diccionarios
+de compra y alquiler de la app (las que faltan toman los mismos valores por
+defecto). El resto de columnas, por ejemplo un identificador, se copian tal
+cual al resultado; desde CSV se copian como texto, para que su tipo no
+dependa de lo que haya en cada bloque. El fichero se lee por bloques que se
+reparten entre procesos, y los resultados se escriben en orden en Parquet a
+medida que llegan, así que la memoria no depende del tamaño de la entrada.
+Los ficheros de salida se escriben aparte y solo se renombran al terminar
+bien, así que un error no deja un Parquet a medias.
+
+Uso:
+
+    python procesar_lote.py escenarios.csv resumen.parquet [--tablas tablas.parquet]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from motor_lote import COLUMNAS, calcular_resultados_lote
+
+
+CLAVES_COMPRA = (
+    "precio_vivienda", "entrada_pct", "gastos_compra_pct", "tipo_interes_hipoteca",
+    "plazo_hipoteca", "revalorizacion_vivienda_pct", "gasto_propietario_pct",
+    "seguro_hogar_eur", "seguro_vida_eur",
+)
+CLAVES_ALQUILER = (
+    "alquiler_inicial", "subida_alquiler_anual_pct", "rentabilidad_inversion_pct",
+    "horizonte_anios",
+)
+# Claves que calcular_resultados no exige
+OPCIONALES = {"gasto_propietario_pct", "seguro_hogar_eur", "seguro_vida_eur", "horizonte_anios"}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("procesar_lote necesita pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def leer_bloques(ruta: str, tam_bloque: int):
+    """Itera sobre el fichero de escenarios en DataFrames de ``tam_bloque`` filas."""
+    if ruta.endswith(".parquet"):
+        pa = _pyarrow()
+        for lote in pa.parquet.ParquetFile(ruta).iter_batches(batch_size=tam_bloque):
+            yield lote.to_pandas()
+    else:
+        extra = {col: str for col in esquema_extra(ruta).names}
+        yield from pd.read_csv(ruta, chunksize=tam_bloque, dtype=extra)
+
+
+def esquema_extra(ruta: str):
+    """Esquema de pyarrow de las columnas que se copian tal cual: el del
+    fichero si es Parquet y texto si es CSV."""
+    pa = _pyarrow()
+    claves = set(CLAVES_COMPRA + CLAVES_ALQUILER)
+    if ruta.endswith(".parquet"):
+        esquema = pa.parquet.ParquetFile(ruta).schema_arrow
+        return pa.schema([campo for campo in esquema if campo.name not in claves])
+    columnas = pd.read_csv(ruta, nrows=0).columns
+    return pa.schema([(col, pa.string()) for col in columnas if col not in claves])
+
+
+def _comprobar_columnas(columnas):
+    faltan = [k for k in CLAVES_COMPRA + CLAVES_ALQUILER
+              if k not in OPCIONALES and k not in columnas]
+    if faltan:
+        raise ValueError(f"Faltan columnas en el fichero de escenarios: {', '.join(faltan)}")
+
+
+def calcular_bloque(bloque: pd.DataFrame, inicio: int, tablas: bool = False):
+    """Resumen (y tabla anual en formato largo) de un bloque de escenarios.
+
+    ``inicio`` es la posición de la primera fila en el fichero, que se guarda
+    en la columna ``escenario`` para relacionar el resumen con las tablas.
+    """
+    c = {k: bloque[k].to_numpy(np.float64) for k in CLAVES_COMPRA if k in bloque}
+    a = {k: bloque[k].to_numpy(np.float64) for k in CLAVES_ALQUILER if k in bloque}
+    resumen, tabla = calcular_resultados_lote(c, a, columnas=tablas)
+
+    escenario = np.arange(inicio, inicio + len(bloque))
+    extra = bloque.drop(columns=[k for k in CLAVES_COMPRA + CLAVES_ALQUILER if k in bloque])
+    df_resumen = pd.concat([
+        pd.DataFrame({"escenario": escenario}),
+        extra.reset_index(drop=True),
+        pd.DataFrame({k: v for k, v in resumen.items() if v.ndim == 1 and k != "anios"}),
+    ], axis=1)
+    if not tablas:
+        return df_resumen, None
+
+    # Formato largo: una fila por escenario y año, sin los años tras el horizonte
+    anios = tabla[COLUMNAS[0]].shape[1]
+    validas = ~np.isnan(tabla[COLUMNAS[-1]]).ravel()
+    df_tabla = pd.DataFrame({
+        "escenario": np.repeat(escenario, anios)[validas],
+        **{col: tabla[col].ravel()[validas] for col in COLUMNAS},
+    })
+    return df_resumen, df_tabla
+
+
+def _procesar(bloque, inicio, tablas, extra):
+    """Tarea de cada proceso: devuelve tablas de pyarrow, que se serializan
+    más rápido que los DataFrame. Las columnas copiadas se convierten a los
+    tipos de ``extra`` (una columna vacía en un bloque no tendría tipo)."""
+    pa = _pyarrow()
+    df_resumen, df_tabla = calcular_bloque(bloque, inicio, tablas)
+    resumen = pa.Table.from_pandas(df_resumen, preserve_index=False)
+    resumen = resumen.cast(pa.schema(
+        [extra.field(campo.name) if campo.name in extra.names else campo
+         for campo in resumen.schema], metadata=resumen.schema.metadata))
+    return (resumen,
+            None if df_tabla is None else pa.Table.from_pandas(df_tabla, preserve_index=False))
+
+
+def procesar_fichero(entrada: str, salida: str, salida_tablas: str = None,
+                     tam_bloque: int = 10_000, procesos=None) -> int:
+    """Calcula todos los escenarios de ``entrada`` y escribe el resumen en
+    ``salida`` y, si se indica, las tablas anuales en ``salida_tablas``.
+
+    Los bloques se calculan en un pool de ``procesos`` (todos los núcleos por
+    defecto) con como mucho dos bloques por proceso pendientes a la vez.
+    Devuelve el número de escenarios.
+    """
+    pa = _pyarrow()
+    procesos = procesos or os.cpu_count() or 1
+    tablas = salida_tablas is not None
+    extra = esquema_extra(entrada)
+    escritores = {}
+    total = 0
+
+    def escribir(resultado):
+        for ruta, tabla in zip((salida, salida_tablas), resultado):
+            if tabla is None:
+                continue
+            if ruta not in escritores:
+                escritores[ruta] = pa.parquet.ParquetWriter(_temporal(ruta), tabla.schema)
+            escritores[ruta].write_table(tabla)
+
+    terminado = False
+    try:
+        if procesos == 1:
+            for bloque in leer_bloques(entrada, tam_bloque):
+                _comprobar_columnas(bloque.columns)
+                escribir(_procesar(bloque, total, tablas, extra))
+                total += len(bloque)
+        else:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                pendientes = deque()
+                for bloque in leer_bloques(entrada, tam_bloque):
+                    _comprobar_columnas(bloque.columns)
+                    if len(pendientes) >= 2 * procesos:
+                        escribir(pendientes.popleft().result())
+                    pendientes.append(pool.submit(_procesar, bloque, total, tablas, extra))
+                    total += len(bloque)
+                while pendientes:
+                    escribir(pendientes.popleft().result())
+        terminado = True
+    finally:
+        for ruta, escritor in escritores.items():
+            escritor.close()
+            if terminado:
+                os.replace(_temporal(ruta), ruta)
+            else:
+                os.remove(_temporal(ruta))
+    return total
+
+
+def _temporal(ruta: str) -> str:
+    return f"{ruta}.{os.getpid()}.tmp"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcula escenarios desde CSV o Parquet.")
+    parser.add_argument("entrada", help="fichero .csv o .parquet, un escenario por fila")
+    parser.add_argument("salida", help="Parquet con el resumen de cada escenario")
+    parser.add_argument("--tablas", help="Parquet con las tablas anuales (formato largo)")
+    parser.add_argument("--tam-bloque", type=int, default=10_000)
+    parser.add_argument("--procesos", type=int, help="por defecto, todos los núcleos")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    try:
+        n = procesar_fichero(args.entrada, args.salida, args.tablas,
+                             args.tam_bloque, args.procesos)
+    except (ValueError, ImportError) as e:
+        sys.exit(f"Error: {e}")
+    segundos = time.perf_counter() - inicio
+    print(f"{n} escenarios en {segundos:.2f} s ({n / segundos:,.0f} escenarios/s)")
+
+
+if __name__ == "__main__":
+    main()
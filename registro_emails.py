@@ -0,0 +1,257 @@
+"""Almacenes para los emails que se piden antes de descargar los resultados.
+
+El almacén por defecto es SQLite en modo WAL con un índice único sobre el
+email normalizado: varios procesos de Streamlit pueden escribir a la vez sin
+mezclar líneas ni duplicar direcciones. Las altas de cada proceso se agrupan
+en lotes que se confirman en una sola transacción.
+
+Uso desde la línea de órdenes:
+
+    python registro_emails.py exportar [--salida emails_exportados.txt] [--forzar]
+    python registro_emails.py importar emails.txt
+"""
+import argparse
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+
+RUTA_SQLITE = "emails.db"
+RUTA_TEXTO = "emails.txt"
+# Distinta de RUTA_TEXTO para no pisar la lista antigua antes de importarla
+RUTA_EXPORTACION = "emails_exportados.txt"
+
+_PATRON_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def normalizar_email(email: str):
+    """Email sin espacios y en minúsculas, o ``None`` si no es válido."""
+    email = (email or "").strip().lower()
+    return email if _PATRON_EMAIL.match(email) else None
+
+
+class AlmacenTexto:
+    """Formato anterior: una línea por email en un fichero de texto.
+
+    Solo serializa las escrituras dentro del proceso y no elimina duplicados.
+    """
+
+    def __init__(self, ruta: str = RUTA_TEXTO):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+
+    def guardar(self, email: str) -> bool:
+        return self.guardar_varios([email])[0]
+
+    def guardar_varios(self, emails):
+        with self._lock, open(self.ruta, "a") as f:
+            f.writelines(email.strip() + "\n" for email in emails)
+        return [True] * len(emails)
+
+    def emails(self):
+        with open(self.ruta) as f:
+            return [linea.strip() for linea in f if linea.strip()]
+
+    def cerrar(self):
+        pass
+
+
+class AlmacenSQLite:
+    """Emails en SQLite (WAL) con altas agrupadas por lotes.
+
+    ``guardar`` deja el email en una cola y espera a que un hilo escritor lo
+    confirme; el hilo junta hasta ``tam_lote`` altas, o las que lleguen en
+    ``espera`` segundos, en una única transacción. Devuelve ``True`` si el
+    email es nuevo y ``False`` si ya estaba registrado. Tras ``cerrar`` ya
+    no admite altas.
+    """
+
+    def __init__(self, ruta: str = RUTA_SQLITE, tam_lote: int = 256,
+                 espera: float = 0.002, timeout: float = 30.0):
+        self.ruta = ruta
+        self.tam_lote = tam_lote
+        self.espera = espera
+        self.timeout = timeout
+        conexion = self._conectar()
+        with conexion:
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS emails ("
+                " id INTEGER PRIMARY KEY,"
+                " email TEXT NOT NULL,"
+                " email_normalizado TEXT NOT NULL,"
+                " creado REAL NOT NULL)"
+            )
+            conexion.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS emails_normalizado"
+                " ON emails (email_normalizado)"
+            )
+        conexion.close()
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self._cerrado = False
+        self._escritor = threading.Thread(target=self._escribir, daemon=True)
+        self._escritor.start()
+
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta, timeout=self.timeout,
+                                   isolation_level=None, check_same_thread=False)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        return conexion
+
+    def guardar(self, email: str) -> bool:
+        return self.guardar_varios([email])[0]
+
+    def guardar_varios(self, emails):
+        """Registra varios emails y devuelve, para cada uno, si era nuevo.
+
+        Lanza ``RuntimeError`` si el almacén está cerrado o el hilo escritor
+        ha terminado, y ``TimeoutError`` si las altas no se confirman en
+        ``timeout`` segundos.
+        """
+        altas = []
+        for email in emails:
+            normalizado = normalizar_email(email)
+            if normalizado is None:
+                raise ValueError(f"email no válido: {email!r}")
+            altas.append((email.strip(), normalizado, Future()))
+        # Con el lock, ``cerrar`` no puede encolar el fin entre la comprobación y las altas
+        with self._lock:
+            if self._cerrado or not self._escritor.is_alive():
+                raise RuntimeError("el almacén de emails está cerrado")
+            for alta in altas:
+                self._cola.put(alta)
+        return [resultado.result(timeout=self.timeout) for _, _, resultado in altas]
+
+    def _lote(self):
+        """Espera una alta y recoge las que lleguen poco después."""
+        lote = [self._cola.get()]
+        limite = time.monotonic() + self.espera
+        while len(lote) < self.tam_lote and lote[-1] is not None:
+            restante = limite - time.monotonic()
+            try:
+                lote.append(self._cola.get(timeout=max(restante, 0)) if restante > 0
+                            else self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _escribir(self):
+        conexion = self._conectar()
+        while True:
+            lote = self._lote()
+            fin = lote[-1] is None
+            altas = [alta for alta in lote if alta is not None]
+            if altas:
+                self._insertar(conexion, altas)
+            if fin:
+                break
+        conexion.close()
+
+    def _insertar(self, conexion, altas):
+        ahora = time.time()
+        try:
+            conexion.execute("BEGIN IMMEDIATE")
+            nuevos = []
+            for email, normalizado, _ in altas:
+                cursor = conexion.execute(
+                    "INSERT OR IGNORE INTO emails (email, email_normalizado, creado)"
+                    " VALUES (?, ?, ?)", (email, normalizado, ahora))
+                nuevos.append(cursor.rowcount == 1)
+            conexion.execute("COMMIT")
+        except Exception as e:
+            if conexion.in_transaction:
+                conexion.execute("ROLLBACK")
+            for _, _, resultado in altas:
+                resultado.set_exception(e)
+            return
+        for (_, _, resultado), nuevo in zip(altas, nuevos):
+            resultado.set_result(nuevo)
+
+    def emails(self):
+        """Emails registrados, en orden de alta, tal como se introdujeron."""
+        conexion = self._conectar()
+        try:
+            return [fila[0] for fila in conexion.execute("SELECT email FROM emails ORDER BY id")]
+        finally:
+            conexion.close()
+
+    def cerrar(self):
+        """Termina el hilo escritor tras confirmar las altas pendientes."""
+        with self._lock:
+            if self._cerrado:
+                return
+            self._cerrado = True
+            self._cola.put(None)
+        self._escritor.join()
+
+
+ALMACENES = {
+    "sqlite": lambda ruta: AlmacenSQLite(ruta or RUTA_SQLITE),
+    "texto": lambda ruta: AlmacenTexto(ruta or RUTA_TEXTO),
+}
+
+
+def obtener_almacen(tipo: str = None, ruta: str = None):
+    """Crea el almacén indicado o el de las variables ``EMAILS_ALMACEN`` y
+    ``EMAILS_RUTA`` (por defecto SQLite en ``emails.db``)."""
+    tipo = tipo or os.environ.get("EMAILS_ALMACEN", "sqlite")
+    ruta = ruta or os.environ.get("EMAILS_RUTA")
+    if tipo not in ALMACENES:
+        raise ValueError(f"almacén desconocido: {tipo!r} (opciones: {', '.join(ALMACENES)})")
+    return ALMACENES[tipo](ruta)
+
+
+def exportar(almacen, salida: str = RUTA_EXPORTACION, forzar: bool = False) -> int:
+    """Escribe los emails en el formato de texto, uno por línea.
+
+    Si ``salida`` ya existe lanza ``FileExistsError``, salvo con ``forzar``.
+    """
+    emails = almacen.emails()
+    with open(salida, "w" if forzar else "x") as f:
+        f.writelines(email + "\n" for email in emails)
+    return len(emails)
+
+
+def importar(almacen, entrada: str = RUTA_TEXTO):
+    """Carga un fichero de texto; devuelve (nuevos, repetidos o no válidos)."""
+    with open(entrada) as f:
+        emails = [linea.strip() for linea in f if linea.strip()]
+    validos = [e for e in emails if normalizar_email(e) is not None]
+    nuevos = sum(almacen.guardar_varios(validos))
+    return nuevos, len(emails) - nuevos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gestión de los emails registrados.")
+    parser.add_argument("--ruta", default=RUTA_SQLITE, help="base de datos SQLite")
+    ordenes = parser.add_subparsers(dest="orden", required=True)
+    orden_exportar = ordenes.add_parser("exportar", help="escribe los emails en formato texto")
+    orden_exportar.add_argument("--salida", default=RUTA_EXPORTACION)
+    orden_exportar.add_argument("--forzar", action="store_true",
+                                help="sobrescribe --salida si ya existe")
+    orden_importar = ordenes.add_parser("importar", help="carga un fichero de texto")
+    orden_importar.add_argument("entrada", nargs="?", default=RUTA_TEXTO)
+    args = parser.parse_args()
+
+    almacen = AlmacenSQLite(args.ruta)
+    try:
+        if args.orden == "exportar":
+            try:
+                exportados = exportar(almacen, args.salida, args.forzar)
+            except FileExistsError:
+                parser.error(f"{args.salida} ya existe; usa --forzar para sobrescribirlo")
+            print(f"{exportados} emails exportados a {args.salida}")
+        else:
+            nuevos, descartados = importar(almacen, args.entrada)
+            print(f"{nuevos} emails nuevos, {descartados} repetidos o no válidos")
+    finally:
+        almacen.cerrar()
+
+
+if __name__ == "__main__":
+    main()
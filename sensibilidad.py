@@ -0,0 +1,183 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from motor_lote import calcular_resultados_lote
+
+
+# clave: (diccionario, etiqueta, mínimo, máximo, entero)
+VARIABLES = {
+    "tipo_interes_hipoteca": ("compra", "Interés hipoteca (%)", 0.1, 10.0, False),
+    "rentabilidad_inversion_pct": ("alquiler", "Rentabilidad inversión anual (%)", 0.0, 20.0, False),
+    "revalorizacion_vivienda_pct": ("compra", "Revalorización vivienda anual (%)", -5.0, 15.0, False),
+    "subida_alquiler_anual_pct": ("alquiler", "Subida anual alquiler (%)", 0.0, 10.0, False),
+    "precio_vivienda": ("compra", "Precio vivienda (€)", 50000.0, 1000000.0, False),
+    "alquiler_inicial": ("alquiler", "Alquiler mensual (€)", 300.0, 5000.0, False),
+    "entrada_pct": ("compra", "Entrada (%)", 0.0, 50.0, False),
+    "gastos_compra_pct": ("compra", "Gastos compra (%)", 0.0, 15.0, False),
+    "gasto_propietario_pct": ("compra", "Gastos propietario anuales (%)", 0.0, 5.0, False),
+    "plazo_hipoteca": ("compra", "Plazo hipoteca (años)", 5, 40, True),
+    "horizonte_anios": ("alquiler", "Horizonte (años)", 1, 40, True),
+}
+
+
+# Pasos redondos de los ejes, por potencias de 10
+PASOS = (1.0, 2.0, 2.5, 5.0)
+
+
+def paso_eje(minimo, maximo, puntos=200, entero=False):
+    """Paso redondo (1, 2, 2,5 o 5 por una potencia de 10) más cercano al que
+    daría ``puntos`` valores entre ``minimo`` y ``maximo``; al menos 1 y
+    entero si ``entero``."""
+    bruto = (maximo - minimo) / max(puntos - 1, 1)
+    if bruto <= 0:
+        return 1.0
+    potencia = 10.0 ** np.floor(np.log10(bruto))
+    candidatos = np.array(PASOS + (10.0,)) * potencia
+    paso = float(candidatos[np.argmin(np.abs(np.log(candidatos / bruto)))])
+    if entero:
+        paso = float(max(int(paso), 1))
+    return paso
+
+
+def valores_eje(var, minimo, maximo, puntos=200):
+    """Valores de un eje de la malla: los múltiplos de ``paso_eje`` entre
+    ``minimo`` y ``maximo``, dentro del rango de la variable.
+
+    Los valores salen de una rejilla fija por variable y paso, así que al
+    desplazar un rango con el mismo ancho se repiten los del rango anterior
+    y ``CacheMalla`` reutiliza esas celdas. Los de las variables enteras son
+    enteros distintos.
+    """
+    _, _, desde, hasta, entero = VARIABLES[var]
+    minimo, maximo = max(minimo, desde), min(maximo, hasta)
+    paso = paso_eje(minimo, maximo, puntos, entero)
+    inicio = np.ceil(minimo / paso - 1e-9)
+    fin = np.floor(maximo / paso + 1e-9)
+    if fin < inicio:
+        return np.array([float(round(minimo) if entero else minimo)])
+    # + 0.0 convierte el -0.0 de ceil(-1e-9) en 0.0
+    return np.round(np.arange(inicio, fin + 1) * paso, 10) + 0.0
+
+
+def malla_diferencia(c, a, var_x, valores_x, var_y, valores_y):
+    """Evalúa ``diferencia_patrimonio`` en toda la malla en una sola pasada.
+
+    Devuelve un array (len(valores_y), len(valores_x)).
+    """
+    x, y = np.meshgrid(np.asarray(valores_x, dtype=np.float64),
+                       np.asarray(valores_y, dtype=np.float64))
+    escenario = {"compra": dict(c), "alquiler": dict(a)}
+    escenario[VARIABLES[var_x][0]][var_x] = x.ravel()
+    escenario[VARIABLES[var_y][0]][var_y] = y.ravel()
+    resumen, _ = calcular_resultados_lote(
+        escenario["compra"], escenario["alquiler"], columnas=False
+    )
+    return resumen["diferencia_patrimonio"].reshape(x.shape)
+
+
+def _posiciones(eje, valores):
+    """Posición de cada valor en ``eje`` (ordenado) y si está en él."""
+    pos = np.searchsorted(eje, valores)
+    dentro = pos < len(eje)
+    pos[~dentro] = 0
+    dentro &= eje[pos] == valores
+    return pos, dentro
+
+
+class CacheMalla:
+    """Cache de mallas de sensibilidad por escenario base y par de variables.
+
+    Cada escenario guarda una malla rectangular con la unión de los valores
+    de los ejes pedidos hasta ahora y una máscara de las celdas ya
+    calculadas, de modo que al mover los rangos solo se evalúan las celdas
+    nuevas. Si la unión supera ``max_celdas``, la malla vuelve a empezar
+    con la última pedida. Entre todos los escenarios ocupan como mucho
+    ``max_bytes``; se descarta primero el usado hace más tiempo. Las mallas
+    guardadas no se modifican: cada actualización crea arrays nuevos, así
+    que se pueden leer sin el lock.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20, max_celdas: int = 400_000):
+        self.max_bytes = max_bytes
+        self.max_celdas = max_celdas
+        # clave -> (eje x, eje y, valores (y, x), máscara de calculadas)
+        self._mallas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.celdas_calculadas = 0
+        self.celdas_reutilizadas = 0
+
+    @staticmethod
+    def _clave(c, a, var_x, var_y):
+        base = {**c, **a}
+        base.pop(var_x, None)
+        base.pop(var_y, None)
+        return (var_x, var_y) + tuple(sorted((k, float(v)) for k, v in base.items()))
+
+    def diferencia(self, c, a, var_x, valores_x, var_y, valores_y):
+        """Como ``malla_diferencia``, pero reutilizando las celdas ya calculadas."""
+        valores_x = np.round(np.asarray(valores_x, dtype=np.float64), 9)
+        valores_y = np.round(np.asarray(valores_y, dtype=np.float64), 9)
+        clave = self._clave(c, a, var_x, var_y)
+        resultado = np.empty((len(valores_y), len(valores_x)))
+        hecho = np.zeros(resultado.shape, dtype=bool)
+
+        with self._lock:
+            guardada = self._mallas.get(clave)
+            if guardada is not None:
+                self._mallas.move_to_end(clave)
+        if guardada is not None:
+            eje_x, eje_y, valores, calculadas = guardada
+            pos_x, en_x = _posiciones(eje_x, valores_x)
+            pos_y, en_y = _posiciones(eje_y, valores_y)
+            celdas = np.ix_(pos_y, pos_x)
+            resultado[:] = valores[celdas]
+            hecho[:] = calculadas[celdas] & en_y[:, None] & en_x[None, :]
+
+        fila, columna = np.nonzero(~hecho)
+        if fila.size:
+            escenario = {"compra": dict(c), "alquiler": dict(a)}
+            escenario[VARIABLES[var_x][0]][var_x] = valores_x[columna]
+            escenario[VARIABLES[var_y][0]][var_y] = valores_y[fila]
+            resumen, _ = calcular_resultados_lote(
+                escenario["compra"], escenario["alquiler"], columnas=False
+            )
+            resultado[fila, columna] = resumen["diferencia_patrimonio"]
+
+        with self._lock:
+            self.celdas_calculadas += int(fila.size)
+            self.celdas_reutilizadas += int(resultado.size - fila.size)
+            if fila.size:
+                self._guardar(clave, valores_x, valores_y, resultado)
+        return resultado
+
+    def _guardar(self, clave, valores_x, valores_y, resultado):
+        """Une la malla calculada con la guardada. Se llama con el lock tomado."""
+        anterior = self._mallas.pop(clave, None)
+        if anterior is not None:
+            self._bytes -= sum(x.nbytes for x in anterior)
+            eje_x = np.union1d(anterior[0], valores_x)
+            eje_y = np.union1d(anterior[1], valores_y)
+            if eje_x.size * eje_y.size > self.max_celdas:
+                anterior = None
+        if anterior is None:
+            eje_x, eje_y = np.unique(valores_x), np.unique(valores_y)
+
+        valores = np.empty((eje_y.size, eje_x.size))
+        calculadas = np.zeros(valores.shape, dtype=bool)
+        if anterior is not None:
+            celdas = np.ix_(np.searchsorted(eje_y, anterior[1]), np.searchsorted(eje_x, anterior[0]))
+            valores[celdas] = anterior[2]
+            calculadas[celdas] = anterior[3]
+        celdas = np.ix_(np.searchsorted(eje_y, valores_y), np.searchsorted(eje_x, valores_x))
+        valores[celdas] = resultado
+        calculadas[celdas] = True
+
+        malla = (eje_x, eje_y, valores, calculadas)
+        self._mallas[clave] = malla
+        self._bytes += sum(x.nbytes for x in malla)
+        while self._bytes > self.max_bytes and len(self._mallas) > 1:
+            _, descartada = self._mallas.popitem(last=False)
+            self._bytes -= sum(x.nbytes for x in descartada)
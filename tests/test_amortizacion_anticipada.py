@@ -0,0 +1,69 @@
+import numpy as np
+import numpy_financial as npf
+import pytest
+
+from amortizacion_anticipada import evaluar_planes, optimizar_amortizacion
+from conftest import ALQUILER, COMPRA
+from motor import calcular_resultados
+
+
+def mes_liquidacion(c, a, excedente, reducir_plazo):
+    """Mes en que se liquida la hipoteca amortizando todo el excedente al
+    empezar cada año del horizonte, calculado mes a mes."""
+    tasa = c["tipo_interes_hipoteca"] / 100 / 12
+    meses = c["plazo_hipoteca"] * 12
+    saldo = c["precio_vivienda"] * (1 - c["entrada_pct"] / 100)
+    cuota = float(npf.pmt(tasa, meses, -saldo))
+    mes = 0
+    while True:
+        if mes % 12 == 0 and mes < 12 * a["horizonte_anios"]:
+            saldo -= min(excedente, saldo)
+            if saldo <= 0:
+                return mes
+            if not reducir_plazo:
+                cuota = float(npf.pmt(tasa, meses - mes, -saldo))
+        mes += 1
+        saldo = saldo * (1 + tasa) - cuota
+        if saldo <= 1e-6:
+            return mes
+
+
+@pytest.mark.parametrize("horizonte", [10, 20, 30])
+@pytest.mark.parametrize("reducir_plazo", [True, False])
+def test_mes_de_liquidacion(horizonte, reducir_plazo):
+    c = dict(COMPRA, plazo_hipoteca=30)
+    a = dict(ALQUILER, horizonte_anios=horizonte)
+    resultado = evaluar_planes(c, a, 10_000, np.ones((1, horizonte)), reducir_plazo)
+    assert resultado["meses"][0] == mes_liquidacion(c, a, 10_000, reducir_plazo)
+
+
+def test_liquidacion_tras_el_horizonte():
+    # Reduciendo plazo, la hipoteca a 30 años se liquida antes aunque el
+    # horizonte acabe con deuda pendiente
+    c = dict(COMPRA, plazo_hipoteca=30)
+    a = dict(ALQUILER, horizonte_anios=10)
+    resultado = evaluar_planes(c, a, 10_000, np.ones((1, 10)), True)
+    assert resultado["capital"][0] > 0
+    assert 120 < resultado["meses"][0] < 360
+    # Sin amortizar, el plazo original
+    assert evaluar_planes(c, a, 10_000, np.zeros((1, 10)), True)["meses"][0] == 360
+
+
+@pytest.mark.parametrize("horizonte", [10, 25, 35])
+def test_sin_excedente_igual_que_calcular_resultados(horizonte):
+    # La deuda son las cuotas pendientes, como en el motor
+    c = dict(COMPRA, plazo_hipoteca=30)
+    a = dict(ALQUILER, horizonte_anios=horizonte)
+    resultado = evaluar_planes(c, a, 0.0, np.zeros((1, horizonte)), True)
+    resumen, _ = calcular_resultados(c, a)
+    assert resultado["patrimonio"][0] == pytest.approx(resumen["patrimonio_neto_final"])
+
+
+def test_optimizar_con_patrimonio_negativo():
+    # Con el patrimonio negativo la búsqueda también para cuando deja de mejorar
+    c = dict(COMPRA, plazo_hipoteca=30, revalorizacion_vivienda_pct=-25.0)
+    a = dict(ALQUILER, horizonte_anios=10, rentabilidad_inversion_pct=0.0)
+    plan = optimizar_amortizacion(c, a, 1000)
+    assert plan["patrimonio"] < 0
+    assert plan["patrimonio"] >= plan["patrimonio_invertir"]
+    assert optimizar_amortizacion(c, a, 1000, max_pasadas=300)["evaluados"] == plan["evaluados"]
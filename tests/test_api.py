@@ -0,0 +1,107 @@
+"""Servicio JSON arrancado en un puerto local, como lo usan otros servicios."""
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from conftest import ALQUILER, COMPRA
+from motor import calcular_resultados
+
+pytest.importorskip("starlette")
+pytest.importorskip("uvicorn")
+
+RAIZ = os.path.join(os.path.dirname(__file__), "..")
+
+
+@pytest.fixture(scope="module")
+def url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto = s.getsockname()[1]
+    servidor = subprocess.Popen([sys.executable, os.path.join(RAIZ, "api.py"),
+                                 "--puerto", str(puerto), "--procesos", "1"])
+    url = f"http://127.0.0.1:{puerto}"
+    try:
+        limite = time.monotonic() + 30
+        while True:
+            try:
+                urllib.request.urlopen(url + "/salud", timeout=1).read()
+                break
+            except OSError:
+                if time.monotonic() > limite or servidor.poll() is not None:
+                    raise
+                time.sleep(0.1)
+        yield url
+    finally:
+        servidor.terminate()
+        servidor.wait(10)
+
+
+def pedir(url, ruta, cuerpo):
+    """(código, JSON) de un POST a ``ruta``."""
+    peticion = urllib.request.Request(url + ruta, data=json.dumps(cuerpo).encode(),
+                                      headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(peticion, timeout=30) as respuesta:
+            return respuesta.status, json.load(respuesta)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_evaluar_igual_que_calcular_resultados(url):
+    codigo, datos = pedir(url, "/evaluar", {"compra": COMPRA, "alquiler": ALQUILER,
+                                            "tabla": True})
+    assert codigo == 200
+    resumen, df = calcular_resultados(COMPRA, ALQUILER)
+    assert datos["resumen"]["diferencia_patrimonio"] == pytest.approx(
+        resumen["diferencia_patrimonio"])
+    assert datos["resumen"]["patrimonio_compra"] == pytest.approx(
+        resumen["patrimonio_compra"].tolist())
+    assert len(datos["tabla"]) == len(df)
+
+
+def test_lote_en_orden(url):
+    escenarios = [{"compra": dict(COMPRA, precio_vivienda=p), "alquiler": ALQUILER}
+                  for p in (150_000, 250_000, 400_000)]
+    codigo, datos = pedir(url, "/lote", {"escenarios": escenarios})
+    assert codigo == 200
+    for escenario, resultado in zip(escenarios, datos["resultados"]):
+        esperado = calcular_resultados(escenario["compra"], ALQUILER).resumen
+        assert resultado["resumen"]["diferencia_patrimonio"] == pytest.approx(
+            esperado["diferencia_patrimonio"])
+
+
+@pytest.mark.parametrize("valor", [-3, 2e9, 2.7, 0, "x", None])
+def test_escenario_fuera_de_rango(url, valor):
+    codigo, datos = pedir(url, "/evaluar", {
+        "compra": COMPRA, "alquiler": dict(ALQUILER, horizonte_anios=valor)})
+    assert codigo == 422
+    assert datos["campo"] == "alquiler.horizonte_anios"
+
+
+def test_equilibrio(url):
+    codigo, datos = pedir(url, "/equilibrio", {
+        "compra": COMPRA, "alquiler": ALQUILER, "variable": "rentabilidad_inversion_pct"})
+    assert codigo == 200
+    assert 0 < datos["valor"] < 20
+
+
+@pytest.mark.parametrize("limites,campo", [
+    ({"minimo": -50}, "minimo"),
+    ({"maximo": 99}, "maximo"),
+    ({"minimo": "x"}, "minimo"),
+    ({"minimo": 5, "maximo": 2}, "maximo"),
+    ({"minimo": 10}, "minimo"),
+])
+def test_equilibrio_limites_invalidos(url, limites, campo):
+    codigo, datos = pedir(url, "/equilibrio", {
+        "compra": COMPRA, "alquiler": ALQUILER, "variable": "tipo_interes_hipoteca",
+        **limites})
+    assert codigo == 422
+    assert datos["campo"] == campo
@@ -0,0 +1,102 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from cache_resultados import CacheCompartida, CacheTramos, tamano_resultado
+from conftest import ALQUILER, COMPRA
+from motor import calcular_resultados
+from motor_lote import COLUMNAS
+
+
+def test_resultado_en_cache_no_se_modifica():
+    cache = CacheCompartida()
+    resultado = cache.calcular("clave", lambda: calcular_resultados(COMPRA, ALQUILER),
+                               tamano_resultado)
+    resumen, df = resultado
+    original_resumen = {k: np.copy(v) for k, v in resumen.items()}
+    original_df = df.copy(deep=True)
+
+    resumen["diferencia_patrimonio"] = 0.0
+    resumen["extra"] = 1
+    df.loc[0, COLUMNAS[1]] = -1.0
+    df["nueva"] = 0.0
+    with pytest.raises(ValueError):
+        resumen["patrimonio_compra"][0] = 0.0
+
+    guardado = cache.calcular("clave", lambda: pytest.fail("debía estar en la cache"))
+    assert guardado is resultado
+    otro_resumen, otro_df = guardado
+    assert otro_resumen.keys() == original_resumen.keys()
+    for k, v in original_resumen.items():
+        np.testing.assert_array_equal(otro_resumen[k], v)
+    assert otro_df.equals(original_df)
+
+
+def test_compartida_genera_cada_clave_una_vez():
+    cache = CacheCompartida()
+    generadas = []
+    lock = threading.Lock()
+
+    def generar(clave):
+        with lock:
+            generadas.append(clave)
+        time.sleep(0.01)
+        return [clave]
+
+    def pedir(i):
+        clave = i % 8
+        return cache.calcular(clave, lambda: generar(clave))
+
+    intervalo = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(32) as pool:
+            valores = list(pool.map(pedir, range(2_000)))
+    finally:
+        sys.setswitchinterval(intervalo)
+    assert valores == [[i % 8] for i in range(2_000)]
+    assert sorted(generadas) == list(range(8))
+    # Cada consulta cuenta una vez: las que esperan a otra sesión son aciertos
+    assert cache.fallos == 8
+    assert cache.aciertos + cache.fallos == 2_000
+
+
+def fallos(tramos):
+    return {tramo: e["fallos"] for tramo, e in tramos.estadisticas().items()}
+
+
+def test_tramos_solo_recalcula_lo_que_cambia():
+    tramos = CacheTramos()
+    calcular_resultados(COMPRA, ALQUILER, tramos)
+    assert fallos(tramos) == {"hipoteca": 1, "compra": 1, "alquiler": 1, "inversion": 1}
+
+    # La rentabilidad solo afecta a la inversión
+    a = dict(ALQUILER, rentabilidad_inversion_pct=5.0)
+    resumen, df = calcular_resultados(COMPRA, a, tramos)
+    assert fallos(tramos) == {"hipoteca": 1, "compra": 1, "alquiler": 1, "inversion": 2}
+    esperado, df_esperado = calcular_resultados(COMPRA, a)
+    assert resumen["diferencia_patrimonio"] == esperado["diferencia_patrimonio"]
+    assert df.equals(df_esperado)
+
+    # La revalorización cambia la compra pero no la hipoteca ni el alquiler
+    c = dict(COMPRA, revalorizacion_vivienda_pct=3.0)
+    calcular_resultados(c, a, tramos)
+    assert fallos(tramos) == {"hipoteca": 1, "compra": 2, "alquiler": 1, "inversion": 3}
+
+    # Repetir un escenario ya calculado no recalcula nada; la hipoteca solo
+    # se consulta cuando hay que calcular la compra
+    calcular_resultados(COMPRA, ALQUILER, tramos)
+    assert fallos(tramos) == {"hipoteca": 1, "compra": 2, "alquiler": 1, "inversion": 3}
+    assert tramos.estadisticas()["hipoteca"]["aciertos"] == 1
+    assert tramos.estadisticas()["inversion"]["aciertos"] == 1
+
+
+def test_tramos_25_y_25_0_comparten_clave():
+    tramos = CacheTramos()
+    calcular_resultados(dict(COMPRA, plazo_hipoteca=25), ALQUILER, tramos)
+    calcular_resultados(dict(COMPRA, plazo_hipoteca=25.0), ALQUILER, tramos)
+    assert fallos(tramos)["compra"] == 1
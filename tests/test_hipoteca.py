@@ -0,0 +1,52 @@
+import numpy as np
+import numpy_financial as npf
+import pytest
+
+from hipoteca import amortizacion_hipoteca, calendario_hipoteca
+
+CASOS = [(200000.0, 2.8, 25, 25), (200000.0, 3.5, 30, 10), (150000.0, 0.0, 20, 30),
+         (90000.0, 6.0, 10, 12)]
+
+
+def bucle_mensual(capital, tasa, meses, horizonte):
+    """Calendario mes a mes, como lo calculaba la primera versión de la app."""
+    cuota = float(npf.pmt(tasa, meses, -capital))
+    saldo = capital
+    pagado = 0.0
+    deuda = cuota * meses
+    amortizado_anual, deuda_anual = [0.0], [deuda]
+    for mes in range(1, min(meses, horizonte * 12) + 1):
+        saldo -= cuota - saldo * tasa
+        pagado += cuota
+        deuda -= cuota
+        if mes % 12 == 0:
+            amortizado_anual.append(pagado)
+            deuda_anual.append(max(deuda, 0.0))
+    while len(amortizado_anual) < horizonte + 1:
+        amortizado_anual.append(pagado)
+        deuda_anual.append(0.0)
+    return cuota, saldo, amortizado_anual, deuda_anual
+
+
+@pytest.mark.parametrize("capital,interes,anios,horizonte", CASOS)
+def test_forma_cerrada_igual_que_bucle_mensual(capital, interes, anios, horizonte):
+    tasa = interes / 100 / 12
+    cuota, amortizado, deuda = calendario_hipoteca(capital, tasa, anios * 12, horizonte)
+    cuota_bucle, saldo, amortizado_bucle, deuda_bucle = bucle_mensual(
+        capital, tasa, anios * 12, horizonte)
+    assert cuota == pytest.approx(cuota_bucle)
+    np.testing.assert_allclose(amortizado, amortizado_bucle, rtol=1e-12)
+    np.testing.assert_allclose(deuda, deuda_bucle, rtol=1e-9, atol=1e-6)
+    if horizonte >= anios:
+        # La cuota liquida justo el capital en el plazo
+        assert saldo == pytest.approx(0.0, abs=1e-6)
+
+
+def test_vectorizado_igual_que_uno_a_uno():
+    capital, interes, anios, _ = map(np.array, zip(*CASOS))
+    tasa = interes / 100 / 12
+    cuota, amortizado, deuda = calendario_hipoteca(capital, tasa, anios * 12, 15)
+    for i in range(len(CASOS)):
+        esperado = amortizacion_hipoteca(capital[i], tasa[i], int(anios[i]) * 12, 15)
+        np.testing.assert_allclose(amortizado[i], esperado[0])
+        np.testing.assert_allclose(deuda[i], esperado[1])
@@ -0,0 +1,54 @@
+import numpy as np
+import numpy_financial as npf
+import pytest
+
+from conftest import COMPRA
+from hipoteca_variable import calendario_variable, simular_hipoteca, tipos_hipoteca
+
+
+def bucle_mensual(capital, tipos, meses):
+    """Capital pendiente a final de cada año e intereses totales, mes a mes,
+    recalculando la cuota al empezar cada año."""
+    saldo = capital
+    intereses = 0.0
+    capital_anual = [capital]
+    for mes in range(meses):
+        tasa = tipos[mes // 12] / 100 / 12
+        if mes % 12 == 0:
+            cuota = float(npf.pmt(tasa, meses - mes, -saldo))
+        interes = saldo * tasa
+        intereses += interes
+        saldo -= cuota - interes
+        if (mes + 1) % 12 == 0:
+            capital_anual.append(max(saldo, 0.0))
+    return np.array(capital_anual), intereses
+
+
+def test_calendario_igual_que_bucle_mensual():
+    tipos = np.array([1.5, 3.0, 0.0, 4.2, 2.0, 2.5, 6.0, 1.0, 3.3, 2.2])
+    calendario = calendario_variable(100_000.0, tipos[None, :], 120, 10)
+    capital, intereses = bucle_mensual(100_000.0, tipos, 120)
+    np.testing.assert_allclose(calendario["capital"][0], capital, atol=1e-6)
+    assert calendario["intereses_totales"][0] == pytest.approx(intereses)
+
+
+def test_euribor_constante_igual_que_fija():
+    c = dict(COMPRA, tipo_interes_hipoteca=3.0)
+    euribor = np.full((3, c["plazo_hipoteca"]), 2.0)
+    variable = simular_hipoteca(c, modalidad="variable", diferencial=1.0, euribor=euribor)
+    assert variable["intereses_totales"][50] == pytest.approx(variable["intereses_fija"])
+
+
+def test_mixta_mantiene_los_anios_fijos():
+    euribor = np.full((2, 10), 5.0)
+    tipos = tipos_hipoteca("mixta", 10, tipo_fijo=2.0, diferencial=1.0, euribor=euribor,
+                           periodos_fijos=3)
+    np.testing.assert_array_equal(tipos[:, :3], 2.0)
+    np.testing.assert_array_equal(tipos[:, 3:], 6.0)
+
+
+def test_datos_invalidos():
+    with pytest.raises(ValueError, match="periodo a tipo fijo"):
+        tipos_hipoteca("mixta", 10, euribor=np.zeros((1, 10)))
+    with pytest.raises(ValueError, match="necesita 25"):
+        simular_hipoteca(COMPRA, euribor=np.zeros((5, 10)))
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from conftest import ALQUILER, COMPRA
+from impuestos import REGIONES, calcular_con_impuestos, impuestos_compra, irpf_ahorro
+
+
+def test_itp_aragon_por_tramos():
+    # 8 % hasta 400.000, 8,5 % hasta 450.000, 9 % hasta 500.000 y 9,5 % después
+    assert impuestos_compra(600_000, "Aragón") == pytest.approx(50_250.0)
+    assert impuestos_compra(400_000, "Aragón") == pytest.approx(32_000.0)
+
+
+def test_itp_tramo_unico_y_obra_nueva():
+    assert impuestos_compra(300_000, "Comunidad de Madrid") == pytest.approx(18_000.0)
+    # IVA 10 % + AJD 0,75 %
+    assert impuestos_compra(300_000, "Comunidad de Madrid", obra_nueva=True) == pytest.approx(32_250.0)
+
+
+def test_itp_vectorizado_igual_que_uno_a_uno():
+    precios = np.array([150_000.0, 420_000.0, 600_000.0, 2_500_000.0])
+    regiones = np.array(["Aragón", "Illes Balears", "Extremadura", "Cataluña"])
+    esperado = [float(impuestos_compra(p, r)) for p, r in zip(precios, regiones)]
+    np.testing.assert_allclose(impuestos_compra(precios, regiones), esperado)
+
+
+def test_irpf_ahorro():
+    # 19 % hasta 6.000, 21 % hasta 50.000 y 23 % hasta 200.000
+    assert irpf_ahorro(60_000) == pytest.approx(12_680.0)
+    assert irpf_ahorro(6_000) == pytest.approx(1_140.0)
+    assert irpf_ahorro(-5_000) == 0.0
+
+
+def test_comunidad_desconocida():
+    with pytest.raises(ValueError, match="comunidades desconocidas"):
+        impuestos_compra(200_000, "Atlántida")
+
+
+def test_solo_resumen_igual_que_con_columnas():
+    rng = np.random.default_rng(0)
+    n = 200
+    c = dict(COMPRA, precio_vivienda=rng.uniform(80_000, 900_000, n),
+             plazo_hipoteca=rng.integers(5, 41, n))
+    a = dict(ALQUILER, horizonte_anios=rng.integers(1, 41, n))
+    region = rng.integers(0, len(REGIONES), n)
+    completo, tabla = calcular_con_impuestos(c, a, region)
+    resumen, nada = calcular_con_impuestos(c, a, region, columnas=False)
+    assert nada is None and tabla is not None
+    assert "patrimonio_compra" not in resumen
+    for clave in ("patrimonio_neto_final", "patrimonio_neto_final_alq", "diferencia_patrimonio",
+                  "plusvalia_municipal", "irpf_inversion", "impuestos_compra", "ibi_anual"):
+        np.testing.assert_allclose(resumen[clave], completo[clave], rtol=1e-12)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from conftest import ALQUILER, COMPRA
+from montecarlo import simular_montecarlo
+from motor import calcular_resultados
+
+
+@pytest.mark.parametrize("n", [0, -5])
+def test_sin_trayectorias(n):
+    with pytest.raises(ValueError, match="n_trayectorias"):
+        simular_montecarlo(COMPRA, ALQUILER, n)
+
+
+def test_t_de_student_con_pocos_grados_de_libertad():
+    with pytest.raises(ValueError, match="grados de libertad"):
+        simular_montecarlo(COMPRA, ALQUILER, 100, semilla=0, procesos=1,
+                           distribuciones={"rentabilidad_inversion_pct": {"gl": 2}})
+
+
+def test_misma_semilla_mismo_resultado_con_procesos():
+    serie = simular_montecarlo(COMPRA, ALQUILER, 5_000, semilla=3, tam_bloque=1_000, procesos=1)
+    pool = simular_montecarlo(COMPRA, ALQUILER, 5_000, semilla=3, tam_bloque=1_000, procesos=2)
+    assert serie["prob_alquiler_mejor"] == pool["prob_alquiler_mejor"]
+    for clave in ("compra", "alquiler", "diferencia"):
+        for p in (5, 50, 95):
+            np.testing.assert_array_equal(serie[clave][p], pool[clave][p])
+
+
+def test_sin_volatilidad_igual_que_el_escenario():
+    # Con desviación 0 todas las trayectorias son el escenario determinista
+    fijas = {v: {"tipo": "normal", "desviacion": 0.0} for v in
+             ("revalorizacion_vivienda_pct", "rentabilidad_inversion_pct",
+              "subida_alquiler_anual_pct")}
+    resultado = simular_montecarlo(COMPRA, ALQUILER, 2_500, fijas, semilla=0,
+                                   tam_bloque=1_000, procesos=1)
+    resumen, _ = calcular_resultados(COMPRA, ALQUILER)
+    assert resultado["prob_alquiler_mejor"] in (0.0, 1.0)
+    assert resultado["diferencia"][50][-1] == pytest.approx(resumen["diferencia_patrimonio"],
+                                                           rel=1e-3)
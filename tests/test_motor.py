@@ -0,0 +1,62 @@
+"""El motor y el cálculo por lotes frente a los valores de referencia.
+
+``datos/referencia_calcular_resultados.json`` se generó con el
+``calcular_resultados`` de la primera versión de la app (el bucle año a año
+con listas) para varios escenarios: cambiar el motor no debe cambiar ningún
+número.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from motor import calcular_resultados
+from motor_lote import COLUMNAS, calcular_resultados_lote
+
+with open(os.path.join(os.path.dirname(__file__), "datos",
+                       "referencia_calcular_resultados.json"), encoding="utf-8") as f:
+    REFERENCIA = json.load(f)
+
+
+def comprobar(resumen, tabla, caso, i=None):
+    """Compara un resumen y una tabla (del motor o la fila ``i`` del lote)
+    con un caso de la referencia."""
+    anios = len(caso["resumen"]["anios"])
+    for k, esperado in caso["resumen"].items():
+        obtenido = resumen[k] if i is None or k == "anios" else resumen[k][i]
+        if isinstance(esperado, list):
+            obtenido = obtenido[:anios]
+        np.testing.assert_allclose(obtenido, esperado, rtol=1e-9, atol=1e-6, err_msg=k)
+    for col in COLUMNAS:
+        obtenido = tabla[col] if i is None else tabla[col][i, :anios + 1]
+        np.testing.assert_allclose(obtenido, caso["tabla"][col], rtol=1e-9, atol=1e-6,
+                                   err_msg=col)
+
+
+@pytest.mark.parametrize("caso", REFERENCIA)
+def test_calcular_resultados_igual_que_referencia(caso):
+    resumen, df = calcular_resultados(caso["compra"], caso["alquiler"])
+    assert list(df.columns) == list(COLUMNAS)
+    comprobar(resumen, df, caso)
+
+
+def test_lote_igual_que_referencia():
+    claves_compra = sorted({k for caso in REFERENCIA for k in caso["compra"]})
+    claves_alquiler = sorted({k for caso in REFERENCIA for k in caso["alquiler"]})
+    c = {k: np.array([caso["compra"].get(k, 0.0) for caso in REFERENCIA]) for k in claves_compra}
+    a = {k: np.array([caso["alquiler"][k] for caso in REFERENCIA]) for k in claves_alquiler}
+    resumen, tabla = calcular_resultados_lote(c, a)
+    for i, caso in enumerate(REFERENCIA):
+        comprobar(resumen, tabla, caso, i)
+        # Tras el horizonte de cada escenario, NaN
+        anios = len(caso["resumen"]["anios"])
+        assert np.isnan(tabla[COLUMNAS[-1]][i, anios + 1:]).all()
+
+
+def test_lote_sin_columnas():
+    caso = REFERENCIA[0]
+    resumen, tabla = calcular_resultados_lote(caso["compra"], caso["alquiler"], columnas=False)
+    assert tabla is None
+    assert resumen["diferencia_patrimonio"][0] == pytest.approx(
+        caso["resumen"]["diferencia_patrimonio"])
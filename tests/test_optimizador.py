@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from conftest import ALQUILER, COMPRA
+from motor_lote import calcular_resultados_lote
+from optimizador import REJILLA, frente_pareto, optimizar_compra
+
+
+def test_frente_pareto():
+    patrimonio = [5.0, 4.0, 4.0, 3.0, 6.0, 6.0]
+    liquidez = [1.0, 2.0, 0.5, 2.0, 0.0, 0.0]
+    # El 2 y el 3 están dominados por el 1; el 5 repite el 4
+    assert frente_pareto(patrimonio, liquidez).tolist() == [4, 0, 1]
+
+
+def fuerza_bruta(rejilla, objetivo, ahorros, cuota_maxima):
+    """Frente calculando todas las combinaciones de una vez."""
+    malla = np.meshgrid(*rejilla.values(), indexing="ij")
+    compra = dict(COMPRA, **{var: m.ravel() for var, m in zip(rejilla, malla)})
+    resumen, _ = calcular_resultados_lote(compra, ALQUILER, columnas=False)
+    precio, entrada = compra["precio_vivienda"], compra["entrada_pct"]
+    liquidez = ahorros - precio * (entrada + compra["gastos_compra_pct"]) / 100
+    capital = precio * (1 - entrada / 100)
+    tasa = compra["tipo_interes_hipoteca"] / 100 / 12
+    cuota = capital * tasa / (1 - (1 + tasa) ** -(compra["plazo_hipoteca"] * 12))
+    clave, signo = ("patrimonio_neto_final", 1.0) if objetivo == "patrimonio" else (
+        "diferencia_patrimonio", -1.0)
+    factible = (cuota <= cuota_maxima) & (liquidez >= 0)
+    patrimonio = signo * resumen[clave][factible]
+    frente = frente_pareto(patrimonio, liquidez[factible])
+    return np.sort(patrimonio[frente]), int(factible.sum())
+
+
+@pytest.mark.parametrize("objetivo", ["patrimonio", "ventaja"])
+@pytest.mark.parametrize("procesos", [1, 2])
+def test_igual_que_fuerza_bruta(objetivo, procesos):
+    rejilla = {"entrada_pct": np.arange(0.0, 51.0, 5.0), "plazo_hipoteca": np.arange(5, 41, 5),
+               "precio_vivienda": np.linspace(150_000, 400_000, 6)}
+    opt = optimizar_compra(COMPRA, ALQUILER, rejilla, objetivo, ahorros=90_000.0,
+                           cuota_maxima=1_300.0, desembolso_maximo=90_000.0,
+                           tam_bloque=97, procesos=procesos)
+    esperado, factibles = fuerza_bruta(rejilla, objetivo, 90_000.0, 1_300.0)
+    assert opt["combinaciones"] == 11 * 8 * 6
+    assert opt["factibles"] == factibles
+    assert np.sort(opt["frente"][objetivo].to_numpy()) == pytest.approx(esperado)
+
+
+def test_rejilla_por_defecto_sin_horizonte():
+    # Con el horizonte en la rejilla el frente se reducía a su último valor.
+    # Con la hipoteca más cara que la inversión, más entrada da más ventaja
+    # a cambio de liquidez
+    assert "horizonte_anios" not in REJILLA
+    c = dict(COMPRA, tipo_interes_hipoteca=5.0)
+    a = dict(ALQUILER, rentabilidad_inversion_pct=1.0)
+    opt = optimizar_compra(c, a, objetivo="ventaja", ahorros=100_000.0, procesos=1)
+    frente = opt["frente"]
+    assert list(frente.columns[:2]) == ["entrada_pct", "plazo_hipoteca"]
+    assert len(frente) > 5
+    assert frente["liquidez"].is_monotonic_increasing
+
+
+def test_variable_desconocida():
+    with pytest.raises(ValueError):
+        optimizar_compra(COMPRA, ALQUILER, {"no_existe": [1, 2]})
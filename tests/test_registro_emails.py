@@ -0,0 +1,75 @@
+"""Almacén de emails en SQLite y exportación al formato de texto."""
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from registro_emails import AlmacenSQLite, exportar, importar
+
+RAIZ = os.path.join(os.path.dirname(__file__), "..")
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    almacen = AlmacenSQLite(str(tmp_path / "emails.db"))
+    yield almacen
+    almacen.cerrar()
+
+
+def test_sin_duplicados_al_normalizar(almacen):
+    assert almacen.guardar("Ana@Ejemplo.com ") is True
+    assert almacen.guardar_varios(["ana@ejemplo.com", "luis@ejemplo.com"]) == [False, True]
+    assert almacen.emails() == ["Ana@Ejemplo.com", "luis@ejemplo.com"]
+
+
+def test_email_no_valido(almacen):
+    with pytest.raises(ValueError):
+        almacen.guardar("sin-arroba")
+
+
+def test_altas_concurrentes(almacen):
+    emails = [f"u{i % 50}@ejemplo.com" for i in range(400)]
+    with ThreadPoolExecutor(16) as pool:
+        nuevos = list(pool.map(almacen.guardar, emails))
+    assert sum(nuevos) == 50
+    assert len(almacen.emails()) == 50
+
+
+def test_no_admite_altas_tras_cerrar(almacen):
+    almacen.guardar("ana@ejemplo.com")
+    almacen.cerrar()
+    almacen.cerrar()
+    with pytest.raises(RuntimeError):
+        almacen.guardar("luis@ejemplo.com")
+    assert almacen.emails() == ["ana@ejemplo.com"]
+
+
+def test_importar_y_exportar(almacen, tmp_path):
+    entrada = tmp_path / "emails.txt"
+    entrada.write_text("ana@ejemplo.com\nANA@ejemplo.com\nnada\nluis@ejemplo.com\n")
+    assert importar(almacen, str(entrada)) == (2, 2)
+    salida = tmp_path / "exportados.txt"
+    assert exportar(almacen, str(salida)) == 2
+    assert salida.read_text() == "ana@ejemplo.com\nluis@ejemplo.com\n"
+    with pytest.raises(FileExistsError):
+        exportar(almacen, str(salida))
+    assert exportar(almacen, str(salida), forzar=True) == 2
+
+
+def test_exportar_desde_la_linea_de_ordenes(tmp_path):
+    ruta = str(tmp_path / "emails.db")
+    almacen = AlmacenSQLite(ruta)
+    almacen.guardar("ana@ejemplo.com")
+    almacen.cerrar()
+    salida = tmp_path / "exportados.txt"
+    salida.write_text("lista anterior\n")
+    orden = [sys.executable, os.path.join(RAIZ, "registro_emails.py"), "--ruta", ruta,
+             "exportar", "--salida", str(salida)]
+    rechazada = subprocess.run(orden, capture_output=True, text=True)
+    assert rechazada.returncode == 2
+    assert "--forzar" in rechazada.stderr
+    assert salida.read_text() == "lista anterior\n"
+    subprocess.run(orden + ["--forzar"], check=True, capture_output=True)
+    assert salida.read_text() == "ana@ejemplo.com\n"
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from conftest import ALQUILER, COMPRA
+from sensibilidad import VARIABLES, CacheMalla, malla_diferencia, valores_eje
+
+X, Y = "tipo_interes_hipoteca", "rentabilidad_inversion_pct"
+
+
+def test_rango_desplazado_reutiliza_las_celdas_solapadas():
+    cache = CacheMalla()
+    valores_y = valores_eje(Y, 2.0, 12.0)
+    antes = valores_eje(X, 1.0, 5.0)
+    cache.diferencia(COMPRA, ALQUILER, X, antes, Y, valores_y)
+    calculadas = cache.celdas_calculadas
+
+    despues = valores_eje(X, 1.5, 5.5)
+    solapadas = np.intersect1d(antes, despues).size
+    assert solapadas > 0.8 * len(despues)
+    malla = cache.diferencia(COMPRA, ALQUILER, X, despues, Y, valores_y)
+    assert cache.celdas_reutilizadas == solapadas * len(valores_y)
+    assert cache.celdas_calculadas - calculadas == (len(despues) - solapadas) * len(valores_y)
+    np.testing.assert_array_equal(malla, malla_diferencia(COMPRA, ALQUILER, X, despues, Y, valores_y))
+
+
+@pytest.mark.parametrize("var", list(VARIABLES))
+def test_ejes_en_rango_y_sin_repetidos(var):
+    _, _, minimo, maximo, entero = VARIABLES[var]
+    valores = valores_eje(var, minimo, maximo)
+    assert minimo <= valores[0] and valores[-1] <= maximo
+    assert np.all(np.diff(valores) > 0)
+    assert 100 <= len(valores) <= 300 or entero
+    if entero:
+        np.testing.assert_array_equal(valores, np.round(valores))
+
+
+def test_eje_entero_estrecho():
+    np.testing.assert_array_equal(valores_eje("plazo_hipoteca", 10, 12), [10, 11, 12])
@@ -0,0 +1,324 @@
+"""Cola de trabajos en segundo plano para simulaciones e informes largos.
+
+``ColaTrabajos.enviar`` devuelve enseguida un identificador; el trabajo se
+ejecuta en su propio proceso (como mucho ``max_procesos`` a la vez, el resto
+espera su turno), con menos prioridad que la app para que las ejecuciones
+interactivas no esperen a la CPU. Los procesos pueden abrir a su vez sus
+pools, como ``simular_montecarlo`` u ``optimizar_compra``.
+
+La función del trabajo recibe un argumento ``progreso``: llamarlo con
+``progreso(hecho, total)`` publica el avance y, si se ha pedido cancelar,
+lanza ``Cancelado`` para que la función termine en ese punto. Una función
+que no lo llama no informa del avance, y si se cancela se termina el
+proceso tras ``gracia`` segundos. El resultado se guarda en la cola para
+descargarlo después; se conservan los ``max_terminados`` trabajos acabados
+más recientes.
+
+Un hilo vigila a la vez las tuberías y los procesos de los trabajos en
+marcha, así que consultar el estado nunca bloquea.
+"""
+import atexit
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from multiprocessing.connection import wait
+
+import metricas
+
+
+ESTADOS = ("pendiente", "ejecutando", "terminado", "error", "cancelado")
+ACTIVOS = ("pendiente", "ejecutando")
+
+
+class Cancelado(Exception):
+    """Se ha pedido cancelar el trabajo en curso."""
+
+
+class _Progreso:
+    """Callback ``progreso(hecho, total=None, mensaje="")`` del trabajo.
+
+    Envía como mucho un aviso cada ``intervalo`` segundos (y siempre el
+    último) para no saturar la tubería con trabajos de muchos bloques.
+    """
+
+    def __init__(self, conexion, cancelado, intervalo: float = 0.1):
+        self.conexion = conexion
+        self.cancelado = cancelado
+        self.intervalo = intervalo
+        self._ultimo = 0.0
+
+    def __call__(self, hecho, total=None, mensaje: str = ""):
+        if self.cancelado.is_set():
+            raise Cancelado()
+        ahora = time.monotonic()
+        if ahora - self._ultimo >= self.intervalo or (total is not None and hecho >= total):
+            self._ultimo = ahora
+            fraccion = min(max(hecho / total, 0.0), 1.0) if total else None
+            self.conexion.send(("progreso", (fraccion, mensaje)))
+
+
+def _ejecutar(funcion, args, kwargs, conexion, cancelado, prioridad):
+    """Cuerpo del proceso de un trabajo: ejecuta y envía el resultado."""
+    if hasattr(os, "setpgrp"):
+        # Grupo propio, para poder terminar también los pools que abra el trabajo
+        os.setpgrp()
+    if prioridad and hasattr(os, "nice"):
+        os.nice(prioridad)
+    try:
+        resultado = funcion(*args, progreso=_Progreso(conexion, cancelado), **kwargs)
+    except Cancelado:
+        conexion.send(("cancelado", None))
+    except BaseException as e:
+        conexion.send(("error", "".join(traceback.format_exception_only(type(e), e)).strip()))
+    else:
+        try:
+            conexion.send(("terminado", resultado))
+        except Exception as e:
+            conexion.send(("error", f"el resultado no se puede enviar: {e}"))
+    finally:
+        conexion.close()
+
+
+def _terminar(proceso):
+    """Termina el proceso de un trabajo y los procesos que haya lanzado."""
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(proceso.pid, signal.SIGTERM)
+            return
+        except (ProcessLookupError, PermissionError):
+            # Aún no ha llegado a crear su grupo o ya ha terminado
+            pass
+    proceso.terminate()
+
+
+class Trabajo:
+    """Estado de un trabajo. Lo modifica solo el hilo de la cola."""
+
+    def __init__(self, id, nombre, funcion, args, kwargs):
+        self.id = id
+        self.nombre = nombre
+        self.funcion = funcion
+        self.args = args
+        self.kwargs = kwargs
+        self.estado = "pendiente"
+        self.progreso = 0.0
+        self.mensaje = ""
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.inicio = None
+        self.fin = None
+        self.cancelar_desde = None
+        self.proceso = None
+        self.conexion = None
+        self.cancelado = None
+
+    def resumen(self) -> dict:
+        return {
+            "id": self.id, "nombre": self.nombre, "estado": self.estado,
+            "progreso": self.progreso, "mensaje": self.mensaje, "error": self.error,
+            "creado": self.creado, "inicio": self.inicio, "fin": self.fin,
+        }
+
+
+class ColaTrabajos:
+    """Trabajos en procesos aparte con progreso, cancelación y resultados.
+
+    ``prioridad`` es el incremento de ``nice`` de los procesos de los
+    trabajos (0 para no cambiarla) y ``contexto`` el método de arranque de
+    ``multiprocessing``. Por defecto es ``"forkserver"`` (``"spawn"`` donde no
+    existe): la cola vive en un proceso con hilos, como el servidor de
+    Streamlit, y un ``fork`` desde ahí puede heredar locks tomados por otro
+    hilo.
+    """
+
+    def __init__(self, max_procesos: int = 2, max_terminados: int = 50,
+                 gracia: float = 5.0, prioridad: int = 10, contexto=None):
+        self.max_procesos = max_procesos
+        self.max_terminados = max_terminados
+        self.gracia = gracia
+        self.prioridad = prioridad
+        if contexto is None:
+            contexto = ("forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+                        else "spawn")
+        self._contexto = multiprocessing.get_context(contexto)
+        self._trabajos = OrderedDict()
+        self._pendientes = deque()
+        self._en_marcha = {}
+        self._lock = threading.Lock()
+        self._cerrada = False
+        # Escribir en esta tubería despierta al hilo cuando llega o se cancela un trabajo
+        self._despertador, self._aviso = self._contexto.Pipe(duplex=False)
+        self._hilo = threading.Thread(target=self._vigilar, daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    def enviar(self, funcion, *args, nombre: str = None, **kwargs) -> str:
+        """Pone en cola ``funcion(*args, progreso=..., **kwargs)`` y devuelve
+        su identificador. ``funcion`` y sus argumentos tienen que poder
+        enviarse a otro proceso (funciones de módulo, datos simples)."""
+        trabajo = Trabajo(uuid.uuid4().hex, nombre or funcion.__name__, funcion, args, kwargs)
+        with self._lock:
+            if self._cerrada:
+                raise RuntimeError("la cola de trabajos está cerrada")
+            self._trabajos[trabajo.id] = trabajo
+            self._pendientes.append(trabajo)
+        self._despertar()
+        return trabajo.id
+
+    def estado(self, id: str):
+        """Resumen del trabajo (estado, progreso de 0 a 1, mensaje, error y
+        marcas de tiempo), o ``None`` si no existe o ya se ha descartado."""
+        with self._lock:
+            trabajo = self._trabajos.get(id)
+            return None if trabajo is None else trabajo.resumen()
+
+    def resultado(self, id: str):
+        """Resultado del trabajo si ha terminado bien; si no, ``None``."""
+        with self._lock:
+            trabajo = self._trabajos.get(id)
+            return trabajo.resultado if trabajo is not None and trabajo.estado == "terminado" else None
+
+    def trabajos(self):
+        """Resumen de todos los trabajos conservados, del más antiguo al más nuevo."""
+        with self._lock:
+            return [trabajo.resumen() for trabajo in self._trabajos.values()]
+
+    def cancelar(self, id: str) -> bool:
+        """Cancela un trabajo pendiente o en marcha. Devuelve ``False`` si ya
+        había acabado o no existe."""
+        with self._lock:
+            trabajo = self._trabajos.get(id)
+            if trabajo is None or trabajo.estado not in ACTIVOS:
+                return False
+            if trabajo.estado == "pendiente":
+                self._pendientes.remove(trabajo)
+                self._acabar(trabajo, "cancelado")
+                return True
+            if trabajo.cancelar_desde is None:
+                trabajo.cancelar_desde = time.monotonic()
+                trabajo.cancelado.set()
+        self._despertar()
+        return True
+
+    def cerrar(self):
+        """Cancela todo lo pendiente, termina los trabajos en marcha y para el hilo."""
+        with self._lock:
+            if self._cerrada:
+                return
+            self._cerrada = True
+            while self._pendientes:
+                self._acabar(self._pendientes.popleft(), "cancelado")
+            for trabajo in self._en_marcha.values():
+                trabajo.cancelar_desde = time.monotonic()
+                _terminar(trabajo.proceso)
+        self._despertar()
+        self._hilo.join()
+
+    def _despertar(self):
+        try:
+            self._aviso.send(None)
+        except OSError:
+            pass
+
+    def _acabar(self, trabajo, estado, resultado=None, error=None):
+        """Marca el trabajo como acabado y descarta los terminados más
+        antiguos. Se llama con el lock tomado."""
+        trabajo.estado = estado
+        trabajo.resultado = resultado
+        trabajo.error = error
+        trabajo.fin = time.time()
+        trabajo.funcion = trabajo.args = trabajo.kwargs = None
+        if estado == "terminado":
+            trabajo.progreso = 1.0
+        metricas.contar("trabajos", estado=estado)
+        acabados = [t for t in self._trabajos.values() if t.estado not in ACTIVOS]
+        for viejo in acabados[:max(len(acabados) - self.max_terminados, 0)]:
+            del self._trabajos[viejo.id]
+
+    def _arrancar(self, trabajo):
+        """Lanza el proceso del trabajo. Se llama con el lock tomado."""
+        recibir, enviar = self._contexto.Pipe(duplex=False)
+        trabajo.cancelado = self._contexto.Event()
+        trabajo.proceso = self._contexto.Process(
+            target=_ejecutar, name=f"trabajo-{trabajo.id[:8]}",
+            args=(trabajo.funcion, trabajo.args, trabajo.kwargs, enviar,
+                  trabajo.cancelado, self.prioridad))
+        trabajo.proceso.start()
+        # Cerrar este extremo aquí permite detectar que el proceso ha muerto
+        enviar.close()
+        trabajo.conexion = recibir
+        trabajo.estado = "ejecutando"
+        trabajo.inicio = time.time()
+        self._en_marcha[trabajo.id] = trabajo
+
+    def _recibir(self, trabajo):
+        """Procesa los mensajes que ya haya en la tubería del trabajo."""
+        try:
+            while trabajo.conexion.poll():
+                tipo, datos = trabajo.conexion.recv()
+                with self._lock:
+                    if tipo == "progreso":
+                        fraccion, trabajo.mensaje = datos
+                        if fraccion is not None:
+                            trabajo.progreso = fraccion
+                    elif tipo == "terminado":
+                        self._acabar(trabajo, "terminado", resultado=datos)
+                    else:
+                        self._acabar(trabajo, tipo, error=datos)
+        except (EOFError, OSError):
+            pass
+
+    def _retirar(self, trabajo):
+        """Recoge un proceso que ha terminado."""
+        self._recibir(trabajo)
+        trabajo.proceso.join()
+        trabajo.conexion.close()
+        with self._lock:
+            del self._en_marcha[trabajo.id]
+            if trabajo.estado in ACTIVOS:
+                if trabajo.cancelar_desde is not None:
+                    self._acabar(trabajo, "cancelado")
+                else:
+                    self._acabar(trabajo, "error", error=(
+                        f"el proceso terminó sin resultado (código {trabajo.proceso.exitcode})"))
+            trabajo.proceso = trabajo.conexion = trabajo.cancelado = None
+
+    def _vigilar(self):
+        while True:
+            with self._lock:
+                cerrada = self._cerrada
+                while not cerrada and self._pendientes and len(self._en_marcha) < self.max_procesos:
+                    self._arrancar(self._pendientes.popleft())
+                en_marcha = list(self._en_marcha.values())
+            if cerrada and not en_marcha:
+                break
+
+            ahora = time.monotonic()
+            for trabajo in en_marcha:
+                # Las funciones que no llaman a progreso no ven la cancelación
+                if (trabajo.cancelar_desde is not None
+                        and ahora - trabajo.cancelar_desde > self.gracia):
+                    _terminar(trabajo.proceso)
+
+            por_objeto = {}
+            for trabajo in en_marcha:
+                por_objeto[trabajo.conexion] = trabajo
+                por_objeto[trabajo.proceso.sentinel] = trabajo
+            listos = wait([self._despertador, *por_objeto], timeout=0.5)
+            for objeto in listos:
+                if objeto is self._despertador:
+                    while self._despertador.poll():
+                        self._despertador.recv()
+                elif objeto is por_objeto[objeto].conexion:
+                    self._recibir(por_objeto[objeto])
+            for objeto in listos:
+                trabajo = por_objeto.get(objeto)
+                if (trabajo is not None and objeto == trabajo.proceso.sentinel
+                        and trabajo.id in self._en_marcha):
+                    self._retirar(trabajo)